@@ -9,17 +9,43 @@ setup(
     packages=find_packages(where="src"),
     py_modules=[
         'isingenerator.__about__',
+        'isingenerator.adaptive_grid',
+        'isingenerator.analysis_pipeline',
+        'isingenerator.benchmark',
+        'isingenerator.checkerboard_engine',
+        'isingenerator.checkpoint',
+        'isingenerator.coarse_graining',
+        'isingenerator.correlation',
         'isingenerator.create_data_simulation',
         'isingenerator.__init__',
+        'isingenerator.creutz_engine',
+        'isingenerator.dataset_catalog',
+        'isingenerator.domain_tracker',
+        'isingenerator.engine_validation',
+        'isingenerator.engines',
+        'isingenerator.exact_solution',
+        'isingenerator.finite_size_campaign',
+        'isingenerator.grid_scheduler',
         'isingenerator.ising_model_2d',
         'isingenerator.lattice_square',
         'isingenerator.__main__',
         'isingenerator.main_simulation',
+        'isingenerator.measurement_workspace',
         'isingenerator.monte_carlo_simulation',
         'isingenerator.neighbors',
+        'isingenerator.nfold_engine',
+        'isingenerator.observable_statistics',
+        'isingenerator.profiler',
+        'isingenerator.progress',
+        'isingenerator.reweighting',
+        'isingenerator.spin_graph',
         'isingenerator.topological_variables',
+        'isingenerator.trajectory_log',
+        'isingenerator.wang_landau',
+        'isingenerator.work_leasing',
         'isingenerator.writer_csv',
         'isingenerator.geometric_variables',
+        'isingenerator.writer_jsonl',
     ],
     package_dir={"": "src"},
     install_requires=[
@@ -1,39 +1,386 @@
 import argparse
+import json
+import sys
+from typing import List
+
+import numpy as np
+
 from src.isingenerator.create_data_simulation import CreateDataSimulation
+from src.isingenerator.dataset_catalog import DatasetCatalog
+from src.isingenerator.engines import Engines
+from src.isingenerator.finite_size_campaign import FiniteSizeCampaign
+from src.isingenerator.lattice_square import LatticeSquare
+from src.isingenerator.progress import ConsoleProgress
+from src.isingenerator.reweighting import Reweighting
+from src.isingenerator.wang_landau import WangLandau
+from src.isingenerator.work_leasing import WorkLeasing
+from src.isingenerator.writer_csv import WriterCsv
+
+
+def _add_sweep_arguments(run: argparse.ArgumentParser, file_name: bool = True) -> None:
+    """Add the arguments describing a sweep and how it runs.
+
+    Args:
+        run (argparse.ArgumentParser): The parser of the subcommand.
+        file_name (bool, optional): Whether the sweep writes an output file itself. Defaults to True.
+    """
+    sweep = run.add_argument_group("sweep")
+    if file_name:
+        sweep.add_argument('--file-name', '--file_name', dest = "file_name", required = True
+                           , help = "The name of the output file.")
+    sweep.add_argument('--steps', type = int, required = True
+                       , help = "Spin-flip attempts per point.")
+    sweep.add_argument('--initial-step-kT', type = float, required = True
+                       , help = "The initial temperature.")
+    sweep.add_argument('--final-step-kT', type = float, required = True
+                       , help = "The final temperature.")
+    sweep.add_argument('--delta-kT', type = float, required = True
+                       , help = "The temperature step.")
+    sweep.add_argument('--dimension', type = int, required = True
+                       , help = "The dimension of the spin matrix.")
+    sweep.add_argument('--percentage-ones', type = float, default = 0.8
+                       , help = "Fraction of positive spins in the initial matrix.")
+    sweep.add_argument('--J', type = float, default = 1.0
+                       , help = "The constant of interaction between spins.")
+    sweep.add_argument('--mu', type = float, default = 1.0
+                       , help = "The constant of magnetic moment.")
+    sweep.add_argument('--initial-step-B', type = float, default = None
+                       , help = "The initial magnetic field of a field sweep.")
+    sweep.add_argument('--final-step-B', type = float, default = None
+                       , help = "The final magnetic field of a field sweep.")
+    sweep.add_argument('--delta-B', type = float, default = None
+                       , help = "The magnetic field step of a field sweep.")
+    sweep.add_argument('--geometric-variables', action = "store_true"
+                       , help = "Compute the Forman-Ricci curvature of the last spin matrix.")
+    sweep.add_argument('--correlation-length', action = "store_true"
+                       , help = "Add the second-moment correlation length of the samples as a column.")
+    sweep.add_argument('--target-error', type = float, default = None
+                       , help = "Stop each point once the energy and magnetization errors reach this value, steps being the cap.")
+    sweep.add_argument('--relative-error', action = "store_true"
+                       , help = "Read --target-error relative to the means.")
+    sweep.add_argument('--adaptive-points', type = int, default = None
+                       , help = "Refine the temperature grid where the observables change fastest, up to this many points.")
+    sweep.add_argument('--min-delta-kT', type = float, default = None
+                       , help = "Smallest temperature spacing of an adaptive sweep, defaults to delta-kT / 16.")
+
+    performance = run.add_argument_group("performance")
+    performance.add_argument('--engine', choices = Engines.names(), default = "metropolis"
+                             , help = "The engine advancing the Markov chain.")
+    performance.add_argument('--engine-options', type = json.loads, default = None
+                             , help = 'Options of the engine as a JSON object, e.g. \'{"energy": -1.2}\' for creutz.')
+    performance.add_argument('--workers', type = int, default = 1
+                             , help = "Number of processes simulating points in parallel.")
+    performance.add_argument('--seed', type = int, default = None
+                             , help = "Seed of the sweep, point i uses seed + i.")
+    performance.add_argument('--epsilon', '--sampling-stride', dest = "epsilon", type = int, default = 15
+                             , help = "Steps between two samples.")
+    performance.add_argument('--burn-in', type = float, default = 0.5
+                             , help = "Fraction of the steps discarded before sampling.")
+    performance.add_argument('--output-format', choices = CreateDataSimulation.OUTPUT_FORMATS, default = "csv"
+                             , help = "Format of the output file.")
+    performance.add_argument('--checkpoint-dir', default = None
+                             , help = "Directory recording the points written, to resume an interrupted sweep.")
+    performance.add_argument('--analysis-workers', type = int, default = 0
+                             , help = "Processes per point computing the domains of every sample while the chain runs.")
+    performance.add_argument('--incremental-domains', action = "store_true"
+                             , help = "Follow the domains through the flips of the chain instead of using analysis workers.")
+    performance.add_argument('--catalog', default = None
+                             , help = "Index file of a dataset catalog recording the parameters of the sweep.")
+    performance.add_argument('--histogram-dir', default = None
+                             , help = "Directory receiving the energy-magnetization histogram of every point, see reweight.")
+    performance.add_argument('--snapshot-dir', default = None
+                             , help = "Directory receiving the block-spin coarse-grained samples of every point.")
+    performance.add_argument('--snapshot-levels', type = int, nargs = "+", default = [2, 4, 8]
+                             , help = "Block sides of the coarse-grained samples, 1 for the full matrices.")
+    performance.add_argument('--trajectory-dir', default = None
+                             , help = "Directory receiving the log of the accepted flips of every point, to replay any step.")
+    performance.add_argument('--memmap-dir', default = None
+                             , help = "Directory of the memory-mapped spin matrix of every point, for the checkerboard engine.")
 
-def main() -> int:
+    report = run.add_argument_group("report")
+    report.add_argument('--progress', action = "store_true"
+                        , help = "Show a progress line while the sweep runs.")
+    report.add_argument('--profile', action = "store_true"
+                        , help = "Write the time per phase and counters to <file-name>.profile.json.")
+    report.add_argument('--dry-run', action = "store_true"
+                        , help = "Print the number of spin updates and the expected wall time, then exit.")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the parser of the command line interface.
+
+    Returns:
+        argparse.ArgumentParser: The parser with its subcommands.
+    """
     parser = argparse.ArgumentParser(
-        "CreateDataSimulation",
+        "isingenerator",
         description = "Create the data simulation for the 2D Ising Model."
     )
-    
-    parser.add_argument('--file_name'
-                        , help = "The name of the archiv CSV.")
-    parser.add_argument('--steps', help = "The name of the archiv CSV.")
-    parser.add_argument('--initial-step-kT', help = "The name of the archiv CSV.")
-    parser.add_argument('--final-step-kT', help = "The name of the archiv CSV.")
-    parser.add_argument('--delta-kT', help = "The name of the archiv CSV.")
-    parser.add_argument('--dimension', help = "The name of the archiv CSV.")
-    parser.add_argument('--percentage-ones', help = "The name of the archiv CSV.")
-    
-    args = parser.parse_args()
-    
-    if all(getattr(args, arg) is not None for arg in vars(args)):
-        c = CreateDataSimulation(
-            file_name = args.file_name,
-            steps = args.steps,
-            initial_step_kT = args.initial_step_kT,
-            final_step_kT = args.final_step_kT,
-            delta_kT = args.delta_kT,
-            dimension = args.dimension,
-            percentage_ones = args.percentage_ones
+    subparsers = parser.add_subparsers(dest = "command", required = True)
+
+    run = subparsers.add_parser("run", help = "Run a temperature sweep, optionally also over the magnetic field.")
+    _add_sweep_arguments(run)
+
+    shard_init = subparsers.add_parser("shard-init", help = "Write a sweep as a task manifest in a shared directory.")
+    shard_init.add_argument('--shard-dir', required = True
+                            , help = "The shared directory of the sweep.")
+    _add_sweep_arguments(shard_init, file_name = False)
+
+    shard_work = subparsers.add_parser("shard-work", help = "Claim and run tasks of a sharded sweep until none is left.")
+    shard_work.add_argument('--shard-dir', required = True
+                            , help = "The shared directory of the sweep.")
+    shard_work.add_argument('--worker-id', default = None
+                            , help = "Identifier of the worker, defaults to <host>-<pid>-<random>.")
+    shard_work.add_argument('--lease-seconds', type = float, default = 600.0
+                            , help = "Age after which the lease of a task is considered abandoned.")
+    shard_work.add_argument('--poll-interval', type = float, default = 5.0
+                            , help = "Seconds between two claims when every remaining task is leased.")
+    shard_work.add_argument('--max-tasks', type = int, default = None
+                            , help = "Stop after this number of tasks.")
+
+    shard_merge = subparsers.add_parser("shard-merge", help = "Build the output file of a sharded sweep.")
+    shard_merge.add_argument('--shard-dir', required = True
+                             , help = "The shared directory of the sweep.")
+    shard_merge.add_argument('--file-name', required = True
+                             , help = "The name of the output file.")
+
+    campaign = subparsers.add_parser("campaign", help = "Run one sweep per lattice size on a shared pool of workers.")
+    campaign.add_argument('--sizes', type = int, nargs = "+", required = True
+                          , help = "The lattice sizes.")
+    campaign.add_argument('--steps-per-site', type = float, required = True
+                          , help = "Steps per point divided by the number of spins.")
+    campaign.add_argument('--initial-step-kT', type = float, required = True
+                          , help = "The initial temperature.")
+    campaign.add_argument('--final-step-kT', type = float, required = True
+                          , help = "The final temperature.")
+    campaign.add_argument('--delta-kT', type = float, required = True
+                          , help = "The temperature step.")
+    campaign.add_argument('--directory', default = "."
+                          , help = "Directory of the datasets, named <steps>_<L>_<epsilon>.csv.")
+    campaign.add_argument('--epsilon', type = int, default = None
+                          , help = "Steps between two samples, defaults to one sweep.")
+    campaign.add_argument('--workers', type = int, default = 1
+                          , help = "Number of processes shared by every lattice size.")
+    campaign.add_argument('--seed', type = int, default = None
+                          , help = "Seed of every sweep, point i of a size uses seed + i.")
+    campaign.add_argument('--engine', choices = Engines.names(), default = "metropolis"
+                          , help = "The engine advancing the Markov chain.")
+    campaign.add_argument('--burn-in', type = float, default = 0.5
+                          , help = "Fraction of the steps discarded before sampling.")
+    campaign.add_argument('--checkpoint-dir', default = None
+                          , help = "Directory recording the points written, to resume an interrupted campaign.")
+    campaign.add_argument('--catalog', default = None
+                          , help = "Index file of a dataset catalog recording the parameters of every sweep.")
+    campaign.add_argument('--benchmark-file', default = None
+                          , help = "JSON file of test/benchmark_simulation.py used to estimate the cost of the jobs.")
+
+    reweight = subparsers.add_parser("reweight", help = "Interpolate the observables of saved histograms on a fine temperature grid.")
+    reweight.add_argument('--histogram-dir', required = True
+                          , help = "The directory of the histograms.")
+    reweight.add_argument('--dimension', type = int, default = None
+                          , help = "Use only the histograms of this lattice dimension.")
+    reweight.add_argument('--initial-step-kT', type = float, required = True
+                          , help = "The initial temperature.")
+    reweight.add_argument('--final-step-kT', type = float, required = True
+                          , help = "The final temperature.")
+    reweight.add_argument('--delta-kT', type = float, required = True
+                          , help = "The temperature step.")
+    reweight.add_argument('--file-name', required = True
+                          , help = "The name of the output CSV file.")
+
+    wang_landau = subparsers.add_parser("wang-landau", help = "Estimate the density of states of a lattice and its thermodynamics.")
+    wang_landau.add_argument('--dimension', type = int, required = True
+                             , help = "The dimension of the spin matrix.")
+    wang_landau.add_argument('--flatness', type = float, default = 0.8
+                             , help = "Smallest ratio between the count of an energy and the mean count of a flat histogram.")
+    wang_landau.add_argument('--final-log-f', type = float, default = 1e-6
+                             , help = "Value of ln f ending the walk.")
+    wang_landau.add_argument('--schedule', choices = WangLandau.SCHEDULES, default = "halving"
+                             , help = "Schedule of the modification factor.")
+    wang_landau.add_argument('--seed', type = int, default = None
+                             , help = "Seed of the walk.")
+    wang_landau.add_argument('--initial-step-kT', type = float, required = True
+                             , help = "The initial temperature.")
+    wang_landau.add_argument('--final-step-kT', type = float, required = True
+                             , help = "The final temperature.")
+    wang_landau.add_argument('--delta-kT', type = float, required = True
+                             , help = "The temperature step.")
+    wang_landau.add_argument('--file-name', required = True
+                             , help = "The name of the output CSV file.")
+    wang_landau.add_argument('--dos-file', default = None
+                             , help = "NumPy .npz file receiving the logarithm of the density of states.")
+
+    catalog = subparsers.add_parser("catalog", help = "List the datasets of a directory, indexing the legacy ones.")
+    catalog.add_argument('--directory', default = "."
+                         , help = "Directory of the datasets and of its catalog.jsonl index.")
+    catalog.add_argument('--scan', action = "store_true"
+                         , help = "Add the <steps>_<L>_<epsilon>.csv files without a record to the index.")
+    catalog.add_argument('--dimension', type = int, default = None
+                         , help = "List only the datasets of this lattice dimension.")
+
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    """Entry point of the command line interface.
+
+    Args:
+        argv (List[str], optional): The arguments, defaults to sys.argv[1:].
+
+    Returns:
+        int: The exit code.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    # Invocations written before the subcommands existed mean "run".
+    if argv and argv[0].startswith("--") and argv[0] not in ("--help", "-h"):
+        argv = ["run"] + list(argv)
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.command == "shard-work":
+        done = WorkLeasing.run_worker(
+            args.shard_dir, args.worker_id, args.lease_seconds, args.poll_interval, args.max_tasks
         )
-        print(c.generate_csv_data_zero_magnetic_field())
-        
+        print(f"{done} tasks done")
+        return 0
+    if args.command == "campaign":
+        runner = FiniteSizeCampaign(
+            args.sizes, args.steps_per_site, args.initial_step_kT, args.final_step_kT, args.delta_kT,
+            directory = args.directory,
+            epsilon = args.epsilon,
+            workers = args.workers,
+            benchmark_file = args.benchmark_file,
+            seed = args.seed,
+            engine = args.engine,
+            burn_in = args.burn_in,
+            checkpoint_dir = args.checkpoint_dir,
+            catalog = args.catalog,
+        )
+        print("\n".join(runner.run()))
         return 0
-    
+    if args.command == "reweight":
+        reweighting = Reweighting.from_directory(args.histogram_dir, args.dimension)
+        kT_values = np.arange(args.initial_step_kT, args.final_step_kT + args.delta_kT / 2, args.delta_kT)
+        rows = reweighting.observables(kT_values)
+        WriterCsv.write_data(args.file_name, list(rows[0]), mode = "w")
+        for row in rows:
+            WriterCsv.write_data(args.file_name, ["{:.5f}".format(value) for value in row.values()])
+        print(args.file_name)
+        return 0
+    if args.command == "wang-landau":
+        if args.seed is not None:
+            np.random.seed(args.seed)
+        lattice = LatticeSquare(args.dimension, args.dimension)
+        lattice.create_matrix()
+        density = WangLandau(
+            lattice, flatness = args.flatness, final_log_f = args.final_log_f, schedule = args.schedule
+        ).run()
+        if args.dos_file is not None:
+            density.save(args.dos_file)
+        kT_values = np.arange(args.initial_step_kT, args.final_step_kT + args.delta_kT / 2, args.delta_kT)
+        rows = density.thermodynamics(kT_values)
+        WriterCsv.write_data(args.file_name, list(rows[0]), mode = "w")
+        for row in rows:
+            WriterCsv.write_data(args.file_name, ["{:.5f}".format(value) for value in row.values()])
+        print(args.file_name)
+        return 0
+    if args.command == "catalog":
+        datasets = DatasetCatalog(args.directory)
+        if args.scan:
+            datasets.scan()
+        criteria = {} if args.dimension is None else {"dimension": args.dimension}
+        for record in datasets.find(**criteria):
+            print(f"{record['file']}  L={record.get('dimension')} steps={record.get('steps')} "
+                  f"epsilon={record.get('epsilon')} seed={record.get('seed')} engine={record.get('engine')} "
+                  f"version={record.get('version')}")
+        return 0
+    if args.command == "shard-merge":
+        print(WorkLeasing.merge(args.shard_dir, args.file_name))
+        return 0
+
+    field = (args.initial_step_B, args.final_step_B, args.delta_B)
+    if any(value is not None for value in field) and not all(value is not None for value in field):
+        parser.error("--initial-step-B, --final-step-B and --delta-B must be given together")
+    if args.adaptive_points is not None and args.delta_B is not None:
+        parser.error("--adaptive-points refines the temperature at a fixed magnetic field, it excludes the B range")
+    if args.command == "shard-init":
+        # The points are run by shard-work and written by shard-merge, so these options have no effect there.
+        unused = [
+            flag for flag, used in (
+                ("--adaptive-points", args.adaptive_points is not None),
+                ("--min-delta-kT", args.min_delta_kT is not None),
+                ("--workers", args.workers != 1),
+                ("--checkpoint-dir", args.checkpoint_dir is not None),
+                ("--progress", args.progress),
+                ("--profile", args.profile),
+            ) if used
+        ]
+        if unused:
+            parser.error(f"{', '.join(unused)} cannot be used with shard-init, run more shard-work workers instead")
+
+    c = CreateDataSimulation(
+        file_name = getattr(args, "file_name", ""),
+        steps = args.steps,
+        initial_step_kT = args.initial_step_kT,
+        final_step_kT = args.final_step_kT,
+        delta_kT = args.delta_kT,
+        dimension = args.dimension,
+        percentage_ones = args.percentage_ones,
+        J = args.J,
+        mu = args.mu,
+        epsilon = args.epsilon,
+        geometric_variables = args.geometric_variables,
+        initial_step_B = args.initial_step_B,
+        final_step_B = args.final_step_B,
+        delta_B = args.delta_B,
+        profile = args.profile,
+        progress = ConsoleProgress() if args.progress else None,
+        engine = args.engine,
+        engine_options = args.engine_options,
+        workers = args.workers,
+        seed = args.seed,
+        burn_in = args.burn_in,
+        output_format = args.output_format,
+        checkpoint_dir = args.checkpoint_dir,
+        analysis_workers = args.analysis_workers,
+        histogram_dir = args.histogram_dir,
+        correlation_length = args.correlation_length,
+        catalog = args.catalog,
+        target_error = args.target_error,
+        relative_error = args.relative_error,
+        snapshot_dir = args.snapshot_dir,
+        snapshot_levels = args.snapshot_levels,
+        incremental_domains = args.incremental_domains,
+        trajectory_dir = args.trajectory_dir,
+        memmap_dir = args.memmap_dir,
+    )
+
+    if args.dry_run:
+        estimate = c.estimate_cost(points = args.adaptive_points)
+        print(f"engine            {estimate['engine']}")
+        print(f"points            {estimate['points']}")
+        print(f"spin updates      {estimate['spin_updates']:.3e}")
+        print(f"samples           {estimate['samples']}")
+        print(f"attempts/s        {estimate['attempts_per_second']:.3e}")
+        print(f"seconds/sample    {estimate['seconds_per_sample']:.3e}")
+        print(f"workers           {estimate['workers']}")
+        print(f"expected wall time {estimate['estimated_seconds']:.1f} s")
+        return 0
+
+    if args.command == "shard-init":
+        print(f"{c.create_manifest(args.shard_dir)} tasks written to {args.shard_dir}")
+        return 0
+
+    if args.adaptive_points is not None:
+        print(c.generate_csv_data_adaptive(args.adaptive_points, args.min_delta_kT))
+    elif args.delta_B is not None:
+        print(c.generate_csv_data_nonzero_magnetic_field())
+    else:
+        print(c.generate_csv_data_zero_magnetic_field())
+
+    return 0
+
 
 if __name__ == "__main__":
     exit(main())
-    
-    
\ No newline at end of file
@@ -0,0 +1,91 @@
+"""Module providing a class to choose where new temperatures are inserted in an adaptive sweep."""
+# Copyright (C) 2023, Erick Jesús Ríos González
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor,
+# Boston, MA  02110-1301, USA.
+
+from typing import Dict, List, Sequence
+
+
+class AdaptiveGrid:
+    """Static class scoring the intervals between simulated temperatures and splitting the worst ones."""
+
+    # Observables looked at, with the key of their standard error when there is one.
+    OBSERVABLES = {
+        "energy": "energy_error",
+        "abs_magnetization": "abs_magnetization_error",
+        "susceptibility": None,
+    }
+
+    @staticmethod
+    def interval_scores(points: Sequence[Dict[str, float]]) -> List[float]:
+        """Score every interval between two consecutive temperatures.
+
+        The score of an interval is, over the observables, the largest change across it plus the
+        errors at both ends, divided by the range of the observable over the whole sweep. Steep
+        and noisy intervals get the highest scores.
+
+        Args:
+            points (Sequence[Dict[str, float]]): Summaries of the simulated points, see
+                ObservableMoments.summary, sorted by kT.
+
+        Returns:
+            List[float]: The score of the interval between points[i] and points[i + 1].
+        """
+        scores = [0.0] * max(len(points) - 1, 0)
+        for name, error in AdaptiveGrid.OBSERVABLES.items():
+            values = [point[name] for point in points]
+            if not values:
+                continue
+            spread = max(values) - min(values)
+            if spread <= 0:
+                continue
+            for i in range(len(scores)):
+                change = abs(values[i + 1] - values[i])
+                if error is not None:
+                    change += points[i][error] + points[i + 1][error]
+                scores[i] = max(scores[i], change / spread)
+        return scores
+
+    @staticmethod
+    def refine(points: Sequence[Dict[str, float]], count: int, min_delta_kT: float) -> List[float]:
+        """Return the midpoints of the highest scoring intervals.
+
+        Args:
+            points (Sequence[Dict[str, float]]): Summaries of the simulated points, sorted by kT.
+            count (int): Maximum number of new temperatures.
+            min_delta_kT (float): Smallest spacing allowed between two temperatures, intervals
+                narrower than twice this value are not split.
+
+        Returns:
+            List[float]: The new temperatures in increasing order, empty if no interval can be split.
+
+        Example:
+            >>> points = [{"kT": 1.0, "energy": -2.0, "energy_error": 0.0, "abs_magnetization": 1.0,
+            ...            "abs_magnetization_error": 0.0, "susceptibility": 0.0},
+            ...           {"kT": 2.0, "energy": -1.9, "energy_error": 0.0, "abs_magnetization": 0.9,
+            ...            "abs_magnetization_error": 0.0, "susceptibility": 0.1},
+            ...           {"kT": 3.0, "energy": -0.8, "energy_error": 0.0, "abs_magnetization": 0.1,
+            ...            "abs_magnetization_error": 0.0, "susceptibility": 0.2}]
+            >>> AdaptiveGrid.refine(points, 1, 0.1)
+            [2.5]
+        """
+        scores = AdaptiveGrid.interval_scores(points)
+        candidates = [
+            i for i in range(len(scores))
+            if points[i + 1]["kT"] - points[i]["kT"] >= 2 * min_delta_kT
+        ]
+        candidates.sort(key=lambda i: scores[i], reverse=True)
+        return sorted((points[i]["kT"] + points[i + 1]["kT"]) / 2 for i in candidates[:count])
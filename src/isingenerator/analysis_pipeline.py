@@ -0,0 +1,176 @@
+"""Module providing a class to analyse sampled spin matrices on worker processes while the Markov chain runs."""
+# Copyright (C) 2023, Erick Jesús Ríos González
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor,
+# Boston, MA  02110-1301, USA.
+
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from src.isingenerator.spin_graph import SpinGraph
+from src.isingenerator.topological_variables import TopologicalVariables
+
+# Ring buffer of the worker process, attached once by _attach_ring.
+_ring: np.ndarray = None
+_ring_memory: shared_memory.SharedMemory = None
+
+
+def _attach_ring(name: str, shape: Tuple[int, int, int]) -> None:
+    """Attach the shared ring buffer in a worker process.
+
+    Args:
+        name (str): Name of the shared memory block.
+        shape (Tuple[int, int, int]): Number of slots and shape of the spin matrices.
+    """
+    global _ring, _ring_memory
+    _ring_memory = shared_memory.SharedMemory(name=name)
+    _ring = np.ndarray(shape, dtype=np.int8, buffer=_ring_memory.buf)
+
+
+def _analyse_slot(slot: int, curvature: bool) -> Tuple[float, float, float]:
+    """Compute the expensive observables of the spin matrix in a slot of the ring buffer.
+
+    Args:
+        slot (int): Index of the slot.
+        curvature (bool): Whether the Forman-Ricci curvature is computed.
+
+    Returns:
+        Tuple[float, float, float]: Number of domains, mean domain size and total Forman-Ricci curvature,
+            0 when not computed.
+    """
+    matrix = _ring[slot]
+    TopologicalVariables.label_ring(matrix)
+    frc = 0.0
+    if curvature:
+        frc, _ = SpinGraph.forman_ricci_curvature_values(SpinGraph.adjacency(matrix))
+    return (
+        float(TopologicalVariables.get_num_labels()),
+        float(TopologicalVariables.mean_domain_size()),
+        float(frc),
+    )
+
+
+class AnalysisPipeline:
+    """Class copying sampled spin matrices to a shared-memory ring buffer analysed by a pool of processes.
+
+    The simulation only pays for the copy of the matrix; labelling the domains and computing the
+    curvature run concurrently on the workers. When every slot of the ring is waiting for a worker,
+    or holds a result waiting for an earlier sample, submit blocks until one is free, so memory
+    stays bounded however fast the chain samples and however long the run.
+    """
+
+    OBSERVABLES = ("domain_number", "mean_domain_size", "forman_ricci_curvature")
+
+    def __init__(self, shape: Tuple[int, int], workers: int = 2, slots: int = None, curvature: bool = False) -> None:
+        """Initialize an instance of AnalysisPipeline, creating the ring buffer and starting the workers.
+
+        Args:
+            shape (Tuple[int, int]): Shape of the spin matrices.
+            workers (int, optional): Number of analysis processes. Defaults to 2.
+            slots (int, optional): Number of matrices held by the ring buffer. Defaults to twice the workers.
+            curvature (bool, optional): Whether the Forman-Ricci curvature is computed. Defaults to False.
+
+        Example:
+            >>> with AnalysisPipeline(matrix.shape, workers=4) as pipeline:
+            ...     for _ in range(100):
+            ...         chain.advance(epsilon)
+            ...         pipeline.submit(matrix)
+            ...     totals = pipeline.drain()
+        """
+        slots = 2 * workers if slots is None else max(slots, 1)
+        ring_shape = (slots,) + tuple(shape)
+        self._curvature = curvature
+        self._memory = shared_memory.SharedMemory(create=True, size=int(np.prod(ring_shape)))
+        self._ring = np.ndarray(ring_shape, dtype=np.int8, buffer=self._memory.buf)
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=_attach_ring, initargs=(self._memory.name, ring_shape)
+        )
+        self._slots = slots
+        self._free: List[int] = list(range(slots))
+        self._in_flight: Dict[Future, Tuple[int, int]] = {}
+        # Results finished before an earlier sample, waiting for their turn.
+        self._waiting: Dict[int, Tuple[float, float, float]] = {}
+        # Sequence number of the next result to add to the running sums.
+        self._next = 0
+        self._totals: Dict[str, float] = {name: 0.0 for name in AnalysisPipeline.OBSERVABLES}
+        self._samples = 0
+        self._submitted = 0
+        self.stalls = 0
+
+    def submit(self, matrix: np.ndarray) -> None:
+        """Copy a spin matrix to a free slot and queue its analysis, waiting for a slot if none is free.
+
+        Args:
+            matrix (np.ndarray): The spin matrix, of ±1 values.
+        """
+        self._collect([future for future in self._in_flight if future.done()])
+        # A result waiting for an earlier sample holds its place in the ring, so they stay bounded too.
+        if len(self._in_flight) + len(self._waiting) >= self._slots:
+            self.stalls += 1
+            while len(self._in_flight) + len(self._waiting) >= self._slots:
+                done, _ = wait(self._in_flight, return_when=FIRST_COMPLETED)
+                self._collect(done)
+        slot = self._free.pop()
+        np.copyto(self._ring[slot], matrix, casting="unsafe")
+        future = self._executor.submit(_analyse_slot, slot, self._curvature)
+        self._in_flight[future] = (slot, self._submitted)
+        self._submitted += 1
+
+    def _collect(self, futures: Iterable[Future]) -> None:
+        """Free the slots of finished analyses and add their results to the running sums in submission order."""
+        for future in futures:
+            slot, sequence = self._in_flight.pop(future)
+            self._waiting[sequence] = future.result()
+            self._free.append(slot)
+        while self._next in self._waiting:
+            for name, value in zip(AnalysisPipeline.OBSERVABLES, self._waiting.pop(self._next)):
+                self._totals[name] += value
+            self._samples += 1
+            self._next += 1
+
+    def drain(self) -> Dict[str, float]:
+        """Wait for every queued analysis and return the sums of the observables since the last drain.
+
+        The results are added in submission order as they arrive, so the sums do not depend on the
+        order the workers finish, and only the results of the samples still in the ring are kept.
+
+        Returns:
+            Dict[str, float]: The number of samples and the sum of every observable over them.
+        """
+        done, _ = wait(self._in_flight, return_when=ALL_COMPLETED)
+        self._collect(done)
+        totals = dict(self._totals, samples=self._samples)
+        self._totals = {name: 0.0 for name in AnalysisPipeline.OBSERVABLES}
+        self._samples = 0
+        return totals
+
+    def close(self) -> None:
+        """Stop the workers and release the ring buffer."""
+        self._executor.shutdown(wait=True)
+        self._in_flight = {}
+        del self._ring
+        self._memory.close()
+        self._memory.unlink()
+
+    def __enter__(self) -> "AnalysisPipeline":
+        """Return the pipeline, closed when the block exits."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Close the pipeline."""
+        self.close()
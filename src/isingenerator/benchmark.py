@@ -0,0 +1,398 @@
+"""Module providing a static class to benchmark the hot paths of the 2D Ising Model simulation."""
+# Copyright (C) 2023, Erick Jesús Ríos González
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor,
+# Boston, MA  02110-1301, USA.
+
+import json
+import math
+import os
+import platform
+import random
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from src.isingenerator.__about__ import __version__
+from src.isingenerator.coarse_graining import SnapshotPyramid
+from src.isingenerator.correlation import SpinCorrelation
+from src.isingenerator.domain_tracker import DomainTracker
+from src.isingenerator.engines import Engines
+from src.isingenerator.ising_model_2d import IsingModel2D
+from src.isingenerator.lattice_square import LatticeSquare
+from src.isingenerator.measurement_workspace import MeasurementWorkspace
+from src.isingenerator.monte_carlo_simulation import MonteCarloSimulation
+from src.isingenerator.observable_statistics import ObservableMoments
+from src.isingenerator.reweighting import JointHistogram
+from src.isingenerator.trajectory_log import TrajectoryRecorder
+from src.isingenerator.topological_variables import TopologicalVariables
+from src.isingenerator.geometric_variables_dos import GeometricVariables
+from src.isingenerator.spin_graph import SpinGraph
+
+
+class Benchmark:
+    """Static class for timing the simulation hot paths and comparing results between commits."""
+
+    # Lattice sizes used in the production outputs plus a large case.
+    LATTICE_SIZES: Tuple[int, ...] = (16, 32, 48, 64, 68, 80, 96, 100, 110, 120, 130, 1024)
+
+    @staticmethod
+    def _measure(function: Callable[[], None], min_time: float, min_calls: int = 1) -> Tuple[float, int]:
+        """Call a function repeatedly until both a minimum time and a minimum number of calls are reached.
+
+        Args:
+            function (Callable[[], None]): The function to time.
+            min_time (float): Minimum accumulated time in seconds.
+            min_calls (int, optional): Minimum number of calls. Defaults to 1.
+
+        Returns:
+            Tuple[float, int]: Total elapsed time in seconds and number of calls made.
+        """
+        calls = 0
+        elapsed = 0.0
+        while elapsed < min_time or calls < min_calls:
+            start = time.perf_counter()
+            function()
+            elapsed += time.perf_counter() - start
+            calls += 1
+        return elapsed, calls
+
+    @staticmethod
+    def _lattice(dimension: int, percentage_ones: float = 0.5) -> LatticeSquare:
+        """Create a lattice with its spin matrix already initialized."""
+        lattice = LatticeSquare(dimension, dimension, percentage_ones)
+        lattice.create_matrix()
+        return lattice
+
+    @staticmethod
+    def time_markov_chain(dimension: int, kT: float = 2.27, block: int = 1000, min_time: float = 0.5) -> float:
+        """Measure the throughput of MonteCarloSimulation.markov_chain_move.
+
+        Args:
+            dimension (int): Dimension of the spin matrix.
+            kT (float, optional): Temperature of the chain. Defaults to 2.27.
+            block (int, optional): Attempts per timed block. Defaults to 1000.
+            min_time (float, optional): Minimum measuring time in seconds. Defaults to 0.5.
+
+        Returns:
+            float: Spin-flip attempts per second.
+        """
+        lattice = Benchmark._lattice(dimension)
+        beta = 1 / kT
+
+        def run_block() -> None:
+            for _ in range(block):
+                MonteCarloSimulation.markov_chain_move(lattice, dimension, beta)
+
+        elapsed, calls = Benchmark._measure(run_block, min_time)
+        return calls * block / elapsed
+
+    @staticmethod
+    def time_measurement(dimension: int, min_time: float = 0.5) -> float:
+        """Measure the cost of one sample of energy and magnetization with IsingModel2D.
+
+        Args:
+            dimension (int): Dimension of the spin matrix.
+            min_time (float, optional): Minimum measuring time in seconds. Defaults to 0.5.
+
+        Returns:
+            float: Seconds per sample.
+        """
+        ising_model = IsingModel2D(getattr(Benchmark._lattice(dimension), "_matrix"))
+
+        def sample() -> None:
+            ising_model.calculate_magnetization()
+            ising_model.calculate_energy(1.0, 0.0, 1.0)
+
+        elapsed, calls = Benchmark._measure(sample, min_time, 3)
+        return elapsed / calls
+
+    @staticmethod
+    def time_measurement_workspace(dimension: int, min_time: float = 0.5) -> float:
+        """Measure the cost of one sample of energy and magnetization with the MeasurementWorkspace of the sweeps.
+
+        Args:
+            dimension (int): Dimension of the spin matrix.
+            min_time (float, optional): Minimum measuring time in seconds. Defaults to 0.5.
+
+        Returns:
+            float: Seconds per sample.
+        """
+        matrix = getattr(Benchmark._lattice(dimension), "_matrix")
+        workspace = MeasurementWorkspace(matrix.shape, matrix.dtype)
+
+        def sample() -> None:
+            workspace.energy_and_magnetization(matrix, 1.0, 0.0, 1.0)
+
+        elapsed, calls = Benchmark._measure(sample, min_time, 3)
+        return elapsed / calls
+
+    @staticmethod
+    def time_label_ring(dimension: int, min_time: float = 0.5) -> float:
+        """Measure the cost of labeling the domains of one snapshot.
+
+        Args:
+            dimension (int): Dimension of the spin matrix.
+            min_time (float, optional): Minimum measuring time in seconds. Defaults to 0.5.
+
+        Returns:
+            float: Seconds per snapshot.
+        """
+        matrix = getattr(Benchmark._lattice(dimension), "_matrix")
+        elapsed, calls = Benchmark._measure(lambda: TopologicalVariables.label_ring(matrix), min_time)
+        return elapsed / calls
+
+    @staticmethod
+    def time_graph(dimension: int, min_time: float = 0.5) -> float:
+        """Measure the cost of converting one snapshot to a graph.
+
+        Args:
+            dimension (int): Dimension of the spin matrix.
+            min_time (float, optional): Minimum measuring time in seconds. Defaults to 0.5.
+
+        Returns:
+            float: Seconds per snapshot.
+        """
+        matrix = getattr(Benchmark._lattice(dimension), "_matrix")
+        elapsed, calls = Benchmark._measure(lambda: GeometricVariables.ising_matrix_to_graph(matrix), min_time)
+        return elapsed / calls
+
+    @staticmethod
+    def time_sparse_graph(dimension: int, min_time: float = 0.5) -> float:
+        """Measure the cost of building the sparse adjacency matrix of one snapshot.
+
+        Args:
+            dimension (int): Dimension of the spin matrix.
+            min_time (float, optional): Minimum measuring time in seconds. Defaults to 0.5.
+
+        Returns:
+            float: Seconds per snapshot.
+        """
+        matrix = getattr(Benchmark._lattice(dimension), "_matrix")
+        elapsed, calls = Benchmark._measure(lambda: SpinGraph.adjacency(matrix), min_time)
+        return elapsed / calls
+
+    @staticmethod
+    def time_point(kT: float, arguments: Dict, min_time: float = 0.5) -> Dict:
+        """Measure the cost of one point of a sweep, with its engine and the per-sample work it turns on.
+
+        The chain starts from the initial lattice of the sweep and alternates epsilon attempts with a
+        sample, as MainSimulation.create_observables does. The first half of min_time brings the chain
+        closer to equilibrium and is not counted, which matters for the engines whose cost depends on
+        the state, such as the n-fold way.
+
+        Args:
+            kT (float): Boltzmann constant times temperature.
+            arguments (Dict): The keyword arguments of MainSimulation.create_observables shared by the points
+                of a sweep, as given by CreateDataSimulation.
+            min_time (float, optional): Minimum measuring time in seconds. Defaults to 0.5.
+
+        Returns:
+            Dict: The seconds per attempt of the chain, the seconds per sample in the process of the chain, the
+                seconds per sample of one analysis worker, 0 without analysis workers, and the samples needed to
+                reach target_error extrapolated from the binning errors of the timed samples, None without a
+                target or when the errors are not yet reliable.
+        """
+        dimension, epsilon = arguments["dimension"], arguments["epsilon"]
+        J, B, mu = arguments["J"], arguments.get("B", 0), arguments["mu"]
+        lattice = LatticeSquare(dimension, dimension, arguments["percentage_ones"])
+        lattice.create_matrix()
+        chain = Engines.create(arguments["engine"], lattice, 1 / kT, **(arguments["engine_options"] or {}))
+        matrix = getattr(lattice, "_matrix")
+        workspace = MeasurementWorkspace(matrix.shape, matrix.dtype)
+        moments = ObservableMoments(matrix.size)
+
+        observer = tracker = DomainTracker(matrix) if arguments.get("incremental_domains") else None
+        follows_flips = Engines.reports_flips(arguments["engine"])
+        recorder = None
+        if arguments.get("trajectory_dir") is not None:
+            observer = recorder = TrajectoryRecorder(os.devnull, matrix, observer=observer)
+        correlation = SpinCorrelation(matrix.shape) if arguments.get("correlation_length") else None
+        histogram = JointHistogram(matrix.size, 1 / kT, J, B, mu) if arguments.get("histogram_dir") is not None else None
+        pyramid = (
+            SnapshotPyramid(matrix.shape, arguments["snapshot_levels"])
+            if arguments.get("snapshot_dir") is not None else None
+        )
+
+        def sample() -> None:
+            energy, magnetization = workspace.energy_and_magnetization(matrix, J, B, mu)
+            moments.add(energy, magnetization)
+            if tracker is not None:
+                if not follows_flips:
+                    tracker.rebuild(matrix)
+                tracker.mean_domain_size()
+            if histogram is not None:
+                histogram.add(energy, magnetization)
+            if correlation is not None:
+                correlation.add(matrix)
+            if pyramid is not None:
+                pyramid.add(matrix)
+
+        def analyse() -> None:
+            TopologicalVariables.label_ring(matrix)
+            if arguments["geometric_variables"]:
+                SpinGraph.forman_ricci_curvature_values(SpinGraph.adjacency(matrix))
+
+        warm_up_end = time.perf_counter() + min_time / 2
+        while time.perf_counter() < warm_up_end:
+            chain.advance(epsilon, observer)
+        chain_time = sample_time = analysis_time = 0.0
+        samples = 0
+        while chain_time + sample_time + analysis_time < min_time / 2 or samples < 3:
+            start = time.perf_counter()
+            chain.advance(epsilon, observer)
+            chain_end = time.perf_counter()
+            sample()
+            sample_end = time.perf_counter()
+            if arguments.get("analysis_workers", 0) > 0:
+                analyse()
+                analysis_time += time.perf_counter() - sample_end
+            chain_time += chain_end - start
+            sample_time += sample_end - chain_end
+            samples += 1
+        if recorder is not None:
+            recorder.close()
+
+        samples_needed = None
+        target_error = arguments.get("target_error")
+        if target_error is not None:
+            # The standard error falls as one over the square root of the number of samples.
+            ratios = []
+            for name in ObservableMoments.QUANTITIES:
+                error, reliable = moments.binning_error(name)
+                limit = target_error * abs(moments.mean(name)) if arguments.get("relative_error") else target_error
+                ratios.append((error / limit) ** 2 if reliable and limit > 0 else math.inf)
+            if max(ratios) < math.inf:
+                samples_needed = max(16, 16 * math.ceil(samples * max(ratios) / 16))
+
+        return {
+            "seconds_per_attempt": chain_time / (samples * epsilon),
+            "seconds_per_sample": sample_time / samples,
+            "analysis_seconds_per_sample": analysis_time / samples,
+            "samples_needed": samples_needed,
+        }
+
+    @staticmethod
+    def run(sizes: Sequence[int] = LATTICE_SIZES, min_time: float = 0.5, repeat: int = 3, seed: int = 0) -> Dict:
+        """Run every benchmark for every lattice size, keeping the best of several repetitions.
+
+        Args:
+            sizes (Sequence[int], optional): Lattice dimensions to benchmark. Defaults to LATTICE_SIZES.
+            min_time (float, optional): Minimum measuring time per repetition in seconds. Defaults to 0.5.
+            repeat (int, optional): Number of repetitions per benchmark. Defaults to 3.
+            seed (int, optional): Seed for the random generators. Defaults to 0.
+
+        Returns:
+            Dict: Machine-readable results with a "meta" section and a list of "results".
+        """
+        np.random.seed(seed)
+        random.seed(seed)
+
+        # Every metric is stored with its unit and the direction that counts as an improvement.
+        metrics = [
+            ("markov_chain_move", Benchmark.time_markov_chain, "attempts/s", True),
+            ("calculate_energy", Benchmark.time_measurement, "s/sample", False),
+            ("measurement_workspace", Benchmark.time_measurement_workspace, "s/sample", False),
+            ("label_ring", Benchmark.time_label_ring, "s/snapshot", False),
+            ("ising_matrix_to_graph", Benchmark.time_graph, "s/snapshot", False),
+            ("spin_graph_adjacency", Benchmark.time_sparse_graph, "s/snapshot", False),
+        ]
+        results: List[Dict] = []
+        for dimension in sizes:
+            for name, function, unit, higher_is_better in metrics:
+                values = [function(dimension, min_time=min_time) for _ in range(repeat)]
+                results.append(
+                    {
+                        "benchmark": name,
+                        "dimension": int(dimension),
+                        "value": max(values) if higher_is_better else min(values),
+                        "unit": unit,
+                        "higher_is_better": higher_is_better,
+                    }
+                )
+
+        return {
+            "meta": {
+                "version": __version__,
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "machine": platform.machine(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "min_time": min_time,
+                "repeat": repeat,
+            },
+            "results": results,
+        }
+
+    @staticmethod
+    def write_json(results: Dict, file_name: str) -> None:
+        """Write benchmark results to a JSON file.
+
+        Args:
+            results (Dict): Results as returned by Benchmark.run.
+            file_name (str): The name of the JSON file.
+        """
+        with open(file_name, mode="w", encoding="utf-8") as json_file:
+            json.dump(results, json_file, indent=2)
+
+    @staticmethod
+    def read_json(file_name: str) -> Dict:
+        """Read benchmark results from a JSON file.
+
+        Args:
+            file_name (str): The name of the JSON file.
+
+        Returns:
+            Dict: Results as returned by Benchmark.run.
+        """
+        with open(file_name, mode="r", encoding="utf-8") as json_file:
+            return json.load(json_file)
+
+    @staticmethod
+    def compare(baseline: Dict, current: Dict, tolerance: float = 0.1) -> List[Dict]:
+        """Compare two benchmark results and list the regressions.
+
+        Args:
+            baseline (Dict): Results of the reference commit.
+            current (Dict): Results of the commit under test.
+            tolerance (float, optional): Relative slowdown allowed before reporting a regression. Defaults to 0.1.
+
+        Returns:
+            List[Dict]: One entry per benchmark that got slower than the tolerance allows.
+        """
+        reference = {
+            (entry["benchmark"], entry["dimension"]): entry for entry in baseline["results"]
+        }
+        regressions: List[Dict] = []
+        for entry in current["results"]:
+            old = reference.get((entry["benchmark"], entry["dimension"]))
+            if old is None or old["value"] == 0:
+                continue
+            ratio = entry["value"] / old["value"]
+            # Express the change as a slowdown regardless of the unit direction.
+            slowdown = 1 / ratio - 1 if entry["higher_is_better"] else ratio - 1
+            if slowdown > tolerance:
+                regressions.append(
+                    {
+                        "benchmark": entry["benchmark"],
+                        "dimension": entry["dimension"],
+                        "baseline": old["value"],
+                        "current": entry["value"],
+                        "unit": entry["unit"],
+                        "slowdown": slowdown,
+                    }
+                )
+        return regressions
@@ -0,0 +1,244 @@
+"""Module providing a checkerboard Metropolis engine updating horizontal strips of the lattice on a thread pool."""
+# Copyright (C) 2023, Erick Jesús Ríos González
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor,
+# Boston, MA  02110-1301, USA.
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List
+
+import numpy as np
+
+from src.isingenerator.lattice_square import LatticeSquare
+
+
+class _Strip:
+    """Rows [start, stop) of the lattice with the buffers used to update them."""
+
+    def __init__(self, start: int, stop: int, columns: int, seed: int) -> None:
+        self.start = start
+        self.stop = stop
+        height = stop - start
+        self.neighbors = np.empty((height, columns), dtype=np.int8)
+        self.delta_e = np.empty((height, columns), dtype=np.int8)
+        self.index = np.empty((height, columns), dtype=np.intp)
+        self.probability = np.empty((height, columns), dtype=np.float64)
+        self.random = np.empty((height, columns), dtype=np.float64)
+        self.accepted = np.empty((height, columns), dtype=bool)
+        parity = (np.arange(start, stop)[:, None] + np.arange(columns)[None, :]) % 2
+        self.colors = (parity == 0, parity == 1)
+        self.generator = np.random.default_rng(seed)
+
+
+class CheckerboardEngine:
+    """Engine making checkerboard Metropolis sweeps, each colour updated strip by strip on a thread pool.
+
+    Sites of one colour only have neighbours of the other colour, so all of them can be updated
+    at once: every strip reads its own rows plus one halo row above and below (wrapping around
+    the periodic boundary) and writes only its own rows. The two colours are separated by a
+    barrier. The NumPy kernels release the GIL, so the strips run in parallel on threads.
+
+    The chain differs from the single spin-flip one: an attempt is one site of a sweep, sites are
+    visited in colour order instead of at random, and the random numbers come from one generator
+    per strip seeded from np.random, so results depend on the number of strips but not on the
+    number of threads.
+    """
+
+    # The spins can live in a memory-mapped file, see the memmap option and CheckerboardEngine.file_name.
+    MEMORY_MAPPED = True
+
+    def __init__(
+        self,
+        lattice: LatticeSquare,
+        beta: float,
+        threads: int = None,
+        strips: int = None,
+        memmap: str = None,
+        **options: Any,
+    ) -> None:
+        """Initialize an instance of CheckerboardEngine.
+
+        Args:
+            lattice (LatticeSquare): The lattice with its spin matrix already created. Its rows and columns
+                must be even for the colours to alternate across the periodic boundary.
+            beta (float): One divided Boltzmann constant times temperature.
+            threads (int, optional): Number of threads. Defaults to the number of CPUs.
+            strips (int, optional): Number of horizontal strips. Defaults to the number of threads.
+            memmap (str, optional): File backing the spin matrix. An existing file of the right size is used
+                as the initial state, otherwise it is created from the matrix of the lattice. The lattice
+                then refers to the memory-mapped matrix. Defaults to None, the matrix stays in memory.
+            **options (Any): Options of other engines, ignored.
+
+        Raises:
+            ValueError: If the number of rows or columns is odd.
+
+        Example:
+            >>> engine = Engines.create("checkerboard", lattice, 1 / 2.27, threads=8)
+            >>> engine.advance(100 * 4096 * 4096)
+        """
+        matrix = getattr(lattice, "_matrix")
+        rows, columns = matrix.shape
+        if rows % 2 or columns % 2:
+            raise ValueError(f"The checkerboard engine needs an even number of rows and columns, got {rows}x{columns}")
+        if memmap is not None:
+            matrix = CheckerboardEngine._memory_map(memmap, matrix)
+        elif matrix.dtype != np.int8:
+            matrix = matrix.astype(np.int8)
+        setattr(lattice, "_matrix", matrix)
+
+        threads = (os.cpu_count() or 1) if threads is None else threads
+        strips = min(threads if strips is None else strips, rows)
+        bounds = np.linspace(0, rows, strips + 1).astype(int)
+        seeds = np.random.randint(0, 2**31 - 1, size=strips)
+        self._strips: List[_Strip] = [
+            _Strip(bounds[i], bounds[i + 1], columns, seeds[i]) for i in range(strips)
+        ]
+        self._lattice = lattice
+        self._matrix = matrix
+        self._sites = rows * columns
+        self._executor = ThreadPoolExecutor(max_workers=threads) if threads > 1 and strips > 1 else None
+        # Acceptance probability indexed by delta_e + 8, 1 for the flips lowering the energy.
+        self._acceptance = np.minimum(1.0, np.exp(-beta * np.arange(-8, 9, dtype=np.float64)))
+        self._color = 0
+        self._pending = 0
+
+    @staticmethod
+    def _memory_map(path: str, matrix: np.ndarray) -> np.memmap:
+        """Return a memory-mapped int8 spin matrix of the shape of matrix, initialized from it if new."""
+        size = matrix.shape[0] * matrix.shape[1]
+        if os.path.exists(path) and os.path.getsize(path) == size:
+            return np.memmap(path, dtype=np.int8, mode="r+", shape=matrix.shape)
+        mapped = np.memmap(path, dtype=np.int8, mode="w+", shape=matrix.shape)
+        mapped[:] = matrix
+        mapped.flush()
+        return mapped
+
+    @staticmethod
+    def file_name(directory: str, kT: float, B: float, dimension: int) -> str:
+        """Return the file backing the spin matrix of a point in a memory-map directory."""
+        return os.path.join(directory, "lattice_{:.5f}_{:.5f}_{}.bin".format(kT, B, dimension))
+
+    @staticmethod
+    def random_memmap(path: str, rows: int, columns: int, percentage_ones: float = 0.8, block_rows: int = 1024) -> np.memmap:
+        """Create a memory-mapped random spin matrix block by block, for lattices that do not fit in memory.
+
+        Each spin is positive with probability percentage_ones, drawn from np.random.
+
+        Args:
+            path (str): File of the matrix.
+            rows (int): Number of rows.
+            columns (int): Number of columns.
+            percentage_ones (float, optional): Probability of a positive spin. Defaults to 0.8.
+            block_rows (int, optional): Rows drawn at a time. Defaults to 1024.
+
+        Returns:
+            np.memmap: The spin matrix, to be set as the _matrix of a LatticeSquare.
+        """
+        mapped = np.memmap(path, dtype=np.int8, mode="w+", shape=(rows, columns))
+        for start in range(0, rows, block_rows):
+            stop = min(start + block_rows, rows)
+            block = np.random.random((stop - start, columns)) < percentage_ones
+            mapped[start:stop] = np.where(block, 1, -1)
+        mapped.flush()
+        return mapped
+
+    def _update_strip(self, strip: _Strip, color: int) -> np.ndarray:
+        """Make one Metropolis attempt on every site of a colour in a strip.
+
+        Returns:
+            np.ndarray: Number of attempts and acceptances per class of energy change.
+        """
+        matrix = self._matrix
+        rows = matrix.shape[0]
+        spins = matrix[strip.start:strip.stop]
+        # The halo rows belong to the strips above and below, wrapping around the periodic boundary.
+        # They are read while those strips update them, but only their sites of the other colour,
+        # which nobody writes during this half sweep, enter the energy changes used here.
+        above = matrix[(strip.start - 1) % rows]
+        below = matrix[strip.stop % rows]
+
+        neighbors = strip.neighbors
+        np.copyto(neighbors[1:], spins[:-1])
+        np.copyto(neighbors[:1], above)
+        np.add(neighbors[:-1], spins[1:], out=neighbors[:-1])
+        np.add(neighbors[-1:], below, out=neighbors[-1:])
+        np.add(neighbors[:, :-1], spins[:, 1:], out=neighbors[:, :-1])
+        np.add(neighbors[:, -1:], spins[:, :1], out=neighbors[:, -1:])
+        np.add(neighbors[:, 1:], spins[:, :-1], out=neighbors[:, 1:])
+        np.add(neighbors[:, :1], spins[:, -1:], out=neighbors[:, :1])
+
+        delta_e = strip.delta_e
+        np.multiply(spins, neighbors, out=delta_e)
+        np.multiply(delta_e, 2, out=delta_e)
+        np.add(delta_e, 8, out=strip.index)
+        np.take(self._acceptance, strip.index, out=strip.probability)
+        strip.generator.random(out=strip.random)
+        np.less(strip.random, strip.probability, out=strip.accepted)
+        np.logical_and(strip.accepted, strip.colors[color], out=strip.accepted)
+
+        np.negative(spins, out=spins, where=strip.accepted)
+
+        classes = strip.index[strip.colors[color]] // 4
+        return np.stack((
+            np.bincount(classes, minlength=5),
+            np.bincount(strip.index[strip.accepted] // 4, minlength=5),
+        ))
+
+    def _half_sweep(self, observer: Any) -> None:
+        """Update every site of the current colour, then switch colour."""
+        color = self._color
+        if self._executor is None:
+            counts = [self._update_strip(strip, color) for strip in self._strips]
+        else:
+            counts = list(self._executor.map(lambda strip: self._update_strip(strip, color), self._strips))
+        self._color = 1 - color
+        add_counts = getattr(observer, "add_counts", None)
+        if add_counts is not None:
+            total = np.sum(counts, axis=0)
+            add_counts(total[0].tolist(), total[1].tolist())
+
+    def advance(self, attempts: int, observer: Any = None) -> np.ndarray:
+        """Make a number of spin-flip attempts, grouped in half sweeps of one colour.
+
+        Attempts that do not complete a half sweep are carried over to the next call.
+
+        Args:
+            attempts (int): Number of attempts.
+            observer (Any, optional): Object with an add_counts(attempted, accepted) method receiving the
+                counts per class of energy change, such as FlipStatistics. Defaults to None.
+
+        Returns:
+            np.ndarray: The spin matrix after the attempts.
+        """
+        self._pending += attempts
+        half = self._sites // 2
+        while self._pending >= half:
+            self._half_sweep(observer)
+            self._pending -= half
+        return self._matrix
+
+    def close(self) -> None:
+        """Stop the threads and flush a memory-mapped matrix."""
+        # The attributes are missing when __init__ raised.
+        if getattr(self, "_executor", None) is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if isinstance(getattr(self, "_matrix", None), np.memmap):
+            self._matrix.flush()
+
+    def __del__(self) -> None:
+        """Stop the threads when the engine is collected."""
+        self.close()
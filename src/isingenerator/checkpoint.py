@@ -0,0 +1,84 @@
+"""Module providing a class to resume interrupted sweeps of the 2D Ising Model."""
+# Copyright (C) 2023, Erick Jesús Ríos González
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor,
+# Boston, MA  02110-1301, USA.
+
+import os
+from typing import Set
+
+
+class Checkpoint:
+    """Class recording the (kT, B) points of a sweep that are already written to the output file."""
+
+    def __init__(self, directory: str, file_name: str) -> None:
+        """Initialize an instance of Checkpoint, creating the directory if needed.
+
+        Args:
+            directory (str): The checkpoint directory.
+            file_name (str): The name of the output file of the sweep.
+
+        Example:
+            >>> checkpoint = Checkpoint("checkpoints", "640000_64_48.csv")
+            >>> checkpoint.mark_done(2.2, 0.0)
+            >>> checkpoint.is_done(2.2, 0.0)
+            True
+        """
+        os.makedirs(directory, exist_ok=True)
+        self._path = os.path.join(directory, os.path.basename(file_name) + ".checkpoint")
+        self._done: Set[str] = set()
+        if os.path.exists(self._path):
+            with open(self._path, mode="r", encoding="utf-8") as checkpoint_file:
+                # A line without its newline was being written when the run stopped.
+                self._done = {line[:-1] for line in checkpoint_file if line.endswith("\n")}
+
+    @staticmethod
+    def key(kT: float, B: float) -> str:
+        """Return the key of a point, using the precision of the output files."""
+        return "{:.5f},{:.5f}".format(kT, B)
+
+    def has_header(self) -> bool:
+        """Return True if the header of the output file was recorded as written."""
+        return "header" in self._done
+
+    def mark_header(self) -> None:
+        """Record the header of the output file as written."""
+        self._append("header")
+
+    def is_done(self, kT: float, B: float) -> bool:
+        """Return True if the point was recorded as written.
+
+        Args:
+            kT (float): Temperature of the point.
+            B (float): Magnetic field of the point.
+        """
+        return Checkpoint.key(kT, B) in self._done
+
+    def mark_done(self, kT: float, B: float) -> None:
+        """Record a point as written, flushing it to disk before returning.
+
+        Args:
+            kT (float): Temperature of the point.
+            B (float): Magnetic field of the point.
+        """
+        self._append(Checkpoint.key(kT, B))
+
+    def _append(self, key: str) -> None:
+        """Append a key to the checkpoint file and flush it to disk."""
+        with open(self._path, mode="a", encoding="utf-8") as checkpoint_file:
+            checkpoint_file.write(key + "\n")
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        self._done.add(key)
@@ -0,0 +1,188 @@
+"""Module providing the block-spin coarse graining of spin matrices and a store of coarse-grained samples."""
+# Copyright (C) 2023, Erick Jesús Ríos González
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor,
+# Boston, MA  02110-1301, USA.
+
+import os
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+class BlockSpin:
+    """Static class coarse graining spin matrices with the majority rule.
+
+    A block of b x b spins becomes the sign of its sum. A tie, possible when b is even, takes the
+    spin of the top left site of the block, so the coarse graining is deterministic and does not
+    draw random numbers from the chain.
+    """
+
+    @staticmethod
+    def block_sums(matrix: np.ndarray, factor: int) -> np.ndarray:
+        """Return the sum of the spins of every factor x factor block.
+
+        Args:
+            matrix (np.ndarray): A 2D array, whose sides are multiples of factor.
+            factor (int): Side of the blocks.
+
+        Returns:
+            np.ndarray: The sums, of shape (rows // factor, columns // factor), in int32.
+        """
+        rows, columns = matrix.shape
+        return matrix.reshape(rows // factor, factor, columns // factor, factor).sum(axis=(1, 3), dtype=np.int32)
+
+    @staticmethod
+    def majority(matrix: np.ndarray, sums: np.ndarray, factor: int) -> np.ndarray:
+        """Return the block spins of a matrix from the sums of its blocks.
+
+        Args:
+            matrix (np.ndarray): The spin matrix, of ±1 values.
+            sums (np.ndarray): The sums of its factor x factor blocks, see BlockSpin.block_sums.
+            factor (int): Side of the blocks.
+
+        Returns:
+            np.ndarray: The coarse-grained spins, in int8.
+        """
+        coarse = np.sign(sums).astype(np.int8)
+        ties = coarse == 0
+        coarse[ties] = matrix[::factor, ::factor][ties]
+        return coarse
+
+    @staticmethod
+    def coarse_grain(matrix: np.ndarray, factor: int) -> np.ndarray:
+        """Coarse grain a spin matrix with factor x factor blocks.
+
+        Args:
+            matrix (np.ndarray): The spin matrix, of ±1 values, whose sides are multiples of factor.
+            factor (int): Side of the blocks.
+
+        Returns:
+            np.ndarray: The coarse-grained spins, in int8.
+
+        Example:
+            >>> BlockSpin.coarse_grain(np.array([[1, 1], [1, -1]]), 2)
+            array([[1]], dtype=int8)
+        """
+        return BlockSpin.majority(matrix, BlockSpin.block_sums(matrix, factor), factor)
+
+    @staticmethod
+    def pyramid(matrix: np.ndarray, factors: Sequence[int]) -> Dict[int, np.ndarray]:
+        """Coarse grain a spin matrix at several block sizes.
+
+        The block sums of a factor are reduced from those of the largest smaller factor dividing it,
+        so 2, 4 and 8 cost little more than 2 alone. A factor of 1 gives the matrix itself.
+
+        Args:
+            matrix (np.ndarray): The spin matrix, of ±1 values.
+            factors (Sequence[int]): The block sides.
+
+        Returns:
+            Dict[int, np.ndarray]: The coarse-grained spins of every factor, in int8.
+        """
+        sums: Dict[int, np.ndarray] = {1: matrix}
+        levels = {}
+        for factor in sorted(set(factors)):
+            base = max(previous for previous in sums if factor % previous == 0)
+            sums[factor] = BlockSpin.block_sums(sums[base], factor // base)
+            levels[factor] = BlockSpin.majority(matrix, sums[factor], factor) if factor > 1 else matrix.astype(np.int8)
+        return levels
+
+    @staticmethod
+    def check_factors(shape: Tuple[int, int], factors: Sequence[int]) -> None:
+        """Check that the block sides divide the sides of the lattice.
+
+        Raises:
+            ValueError: If a factor is not positive or does not divide both sides.
+        """
+        for factor in factors:
+            if factor < 1 or shape[0] % factor or shape[1] % factor:
+                raise ValueError(f"Block size {factor} does not divide the lattice of shape {shape[0]}x{shape[1]}")
+
+
+class SnapshotPyramid:
+    """Class collecting the coarse-grained spins of the samples of a point and saving them to a .npz file.
+
+    Only the requested levels are kept, as int8 arrays of shape (samples, rows // factor, columns // factor)
+    named "level_<factor>", so an 8x pyramid of a 1024 x 1024 lattice stores 128 x 128 spins per sample.
+    """
+
+    def __init__(self, shape: Tuple[int, int], factors: Sequence[int] = (2, 4, 8)) -> None:
+        """Initialize an empty instance of SnapshotPyramid.
+
+        Args:
+            shape (Tuple[int, int]): Shape of the spin matrices.
+            factors (Sequence[int], optional): The block sides to keep, 1 for the full matrices. Defaults to (2, 4, 8).
+
+        Raises:
+            ValueError: If a factor does not divide the sides of the lattice.
+
+        Example:
+            >>> pyramid = SnapshotPyramid((64, 64), (4, 8))
+            >>> for sample in MainSimulation.iter_samples(640000, 2.27, 64, epsilon=4096):
+            ...     pyramid.add(sample.matrix)
+            >>> pyramid.save("snapshots.npz")
+        """
+        BlockSpin.check_factors(shape, factors)
+        self.shape = tuple(shape)
+        self.factors = sorted(set(factors))
+        self._levels: Dict[int, List[np.ndarray]] = {factor: [] for factor in self.factors}
+
+    def add(self, matrix: np.ndarray) -> None:
+        """Coarse grain one sample and keep its levels.
+
+        Args:
+            matrix (np.ndarray): The spin matrix. It may be modified afterwards, the levels are copies.
+        """
+        for factor, coarse in BlockSpin.pyramid(matrix, self.factors).items():
+            self._levels[factor].append(coarse)
+
+    def levels(self) -> Dict[int, np.ndarray]:
+        """Return the samples of every level stacked in one array."""
+        return {
+            factor: np.array(samples, dtype=np.int8).reshape(-1, self.shape[0] // factor, self.shape[1] // factor)
+            for factor, samples in self._levels.items()
+        }
+
+    def save(self, file_name: str, **metadata: float) -> None:
+        """Save the levels to a NumPy .npz file.
+
+        Args:
+            file_name (str): The name of the file.
+            **metadata (float): Values stored next to the levels, such as kT and B.
+        """
+        np.savez_compressed(
+            file_name,
+            **{f"level_{factor}": samples for factor, samples in self.levels().items()},
+            **metadata,
+        )
+
+    @staticmethod
+    def load(file_name: str) -> Dict[int, np.ndarray]:
+        """Load the levels saved by SnapshotPyramid.save.
+
+        Args:
+            file_name (str): The name of the file.
+
+        Returns:
+            Dict[int, np.ndarray]: The samples of every level.
+        """
+        with np.load(file_name) as data:
+            return {int(name[len("level_"):]): data[name] for name in data.files if name.startswith("level_")}
+
+    @staticmethod
+    def file_name(directory: str, kT: float, B: float, dimension: int) -> str:
+        """Return the file of the snapshots of a point in a snapshot directory."""
+        return os.path.join(directory, "snapshots_{:.5f}_{:.5f}_{}.npz".format(kT, B, dimension))
@@ -0,0 +1,112 @@
+"""Module providing the spin-spin correlation function, the structure factor and the correlation length by FFT."""
+# Copyright (C) 2023, Erick Jesús Ríos González
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor,
+# Boston, MA  02110-1301, USA.
+
+import math
+from typing import Tuple
+
+import numpy as np
+
+
+class SpinCorrelation:
+    """Class averaging the structure factor of sampled spin matrices and deriving the correlations from it.
+
+    The structure factor S(k) = |sum_x s_x exp(-i k.x)|^2 / N of one matrix costs one real FFT,
+    O(L^2 log L), and its inverse transform is the periodic correlation function
+    G(r) = (1 / N) sum_x s_x s_{x+r}, for every r at once. Averaging S over the samples averages G.
+    """
+
+    def __init__(self, shape: Tuple[int, int]) -> None:
+        """Initialize an empty instance of SpinCorrelation.
+
+        Args:
+            shape (Tuple[int, int]): Shape of the spin matrices.
+
+        Example:
+            >>> correlation = SpinCorrelation((64, 64))
+            >>> for sample in MainSimulation.iter_samples(640000, 2.4, 64, epsilon=4096):
+            ...     correlation.add(sample.matrix)
+            >>> correlation.correlation_length()
+        """
+        self.shape = tuple(shape)
+        self.sites = self.shape[0] * self.shape[1]
+        # Half of the spectrum, the other half follows from S(-k) = S(k).
+        self._sum = np.zeros((self.shape[0], self.shape[1] // 2 + 1), dtype=np.float64)
+        self.samples = 0
+
+    def add(self, matrix: np.ndarray) -> None:
+        """Add the structure factor of one spin matrix.
+
+        Args:
+            matrix (np.ndarray): The spin matrix, of ±1 values.
+        """
+        transform = np.fft.rfft2(matrix)
+        self._sum += transform.real**2 + transform.imag**2
+        self.samples += 1
+
+    def structure_factor(self) -> np.ndarray:
+        """Return the mean structure factor S(k) on the half spectrum of numpy.fft.rfft2, S(0) = <M^2> / N."""
+        return self._sum / (self.samples * self.sites)
+
+    def correlation_function(self, connected: bool = True) -> np.ndarray:
+        """Return the mean periodic correlation function G(r).
+
+        Args:
+            connected (bool, optional): Subtract the square magnetization per site of every sample, so that G
+                decays to 0 at long distance in the ordered phase too. Defaults to True.
+
+        Returns:
+            np.ndarray: G[dy, dx] for every displacement, G[0, 0] being 1 minus the subtracted term.
+        """
+        structure_factor = self.structure_factor()
+        correlation = np.fft.irfft2(structure_factor, s=self.shape)
+        if connected:
+            correlation -= structure_factor[0, 0] / self.sites
+        return correlation
+
+    def radial_profile(self, connected: bool = True) -> np.ndarray:
+        """Return G averaged over the displacements of the same rounded minimum-image distance.
+
+        Args:
+            connected (bool, optional): See SpinCorrelation.correlation_function. Defaults to True.
+
+        Returns:
+            np.ndarray: G at the distances 0, 1, 2, ... up to the half diagonal of the lattice.
+        """
+        correlation = self.correlation_function(connected)
+        rows, columns = self.shape
+        dy = np.minimum(np.arange(rows), rows - np.arange(rows))[:, None]
+        dx = np.minimum(np.arange(columns), columns - np.arange(columns))[None, :]
+        distance = np.rint(np.sqrt(dy**2 + dx**2)).astype(np.intp)
+        return np.bincount(distance.ravel(), correlation.ravel()) / np.bincount(distance.ravel())
+
+    def correlation_length(self) -> float:
+        """Return the second-moment correlation length.
+
+        xi = sqrt(S(0) / S(k_min) - 1) / (2 sin(k_min / 2)), with k_min = 2 pi / L the smallest non-zero
+        wave vector, S(k_min) averaged over its horizontal and vertical directions. The lattice is
+        assumed square; on a rectangle L is the number of columns.
+
+        Returns:
+            float: The correlation length in lattice spacings, 0 when S(k_min) vanishes or no sample was added.
+        """
+        if self.samples == 0:
+            return 0.0
+        structure_factor = self.structure_factor()
+        smallest = (structure_factor[1, 0] + structure_factor[0, 1]) / 2
+        ratio = structure_factor[0, 0] / smallest - 1 if smallest > 0 else 0.0
+        return math.sqrt(max(ratio, 0.0)) / (2 * math.sin(math.pi / self.shape[1]))
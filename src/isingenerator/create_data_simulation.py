@@ -17,18 +17,74 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor,
 # Boston, MA  02110-1301, USA.
 
-from typing import Any, List, Dict
+import json
+import math
+from contextlib import nullcontext
+from functools import partial
+from typing import Any, Callable, Iterable, Iterator, List, Dict, Sequence, Tuple
 import numpy as np
 import os
 
 from src.isingenerator.main_simulation import MainSimulation
 from src.isingenerator.writer_csv import WriterCsv
-
+from src.isingenerator.writer_jsonl import WriterJsonl
+from src.isingenerator.benchmark import Benchmark
+from src.isingenerator.checkpoint import Checkpoint
+from src.isingenerator.dataset_catalog import DatasetCatalog
+from src.isingenerator.coarse_graining import BlockSpin
+from src.isingenerator.engines import Engines
+from src.isingenerator.grid_scheduler import GridScheduler, GridTask
+from src.isingenerator.work_leasing import WorkLeasing
+from src.isingenerator.adaptive_grid import AdaptiveGrid
+from src.isingenerator.observable_statistics import ObservableMoments
+from src.isingenerator.profiler import SimulationProfiler
+from src.isingenerator.progress import ProgressEvent, ProgressTracker
+
+
+
+def _simulate_task(
+    arguments: Dict, instrument: bool, task: GridTask, with_moments: bool = False
+) -> Tuple[List, SimulationProfiler, ObservableMoments]:
+    """Simulate one point of a sweep in a worker process.
+
+    Args:
+        arguments (Dict): The keyword arguments of MainSimulation.create_observables shared by every point,
+            "seed" being the seed of the sweep.
+        instrument (bool): Whether the point is profiled.
+        task (GridTask): The point to simulate.
+        with_moments (bool, optional): Whether the moments of the samples are accumulated. Defaults to False.
+
+    Returns:
+        Tuple[List, SimulationProfiler, ObservableMoments]: The row of the point, its profiler and its moments,
+            None when not requested.
+    """
+    kwargs = dict(arguments, kT=task.kT, B=task.B)
+    if kwargs["seed"] is None:
+        # Forked workers inherit the same NumPy generator state.
+        np.random.seed()
+    else:
+        kwargs["seed"] += task.index
+    profiler = SimulationProfiler() if instrument else None
+    moments = ObservableMoments(arguments["dimension"] ** 2) if with_moments else None
+    results = MainSimulation.create_observables(**kwargs, profiler=profiler, moments=moments)
+    return results, profiler, moments
 
 
 class CreateDataSimulation:
     """Class for creating the dataset from an Ising Model 2D using Monte Carlo and Markov Chains."""
 
+    COLUMNS_NAMES = [
+        "kT",
+        "B",
+        "energy",
+        "magnetization",
+        "Magnetization_per_site",
+        "domain_number",
+        "mean_domain_size",
+        "forman_ricci_curvature"
+    ]
+    OUTPUT_FORMATS = ("csv", "jsonl")
+
     def __init__(
         self,
         file_name: str,
@@ -45,7 +101,27 @@ class CreateDataSimulation:
         initial_step_B: float = None,
         final_step_B: float = None,
         delta_B: float = None,
-        
+        profile: bool = False,
+        progress: Callable[[ProgressEvent], None] = None,
+        progress_interval: float = 1.0,
+        engine: str = "metropolis",
+        engine_options: Dict = None,
+        workers: int = 1,
+        seed: int = None,
+        burn_in: float = 0.5,
+        output_format: str = "csv",
+        checkpoint_dir: str = None,
+        analysis_workers: int = 0,
+        histogram_dir: str = None,
+        correlation_length: bool = False,
+        catalog: str = None,
+        target_error: float = None,
+        relative_error: bool = False,
+        snapshot_dir: str = None,
+        snapshot_levels: Sequence[int] = (2, 4, 8),
+        incremental_domains: bool = False,
+        trajectory_dir: str = None,
+        memmap_dir: str = None,
     ) -> None:
         """Initialize an instance of CreateDataSimulation.
 
@@ -60,10 +136,47 @@ class CreateDataSimulation:
             J (float, optional): The constant of interaction between spins. Defaults to 1.0.
             mu (float, optional): The constant of magnetic moment. Defaults to 1.0.
             geometric_variables(boolean, optional): An optional parameter with o default value of False to calculate the Forman Ricci curvature.
+                The distribution of the curvature of every point is plotted next to the output file.
             epsilon (int, optional): An optional parameter with a default value of 15.
             initial_step_B (float, optional): The initial magnetic field. Defaults to None.
             final_step_B (float, optional): The final magnetic field. Defaults to None.
             delta_B (float, optional): The magnetic field step. Defaults to None.
+            profile (bool, optional): Record the time per phase and the flip, sample and byte counters of the run
+                in a JSON file named after the CSV file with a ".profile.json" suffix. Defaults to False.
+            progress (Callable[[ProgressEvent], None], optional): Function receiving the progress events of the
+                sweep, such as ConsoleProgress(). Defaults to None.
+            progress_interval (float, optional): Minimum seconds between two progress events. Defaults to 1.0.
+            engine (str, optional): Name of the engine advancing the chain, see Engines.names(). Defaults to "metropolis".
+            engine_options (Dict, optional): Options passed to the engine. Defaults to None.
+            workers (int, optional): Number of processes simulating points in parallel. Defaults to 1.
+            seed (int, optional): Seed of the sweep, point i uses seed + i. Defaults to None.
+            burn_in (float, optional): Fraction of the steps discarded before sampling. Defaults to 0.5.
+            output_format (str, optional): "csv" or "jsonl". Defaults to "csv".
+            checkpoint_dir (str, optional): Directory recording the points already written, so an interrupted
+                sweep resumes where it stopped. Defaults to None.
+            analysis_workers (int, optional): Number of processes per point computing the domains of every sample,
+                and their curvature with geometric_variables, while the chain runs. Defaults to 0, no domains.
+            histogram_dir (str, optional): Directory, created if needed, receiving the (energy, magnetization)
+                histogram of every point for Reweighting. Defaults to None.
+            correlation_length (bool, optional): Add a correlation_length column, the second-moment correlation
+                length averaged over the samples of every point. Defaults to False.
+            catalog (str, optional): Index file of a DatasetCatalog, receiving the parameters, seed, engine and
+                code version of the sweep when it ends. Dataset names are relative to its directory.
+                Defaults to None.
+            target_error (float, optional): Stop every point once the binning errors of its energy and absolute
+                magnetization per site reach this value, steps being the cap, and add the steps_used,
+                energy_error and abs_magnetization_error columns. Defaults to None, every point runs all steps.
+            relative_error (bool, optional): Read target_error relative to the means. Defaults to False.
+            snapshot_dir (str, optional): Directory, created if needed, receiving the block-spin coarse-grained
+                samples of every point, see SnapshotPyramid. Defaults to None.
+            snapshot_levels (Sequence[int], optional): Block sides of the saved samples. Defaults to (2, 4, 8).
+            incremental_domains (bool, optional): Fill the domain_number and mean_domain_size columns from a
+                DomainTracker following the flips of the chain, instead of the analysis workers. Defaults to False.
+            trajectory_dir (str, optional): Directory, created if needed, receiving the log of the accepted flips
+                of every point, see TrajectoryRecorder, for an engine reporting single flips. Defaults to None.
+            memmap_dir (str, optional): Directory, created if needed, of the files backing the spin matrix of
+                every point, see CheckerboardEngine.file_name, for an engine that can memory-map it.
+                Defaults to None.
 
         Note:
             If initial_step_B, final_step_B, and delta_B are provided, the magnetic field parameters
@@ -96,6 +209,51 @@ class CreateDataSimulation:
         self._mu = mu
         self._epsilon = epsilon
         self._geometric_variables = geometric_variables
+        self._profile = profile
+        self._progress = progress
+        self._progress_interval = progress_interval
+        if engine not in Engines.names():
+            raise ValueError(f"Unknown engine '{engine}', expected one of: {', '.join(Engines.names())}")
+        if output_format not in CreateDataSimulation.OUTPUT_FORMATS:
+            raise ValueError(
+                f"Unknown output format '{output_format}', expected one of: {', '.join(CreateDataSimulation.OUTPUT_FORMATS)}"
+            )
+        self._engine = engine
+        self._engine_options = engine_options
+        self._workers = workers
+        self._seed = seed
+        self._burn_in = burn_in
+        self._output_format = output_format
+        self._checkpoint_dir = checkpoint_dir
+        self._analysis_workers = analysis_workers
+        self._histogram_dir = histogram_dir
+        self._correlation_length = correlation_length
+        self._catalog = catalog
+        self._target_error = target_error
+        self._relative_error = relative_error
+        self._snapshot_dir = snapshot_dir
+        self._snapshot_levels = list(snapshot_levels)
+        self._incremental_domains = incremental_domains
+        self._trajectory_dir = trajectory_dir
+        self._memmap_dir = memmap_dir
+        # Checkpoint of the output opened by start_output.
+        self._output_checkpoint: Checkpoint = None
+        if histogram_dir is not None:
+            os.makedirs(histogram_dir, exist_ok=True)
+        if snapshot_dir is not None:
+            BlockSpin.check_factors((dimension, dimension), snapshot_levels)
+            os.makedirs(snapshot_dir, exist_ok=True)
+        if trajectory_dir is not None:
+            if not Engines.reports_flips(engine):
+                raise ValueError(f"The {engine} engine does not report single flips, so its trajectory cannot be recorded")
+            os.makedirs(trajectory_dir, exist_ok=True)
+        if "memmap" in (engine_options or {}):
+            # Every point and worker would share the file, each point starting from the last state of another.
+            raise ValueError("A sweep cannot share one memmap file between its points, give memmap_dir instead")
+        if memmap_dir is not None:
+            if not Engines.memory_maps(engine):
+                raise ValueError(f"The {engine} engine cannot keep the spins in a memory-mapped file")
+            os.makedirs(memmap_dir, exist_ok=True)
         if (
             initial_step_B is not None
             and final_step_B is not None
@@ -213,83 +371,514 @@ class CreateDataSimulation:
     def generate_csv_data_nonzero_magnetic_field(self) -> str:
         """Generates a csv archive with the data of the simulation. This is for a non-zero external magnetic field.
 
+        Every (kT, B) point of the grid is written as its own row as soon as it is done.
+
         Returns:
             str: The name of the file created.
         """
-        # Create a list to store data.
-        data: List[float] = []
+        return self._generate_grid(self._B_values())
 
+    
+    def generate_csv_data_zero_magnetic_field(self) -> str:
+        """Generates a CSV archive with the data of the simulation. This is for a zero external magnetic field.
 
-        # Perform nested loops
-        for k_T in np.arange(
-            self._initial_step_kT, self._final_step_kT + self._delta_kT, self._delta_kT
-        ):
-            for B in np.arange(
-                self._initial_step_B, self._final_step_B + self._delta_B, self._delta_B
-            ):
-                data.append(
-                    MainSimulation.create_observables(
-                        self._steps,
-                        k_T,
-                        self._dimension,
-                        self._percentage_ones,
-                        self._J,
-                        B,
-                        self._mu,
-                        self._epsilon,
-                    )
-                )
+        Returns:
+            str: The name of the file created.
+        """
+        return self._generate_grid([self._B])
 
-        # Write data to CSV file
-        WriterCsv.write_data(self._file_name, data)
+    def _generate_grid(self, B_values: Sequence[float]) -> str:
+        """Simulate every (kT, B) point of the sweep and stream each row to the output file.
+
+        With more than one worker the rows are written in the order the points finish, and the file
+        is sorted into grid order once every point is done.
+
+        Args:
+            B_values (Sequence[float]): The magnetic fields of the grid.
+
+        Returns:
+            str: The name of the file created.
+        """
+        profiler = SimulationProfiler() if self._profile else None
+        self.start_output(profiler)
+
+        # Skip the points already written by an interrupted run
+        tasks = self.pending_tasks(B_values)
+        progress = self._progress_tracker(len(tasks))
+        for task, results, _ in self._run_tasks(tasks, progress, profiler):
+            self.append_row(results, task, profiler)
+
+        self._write_profile(profiler)
+        self.finalize_output(B_values=B_values)
 
         # Return the generated file
         return self._file_name
 
-    
-    def generate_csv_data_zero_magnetic_field(self) -> str:
-        """Generates a CSV archive with the data of the simulation. This is for a zero external magnetic field.
+    def generate_csv_data_adaptive(self, max_points: int, min_delta_kT: float = None, batch: int = None) -> str:
+        """Generates the data of a zero field sweep whose temperatures concentrate where the observables change.
+
+        The uniform grid of the sweep is simulated first. Then, until max_points points are done, the
+        intervals where the energy, the absolute magnetization or the susceptibility change fastest or
+        are the most uncertain are split at their midpoint, batch intervals at a time. Rows are written
+        as soon as they are done and the rows of the run are sorted by temperature at the end.
+
+        Args:
+            max_points (int): Total number of points, including the uniform grid.
+            min_delta_kT (float, optional): Smallest spacing between two temperatures. Defaults to delta_kT / 16.
+            batch (int, optional): Points added between two looks at the results. Defaults to the number of workers.
 
         Returns:
             str: The name of the file created.
+
+        Raises:
+            ValueError: If a magnetic field range was given.
+
+        Example:
+            >>> simulation = CreateDataSimulation("adaptive.csv", 100000, 1.0, 4.0, 0.5, 16, seed=1)
+            >>> simulation.generate_csv_data_adaptive(max_points=20)
+            'adaptive.csv'
         """
-        
-        COLUMNS_NAMES = [
-                    "kT",
-                    "B",
-                    "energy",
-                    "magnetization",
-                    "Magnetization_per_site",
-                    "domain_number",
-                    "mean_domain_size",
-                    "forman_ricci_curvature"
-                ]
-        
-        # Write column names in CSV file
-        WriterCsv.write_data(self._file_name, COLUMNS_NAMES)
-        
-        # Perform the nested loop
-        for k_T in np.arange(
-            self._initial_step_kT, self._final_step_kT + self._delta_kT, self._delta_kT
-        ):
-            
-            results = MainSimulation.create_observables(
-                    self._steps,
-                    k_T,
-                    self._dimension,
-                    self._percentage_ones,
-                    self._J,
-                    self._B,
-                    self._mu,
-                    self._epsilon,
-                    self._geometric_variables
-                )
-            # Write data to CSV file
-            WriterCsv.write_data(self._file_name, results)
-            
-        # Return the generated file
+        if self._is_field_sweep():
+            raise ValueError("Adaptive sweeps refine the temperature at a fixed magnetic field, do not give a B range")
+        min_delta_kT = self._delta_kT / 16 if min_delta_kT is None else min_delta_kT
+        batch = max(self._workers, 1) if batch is None else batch
+        profiler = SimulationProfiler() if self._profile else None
+        progress = self._progress_tracker(max_points)
+
+        self._write_header(profiler)
+
+        tasks = list(GridScheduler.tasks(self._kT_values()[:max_points], [self._B]))
+        points: List[Dict[str, float]] = []
+        while tasks:
+            for task, results, moments in self._run_tasks(tasks, progress, profiler, with_moments=True):
+                self._write_row(results, profiler)
+                points.append(moments.summary(task.kT))
+            points.sort(key=lambda point: point["kT"])
+
+            count = min(batch, max_points - len(points))
+            index = len(points)
+            tasks = [
+                GridTask(index + i, float(kT), float(self._B))
+                for i, kT in enumerate(AdaptiveGrid.refine(points, count, min_delta_kT))
+            ]
+
+        self._write_profile(profiler)
+        self.finalize_output(temperatures=[point["kT"] for point in points])
+        return self._file_name
+
+    def create_manifest(self, directory: str) -> int:
+        """Write the sweep as a task manifest in a shared directory, to be run by WorkLeasing workers.
+
+        Args:
+            directory (str): The shared directory.
+
+        Returns:
+            int: The number of tasks.
+        """
+        arguments = self.observable_arguments()
+        if self._geometric_variables:
+            # The workers plot the curvature in the shared directory, the sweep having no output file yet.
+            arguments["plot_dir"] = directory
+        catalog = None
+        if self._catalog is not None:
+            # shard-merge may run from another directory, so the index is recorded by its absolute path.
+            catalog = {
+                "index": os.path.abspath(self._catalog),
+                "record": self._catalog_record(self._sweep_B_values(), arguments=arguments),
+            }
+        return WorkLeasing.create_manifest(
+            directory,
+            arguments,
+            self._columns(),
+            GridScheduler.tasks(self._kT_values(), self._sweep_B_values()),
+            output_format=self._output_format,
+            catalog=catalog,
+        )
+
+    def estimate_cost(self, calibration_time: float = 0.2, points: int = None) -> Dict:
+        """Estimate the work and the wall time of the sweep without running it.
+
+        The estimate holds for every kind of sweep: zero field, field and adaptive. Each point is
+        timed on this machine with Benchmark.time_point, using the configured engine and the
+        per-sample work that is turned on, at the first, middle and last temperatures of the grid.
+        The timings are then interpolated over the grid. With analysis workers, a point takes
+        as long as the slower of the chain and the analysis. With target_error, the samples of a
+        point are the ones extrapolated from its calibration errors, capped by steps.
+
+        Args:
+            calibration_time (float, optional): Seconds spent measuring each calibration temperature. Defaults to 0.2.
+            points (int, optional): Number of points, such as the max_points of an adaptive sweep, each costing
+                the mean of the grid. Defaults to the size of the grid.
+
+        Returns:
+            Dict: Number of points, spin updates and samples, the measured rates, the calibration of every
+                temperature and the expected wall time.
+        """
+        B_points = len(self._B_values()) if self._is_field_sweep() else 1
+        B = float(self._B_values()[0]) if self._is_field_sweep() else self._B
+        kT_values = self._kT_values()
+        first_sample = math.ceil(self._steps * self._burn_in / self._epsilon) * self._epsilon
+        samples_per_point = self.samples_per_point()
+
+        arguments = dict(self.observable_arguments(), B=B)
+        calibration_kTs = sorted({
+            float(self._initial_step_kT), (self._initial_step_kT + self._final_step_kT) / 2, float(self._final_step_kT)
+        })
+        calibration = [
+            dict(Benchmark.time_point(kT, arguments, min_time=calibration_time), kT=kT) for kT in calibration_kTs
+        ]
+
+        def interpolate(key: str) -> np.ndarray:
+            return np.interp(kT_values, calibration_kTs, [point[key] for point in calibration])
+
+        seconds_per_attempt = interpolate("seconds_per_attempt")
+        seconds_per_sample = interpolate("seconds_per_sample")
+        analysis_seconds = interpolate("analysis_seconds_per_sample")
+        samples = np.full(len(kT_values), samples_per_point, dtype=float)
+        steps = np.full(len(kT_values), self._steps, dtype=float)
+        if self._target_error is not None:
+            needed = np.interp(kT_values, calibration_kTs, [
+                samples_per_point if point["samples_needed"] is None else point["samples_needed"]
+                for point in calibration
+            ])
+            samples = np.minimum(samples, np.ceil(needed))
+            steps = np.minimum(steps, first_sample + samples * self._epsilon)
+        point_seconds = steps * seconds_per_attempt + samples * seconds_per_sample
+        if self._analysis_workers > 0:
+            # The analysis runs on other processes while the chain keeps going.
+            point_seconds = np.maximum(point_seconds, samples * analysis_seconds / self._analysis_workers)
+
+        if points is None:
+            points = len(kT_values) * B_points
+        scale = points / len(kT_values)
+        parallel = max(1, min(self._workers, points))
+        return {
+            "engine": self._engine,
+            "points": points,
+            "spin_updates": int(round(scale * steps.sum())),
+            "samples": int(round(scale * samples.sum())),
+            "attempts_per_second": float(steps.sum() / (steps * seconds_per_attempt).sum()),
+            "seconds_per_sample": float((samples * seconds_per_sample).sum() / samples.sum()) if samples.sum() else 0.0,
+            "calibration": calibration,
+            "workers": parallel,
+            "estimated_seconds": float(scale * point_seconds.sum() / parallel),
+        }
+
+    def output_file(self) -> str:
+        """Return the name of the output file of the sweep."""
         return self._file_name
 
+    def samples_per_point(self) -> int:
+        """Return the number of samples of a point that runs every step."""
+        first_sample = math.ceil(self._steps * self._burn_in / self._epsilon) * self._epsilon
+        return len(range(first_sample, self._steps, self._epsilon))
+
+    def pending_tasks(self, B_values: Sequence[float] = None) -> List[GridTask]:
+        """Return the points of the sweep that the checkpoint does not record as written.
+
+        Args:
+            B_values (Sequence[float], optional): The magnetic fields of the grid. Defaults to those of the sweep.
+
+        Returns:
+            List[GridTask]: The points, in grid order.
+        """
+        checkpoint = self._checkpoint()
+        B_values = self._sweep_B_values() if B_values is None else B_values
+        return [
+            task for task in GridScheduler.tasks(self._kT_values(), B_values)
+            if checkpoint is None or not checkpoint.is_done(task.kT, task.B)
+        ]
+
+    def start_output(self, profiler: SimulationProfiler = None) -> None:
+        """Open the output of a run, writing the header unless the checkpoint records it already.
+
+        A resumed run first drops the last line of the file if the interrupted run left it incomplete.
+
+        Args:
+            profiler (SimulationProfiler, optional): The profiler of the run. Defaults to None.
+        """
+        self._output_checkpoint = self._checkpoint()
+        if self._output_checkpoint is not None and os.path.exists(self._file_name):
+            with open(self._file_name, mode="rb+") as output_file:
+                content = output_file.read()
+                if content and not content.endswith(b"\n"):
+                    output_file.truncate(content.rfind(b"\n") + 1)
+        if self._output_checkpoint is None or not self._output_checkpoint.has_header():
+            self._write_header(profiler)
+            if self._output_checkpoint is not None:
+                self._output_checkpoint.mark_header()
+
+    def append_row(self, row: List, task: GridTask = None, profiler: SimulationProfiler = None) -> None:
+        """Append the row of a point to the output opened by start_output, recording the point in the checkpoint.
+
+        The point is recorded once its row is written, so a run stopped in between writes the row again
+        when resumed; finalize_output keeps one row per point.
+
+        Args:
+            row (List): The row, as returned by MainSimulation.create_observables.
+            task (GridTask, optional): The point of the row, marked as done. Defaults to None.
+            profiler (SimulationProfiler, optional): The profiler of the run. Defaults to None.
+        """
+        self._write_row(row, profiler)
+        if self._output_checkpoint is not None and task is not None:
+            self._output_checkpoint.mark_done(task.kT, task.B)
+
+    def finalize_output(self, temperatures: Sequence[float] = None, B_values: Sequence[float] = None) -> None:
+        """Sort the rows of the output file by temperature and field and record the sweep in the catalog.
+
+        Every row is sorted, including those written by earlier sessions of a resumed sweep, and a
+        point written twice by a sweep stopped between its row and its checkpoint keeps one row, so
+        the file is the same as after an uninterrupted run.
+
+        Args:
+            temperatures (Sequence[float], optional): The temperatures of an adaptive sweep. Defaults to None,
+                the uniform grid.
+            B_values (Sequence[float], optional): The magnetic fields of the sweep. Defaults to those of the sweep.
+        """
+        self._sort_output()
+        self._register(self._sweep_B_values() if B_values is None else B_values, temperatures)
+
+    def _sweep_B_values(self) -> List[float]:
+        """Return the magnetic fields of the sweep, the single field of a zero-field sweep."""
+        return list(self._B_values()) if self._is_field_sweep() else [self._B]
+
+    def _is_field_sweep(self) -> bool:
+        """Return True if the magnetic field range was given."""
+        return getattr(self, "_delta_B", None) is not None
+
+    def _kT_values(self) -> np.ndarray:
+        """Return the temperatures of the sweep."""
+        return np.arange(
+            self._initial_step_kT, self._final_step_kT + self._delta_kT, self._delta_kT
+        )
+
+    def _checkpoint(self) -> Checkpoint:
+        """Return the checkpoint of the sweep, None if no checkpoint directory was given."""
+        if self._checkpoint_dir is None:
+            return None
+        return Checkpoint(self._checkpoint_dir, self._file_name)
+
+    def _B_values(self) -> np.ndarray:
+        """Return the magnetic fields of a field sweep."""
+        return np.arange(
+            self._initial_step_B, self._final_step_B + self._delta_B, self._delta_B
+        )
+
+    def observable_arguments(self) -> Dict:
+        """Return the keyword arguments of MainSimulation.create_observables shared by every point of the sweep."""
+        return {
+            "steps": self._steps,
+            "dimension": self._dimension,
+            "percentage_ones": self._percentage_ones,
+            "J": self._J,
+            "mu": self._mu,
+            "epsilon": self._epsilon,
+            "geometric_variables": self._geometric_variables,
+            "seed": self._seed,
+            "engine": self._engine,
+            "engine_options": self._engine_options,
+            "burn_in": self._burn_in,
+            "analysis_workers": self._analysis_workers,
+            "histogram_dir": self._histogram_dir,
+            "correlation_length": self._correlation_length,
+            "target_error": self._target_error,
+            "relative_error": self._relative_error,
+            "snapshot_dir": self._snapshot_dir,
+            "snapshot_levels": self._snapshot_levels,
+            "incremental_domains": self._incremental_domains,
+            "trajectory_dir": self._trajectory_dir,
+            "plot_dir": (os.path.dirname(self._file_name) or ".") if self._geometric_variables else None,
+            "memmap_dir": self._memmap_dir,
+        }
+
+    def _register(self, B_values: Sequence[float], temperatures: Sequence[float] = None) -> None:
+        """Record the sweep in the catalog, when one was given.
+
+        Args:
+            B_values (Sequence[float]): The magnetic fields of the sweep.
+            temperatures (Sequence[float], optional): The temperatures of an adaptive sweep. Defaults to None,
+                the uniform grid.
+        """
+        if self._catalog is None:
+            return
+        directory = os.path.dirname(self._catalog) or "."
+        DatasetCatalog(directory, self._catalog).register(self._file_name, **self._catalog_record(B_values, temperatures))
+
+    def _catalog_record(
+        self, B_values: Sequence[float], temperatures: Sequence[float] = None, arguments: Dict = None
+    ) -> Dict:
+        """Return the parameters of the sweep recorded in the catalog.
+
+        Args:
+            B_values (Sequence[float]): The magnetic fields of the sweep.
+            temperatures (Sequence[float], optional): The temperatures of an adaptive sweep. Defaults to None,
+                the uniform grid.
+            arguments (Dict, optional): The arguments of the points. Defaults to None, observable_arguments().
+
+        Returns:
+            Dict: The parameters passed to DatasetCatalog.register.
+        """
+        temperatures = self._kT_values() if temperatures is None else temperatures
+        return dict(
+            self.observable_arguments() if arguments is None else arguments,
+            kT_min=float(min(temperatures)),
+            kT_max=float(max(temperatures)),
+            delta_kT=self._delta_kT,
+            points=len(temperatures),
+            B_values=[float(B) for B in B_values],
+            output_format=self._output_format,
+            columns=self._columns(),
+        )
+
+    def _run_tasks(
+        self,
+        tasks: Iterable[GridTask],
+        progress: ProgressTracker = None,
+        profiler: SimulationProfiler = None,
+        with_moments: bool = False,
+    ) -> Iterator[Tuple[GridTask, List, ObservableMoments]]:
+        """Simulate the points of the sweep using the workers of the sweep.
+
+        Args:
+            tasks (Iterable[GridTask]): The points to simulate.
+            progress (ProgressTracker, optional): The progress tracker of the run. Defaults to None.
+            profiler (SimulationProfiler, optional): The profiler of the run. Defaults to None.
+            with_moments (bool, optional): Whether the moments of the samples are accumulated. Defaults to False.
+
+        Yields:
+            Tuple[GridTask, List, ObservableMoments]: Each point with its row and its moments, None when not
+                requested, as soon as it is done.
+        """
+        arguments = self.observable_arguments()
+
+        if self._workers <= 1:
+            def simulate(task: GridTask) -> Tuple[List, ObservableMoments]:
+                kwargs = dict(arguments, kT=task.kT, B=task.B)
+                if kwargs["seed"] is not None:
+                    # Every point gets its own seed so the results do not depend on the number of workers.
+                    kwargs["seed"] += task.index
+                if progress is not None:
+                    progress.start_point(task.kT, task.B)
+                moments = ObservableMoments(self._dimension ** 2) if with_moments else None
+                with profiler.point(task.kT, task.B) if profiler is not None else nullcontext():
+                    results = MainSimulation.create_observables(
+                        **kwargs, profiler=profiler, progress=progress, moments=moments
+                    )
+                if progress is not None:
+                    progress.finish_point(profiler.flips if profiler is not None else None)
+                return results, moments
+
+            for task, (results, moments) in GridScheduler.run(tasks, simulate):
+                yield task, results, moments
+            return
+
+        # The profiler of a point also carries the flip counters shown by the progress display.
+        instrument = profiler is not None or progress is not None
+        simulate = partial(_simulate_task, arguments, instrument, with_moments=with_moments)
+        for task, (results, point_profiler, moments) in GridScheduler.run(tasks, simulate, self._workers):
+            if profiler is not None:
+                profiler.merge(point_profiler)
+            if progress is not None:
+                progress.start_point(task.kT, task.B)
+                progress.flips.merge(point_profiler.flips)
+                progress.finish_point()
+            yield task, results, moments
+
+    def _progress_tracker(self, total_points: int) -> ProgressTracker:
+        """Create the progress tracker of a sweep, None if no progress callback was given.
+
+        Args:
+            total_points (int): Number of points of the sweep.
+
+        Returns:
+            ProgressTracker: The tracker passed to every point of the sweep.
+        """
+        if self._progress is None:
+            return None
+        return ProgressTracker(
+            self._progress,
+            total_points,
+            self._steps,
+            self._dimension,
+            self._progress_interval,
+        )
+
+    def _columns(self) -> List[str]:
+        """Return the column names of the rows of the sweep."""
+        columns = list(CreateDataSimulation.COLUMNS_NAMES)
+        if not self._geometric_variables:
+            # The Forman-Ricci curvature column only exists when the geometric variables are computed.
+            columns.pop()
+        if self._correlation_length:
+            columns.append("correlation_length")
+        if self._target_error is not None:
+            columns.extend(("steps_used", "energy_error", "abs_magnetization_error"))
+        if Engines.is_microcanonical(self._engine):
+            # The kT column is the nominal temperature of the point, this one the temperature of the demons.
+            columns.append("measured_kT")
+        return columns
+
+    def _write_header(self, profiler: SimulationProfiler = None) -> None:
+        """Write the column names, only the CSV format has a header line.
+
+        Args:
+            profiler (SimulationProfiler, optional): The profiler of the run. Defaults to None.
+        """
+        if self._output_format == "csv":
+            self._write_row(self._columns(), profiler)
+
+    def _write_row(self, row: List, profiler: SimulationProfiler = None) -> None:
+        """Append a row to the output file, counting the time and bytes when profiling.
+
+        Args:
+            row (List): The values of the row.
+            profiler (SimulationProfiler, optional): The profiler of the run. Defaults to None.
+        """
+        if self._output_format == "jsonl":
+            write = lambda: WriterJsonl.write_data(
+                self._file_name,
+                {name: float(value) for name, value in zip(self._columns(), row)},
+            )
+        else:
+            write = lambda: WriterCsv.write_data(self._file_name, row)
+        if profiler is None:
+            write()
+            return
+        with profiler.phase("writing"):
+            profiler.count("bytes_written", write())
+        profiler.count("rows_written")
+
+    def _sort_output(self) -> None:
+        """Sort by temperature and field every row of the output file, leaving the CSV header first.
+
+        With a checkpoint, only the first row of every point is kept.
+        """
+        with open(self._file_name, mode="r+", encoding="utf-8", newline="") as output_file:
+            lines = output_file.read().splitlines(keepends=True)
+            header = lines[:1] if self._output_format == "csv" else []
+            # A sweep appended to an existing file repeats the header, which is kept once.
+            rows = [line for line in lines[len(header):] if line not in header]
+            if self._output_format == "csv":
+                point = lambda line: tuple(float(value) for value in line.split(",", 2)[:2])
+            else:
+                point = lambda line: (json.loads(line)["kT"], json.loads(line)["B"])
+            if self._checkpoint_dir is not None:
+                # The first row written for a point is kept, see append_row.
+                rows = list({Checkpoint.key(*point(line)): line for line in reversed(rows)}.values())
+            rows.sort(key=point)
+            output_file.seek(0)
+            output_file.writelines(header + rows)
+            output_file.truncate()
+
+    def _write_profile(self, profiler: SimulationProfiler = None) -> None:
+        """Write the JSON report of the run next to the CSV file when profiling.
+
+        Args:
+            profiler (SimulationProfiler, optional): The profiler of the run. Defaults to None.
+        """
+        if profiler is not None:
+            profiler.write_json(f"{self._file_name}.profile.json")
+
     def __getattribute__(self, _name: str) -> Any:
         """Retrieve the value of the specified attribute.
 
@@ -0,0 +1,212 @@
+"""Module providing a microcanonical engine with one Creutz demon per site, updated on the checkerboard."""
+# Copyright (C) 2023, Erick Jesús Ríos González
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor,
+# Boston, MA  02110-1301, USA.
+
+import math
+from typing import Any
+
+import numpy as np
+
+from src.isingenerator.exact_solution import OnsagerSolution
+from src.isingenerator.lattice_square import LatticeSquare
+
+
+class CreutzEngine:
+    """Engine keeping the energy of the spins plus demons constant, with Creutz's demon algorithm.
+
+    Every site carries a demon holding a non-negative integer energy. A flip changing the energy
+    of the spins by dE is accepted when the demon of the site can pay for it, dE <= d, and the
+    demon then keeps d - dE. There is no acceptance probability, no exponential and no random
+    number per attempt: the sites of one colour of the checkerboard are updated at once with
+    integer array operations. After every sweep the demons are shifted together by a random
+    offset, the only randomness of the chain, so that energy moves across the lattice.
+
+    The demons act as a heat bath: their energies follow exp(-d / kT), which gives the temperature
+    of the chain, see CreutzEngine.temperature. Energies count each bond once, with J = 1 and no field.
+    """
+
+    # The energy is fixed by the preparation and the temperature measured, see EngineValidation.
+    MICROCANONICAL = True
+
+    def __init__(self, lattice: LatticeSquare, beta: float, energy: float = None, **options: Any) -> None:
+        """Initialize an instance of CreutzEngine, preparing spins at the target energy.
+
+        The spins are set to 1 and heated by flipping random sites that raise the energy, colour by
+        colour, until no flip fits under the target. The demons start from their distribution at beta,
+        with their total set to its mean.
+
+        Args:
+            lattice (LatticeSquare): The lattice with its spin matrix already created, replaced by the prepared
+                one. Its rows and columns must be even for the colours to alternate across the periodic boundary.
+            beta (float): One divided Boltzmann constant times temperature, giving the initial demon energies.
+            energy (float, optional): Target energy of the spins per site. Defaults to None, the exact energy
+                of the infinite lattice at beta, see OnsagerSolution.energy.
+            **options (Any): Options of other engines, ignored.
+
+        Raises:
+            ValueError: If the number of rows or columns is odd, or the energy is outside [-2, 2].
+
+        Example:
+            >>> engine = Engines.create("creutz", lattice, 1 / 2.5, energy=-1.2)
+            >>> engine.advance(1000 * 64 * 64)
+            >>> engine.temperature()
+        """
+        matrix = getattr(lattice, "_matrix")
+        rows, columns = matrix.shape
+        if rows % 2 or columns % 2:
+            raise ValueError(f"The Creutz engine needs an even number of rows and columns, got {rows}x{columns}")
+        energy = OnsagerSolution.energy(1 / beta) if energy is None else energy
+        if not -2 <= energy <= 2:
+            raise ValueError(f"The energy per site must be between -2 and 2, got {energy}")
+        self._matrix = np.ones((rows, columns), dtype=np.int8)
+        setattr(lattice, "_matrix", self._matrix)
+        self._sites = rows * columns
+        self._neighbors = np.empty((rows, columns), dtype=np.int8)
+        self._delta_e = np.empty((rows, columns), dtype=np.int8)
+        self._accepted = np.empty((rows, columns), dtype=bool)
+        parity = (np.arange(rows)[:, None] + np.arange(columns)[None, :]) % 2
+        self._colors = (parity == 0, parity == 1)
+        self._heat(int(round(energy * self._sites)))
+
+        # Demon energies are multiples of 4, distributed as 4 * Geometric(1 - exp(-4 beta)).
+        self._demons = 4 * (np.random.geometric(-math.expm1(-4 * beta), size=(rows, columns)) - 1).astype(np.int32)
+        self._match_demon_total(round(self._sites / math.expm1(4 * beta)))
+        self._demon_sum = 0
+        self._demon_samples = 0
+        self._color = 0
+        self._pending = 0
+
+    def _compute_delta_e(self) -> np.ndarray:
+        """Compute the energy change of flipping every site, 2 * s * (sum of the neighbors), without allocating."""
+        spins, neighbors = self._matrix, self._neighbors
+        np.copyto(neighbors[1:], spins[:-1])
+        np.copyto(neighbors[:1], spins[-1:])
+        np.add(neighbors[:-1], spins[1:], out=neighbors[:-1])
+        np.add(neighbors[-1:], spins[:1], out=neighbors[-1:])
+        np.add(neighbors[:, :-1], spins[:, 1:], out=neighbors[:, :-1])
+        np.add(neighbors[:, -1:], spins[:, :1], out=neighbors[:, -1:])
+        np.add(neighbors[:, 1:], spins[:, :-1], out=neighbors[:, 1:])
+        np.add(neighbors[:, :1], spins[:, -1:], out=neighbors[:, :1])
+        np.multiply(spins, neighbors, out=self._delta_e)
+        np.multiply(self._delta_e, 2, out=self._delta_e)
+        return self._delta_e
+
+    def _heat(self, target: int) -> None:
+        """Flip random sites raising the energy of the spins from -2 * sites while it stays below a target."""
+        energy = -2 * self._sites
+        color = 0
+        stalled = 0
+        # Stop after a flip has failed to fit on both colours.
+        while stalled < 2:
+            delta_e = self._compute_delta_e().ravel()
+            candidates = np.flatnonzero(self._colors[color].ravel() & (delta_e > 0))
+            candidates = candidates[np.random.permutation(len(candidates))]
+            # Sites of one colour are independent, so any prefix of them can be flipped together.
+            fits = np.cumsum(delta_e[candidates], dtype=np.int64) <= target - energy
+            chosen = candidates[:np.argmin(fits) if not fits.all() else len(fits)]
+            if len(chosen):
+                self._matrix.ravel()[chosen] *= -1
+                energy += int(delta_e[chosen].sum(dtype=np.int64))
+                stalled = 0
+            else:
+                stalled += 1
+            color = 1 - color
+
+    def _match_demon_total(self, quanta: int) -> None:
+        """Add or remove quanta of 4 at random demons until they hold 4 * quanta in total.
+
+        The demons hold as much energy as the spins can exchange with them, so on small lattices the
+        fluctuation of their drawn total would shift the temperature of the chain noticeably.
+        """
+        demons = self._demons.ravel()
+        difference = quanta - int(demons.sum(dtype=np.int64)) // 4
+        while difference > 0:
+            np.add.at(demons, np.random.randint(0, self._sites, size=difference), 4)
+            difference = quanta - int(demons.sum(dtype=np.int64)) // 4
+        while difference < 0:
+            charged = np.flatnonzero(demons)
+            chosen = np.random.choice(charged, size=min(-difference, len(charged)), replace=False)
+            demons[chosen] -= 4
+            difference = quanta - int(demons.sum(dtype=np.int64)) // 4
+
+    def _half_sweep(self, observer: Any) -> None:
+        """Update every site of the current colour against its demon, then switch colour."""
+        color = self._color
+        delta_e = self._compute_delta_e()
+        np.less_equal(delta_e, self._demons, out=self._accepted)
+        np.logical_and(self._accepted, self._colors[color], out=self._accepted)
+        np.negative(self._matrix, out=self._matrix, where=self._accepted)
+        np.subtract(self._demons, delta_e, out=self._demons, where=self._accepted)
+        self._color = 1 - color
+        if color == 1:
+            shift = np.random.randint(0, self._matrix.shape)
+            self._demons = np.roll(self._demons, tuple(shift), axis=(0, 1))
+            self._demon_sum += int(self._demons.sum(dtype=np.int64))
+            self._demon_samples += self._sites
+        add_counts = getattr(observer, "add_counts", None)
+        if add_counts is not None:
+            index = delta_e.astype(np.intp) + 8
+            add_counts(
+                np.bincount(index[self._colors[color]] // 4, minlength=5).tolist(),
+                np.bincount(index[self._accepted] // 4, minlength=5).tolist(),
+            )
+
+    def advance(self, attempts: int, observer: Any = None) -> np.ndarray:
+        """Make a number of spin-flip attempts, grouped in half sweeps of one colour.
+
+        Attempts that do not complete a half sweep are carried over to the next call.
+
+        Args:
+            attempts (int): Number of attempts.
+            observer (Any, optional): Object with an add_counts(attempted, accepted) method receiving the
+                counts per class of energy change, such as FlipStatistics. Defaults to None.
+
+        Returns:
+            np.ndarray: The spin matrix after the attempts.
+        """
+        self._pending += attempts
+        half = self._sites // 2
+        while self._pending >= half:
+            self._half_sweep(observer)
+            self._pending -= half
+        return self._matrix
+
+    def reset_demon_energy(self) -> None:
+        """Restart the mean demon energy, e.g. after the burn-in or between blocks of sweeps."""
+        self._demon_sum = 0
+        self._demon_samples = 0
+
+    def demon_energy(self) -> float:
+        """Return the mean energy of a demon over the sweeps made, 0 before the first sweep."""
+        return self._demon_sum / self._demon_samples if self._demon_samples else 0.0
+
+    def temperature(self) -> float:
+        """Estimate the temperature from the mean demon energy.
+
+        The energies of a demon are 0, 4, 8, ... with weights exp(-d / kT), so its mean is
+        4 / (exp(4 / kT) - 1), inverted as kT = 4 / ln(1 + 4 / <d>).
+
+        Returns:
+            float: kT, 0 when the demons have no energy.
+        """
+        demon_energy = self.demon_energy()
+        return 4 / math.log1p(4 / demon_energy) if demon_energy > 0 else 0.0
+
+    def spin_energy(self) -> int:
+        """Return the energy of the spins, each bond counted once."""
+        delta_e = self._compute_delta_e()
+        return -int(delta_e.sum(dtype=np.int64)) // 4
@@ -0,0 +1,234 @@
+"""Module providing an index of the simulation datasets of a directory and a loader combining them."""
+# Copyright (C) 2023, Erick Jesús Ríos González
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor,
+# Boston, MA  02110-1301, USA.
+
+import glob
+import json
+import os
+import re
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from src.isingenerator.__about__ import __version__
+
+
+class DatasetCatalog:
+    """Class keeping one JSON record per dataset of a directory in an index file, and loading them together.
+
+    A record holds the file name relative to the directory, the parameters of the sweep, the seed,
+    the engine, the column names and the version of the code that wrote it. Records are appended
+    to the index, the last record of a file replacing the previous ones. Datasets written before
+    the catalog existed are added by DatasetCatalog.scan from their "<steps>_<L>_<epsilon>" names.
+    """
+
+    INDEX = "catalog.jsonl"
+    # Fields of the loaded rows taken from the record of their dataset.
+    RECORD_FIELDS = (("steps", np.int64), ("dimension", np.int64), ("epsilon", np.int64))
+    _LEGACY_NAME = re.compile(r"^(\d+)_(\d+)_(\d+)\.(csv|jsonl)$")
+
+    def __init__(self, directory: str = ".", index: str = None) -> None:
+        """Initialize an instance of DatasetCatalog, reading its index if it exists.
+
+        Args:
+            directory (str, optional): Directory of the datasets. Defaults to ".".
+            index (str, optional): Path of the index file. Defaults to "catalog.jsonl" in the directory.
+
+        Example:
+            >>> catalog = DatasetCatalog("data")
+            >>> catalog.scan()
+            >>> rows = catalog.load(dimension=68, kT_min=2.0, kT_max=2.5)
+            >>> rows["kT"], rows["energy"]
+        """
+        self._directory = directory
+        self._index = os.path.join(directory, DatasetCatalog.INDEX) if index is None else index
+        self._records: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(self._index):
+            with open(self._index, mode="r", encoding="utf-8") as index_file:
+                for line in index_file:
+                    # A line without its newline was being written when the run stopped.
+                    if line.endswith("\n"):
+                        record = json.loads(line)
+                        self._records[record["file"]] = record
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Return every record, sorted by file name."""
+        return [self._records[name] for name in sorted(self._records)]
+
+    def register(self, file_name: str, **parameters: Any) -> Dict[str, Any]:
+        """Add or replace the record of a dataset.
+
+        Args:
+            file_name (str): The dataset, absolute or relative to the current directory.
+            **parameters (Any): The parameters of the sweep, such as steps, dimension, epsilon, seed, engine or
+                columns, stored as they are; they must be JSON serializable.
+
+        Returns:
+            Dict[str, Any]: The record written.
+        """
+        record = dict(parameters)
+        record["file"] = os.path.relpath(file_name, self._directory)
+        record.setdefault("version", __version__)
+        record.setdefault("created", time.strftime("%Y-%m-%dT%H:%M:%S"))
+        directory = os.path.dirname(self._index)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self._index, mode="a", encoding="utf-8") as index_file:
+            index_file.write(json.dumps(record, sort_keys=True) + "\n")
+        self._records[record["file"]] = record
+        return record
+
+    def scan(self, pattern: str = "*_*_*.*") -> List[Dict[str, Any]]:
+        """Register the datasets of the directory named "<steps>_<L>_<epsilon>.csv" or ".jsonl" that have no record.
+
+        Their parameters come from the name and their columns from the file; the seed, the engine and
+        the version are unknown and recorded as None.
+
+        Args:
+            pattern (str, optional): Glob pattern of the candidate files in the directory. Defaults to "*_*_*.*".
+
+        Returns:
+            List[Dict[str, Any]]: The records added.
+        """
+        added = []
+        for path in sorted(glob.glob(os.path.join(self._directory, pattern))):
+            name = os.path.relpath(path, self._directory)
+            match = DatasetCatalog._LEGACY_NAME.match(os.path.basename(path))
+            if match is None or name in self._records:
+                continue
+            steps, dimension, epsilon, output_format = match.groups()
+            added.append(
+                self.register(
+                    path,
+                    steps=int(steps),
+                    dimension=int(dimension),
+                    epsilon=int(epsilon),
+                    output_format=output_format,
+                    columns=DatasetCatalog._read_columns(path, output_format),
+                    seed=None,
+                    engine=None,
+                    version=None,
+                    inferred=True,
+                )
+            )
+        return added
+
+    def find(self, **criteria: Any) -> List[Dict[str, Any]]:
+        """Return the records whose parameters equal the given values.
+
+        Args:
+            **criteria (Any): Parameter names and values, such as dimension=68 or engine="metropolis".
+
+        Returns:
+            List[Dict[str, Any]]: The matching records, sorted by file name.
+        """
+        return [
+            record for record in self.records()
+            if all(record.get(name) == value for name, value in criteria.items())
+        ]
+
+    def load(self, kT_min: float = None, kT_max: float = None, **criteria: Any) -> np.ndarray:
+        """Load the rows of every matching dataset into one structured array.
+
+        Every column of any matching dataset is a float64 field, NaN for the datasets without it,
+        followed by the steps, dimension and epsilon of the dataset of the row. The numbers of all
+        the CSV files with the same columns are parsed in one NumPy call.
+
+        Args:
+            kT_min (float, optional): Smallest temperature kept. Defaults to None, no bound.
+            kT_max (float, optional): Largest temperature kept. Defaults to None, no bound.
+            **criteria (Any): Parameters of the datasets, see DatasetCatalog.find.
+
+        Returns:
+            np.ndarray: The rows, those of one dataset contiguous and in the order of the file.
+        """
+        blocks: List[Tuple[List[str], np.ndarray, Dict[str, Any]]] = []
+        groups: Dict[Tuple[str, ...], List[Tuple[str, Dict[str, Any]]]] = {}
+        for record in self.find(**criteria):
+            path = os.path.join(self._directory, record["file"])
+            if record.get("output_format", "csv") == "jsonl":
+                columns = list(record["columns"])
+                with open(path, mode="r", encoding="utf-8") as jsonl_file:
+                    values = [[row.get(name, np.nan) for name in columns] for row in map(json.loads, jsonl_file)]
+                blocks.append((columns, np.array(values, dtype=np.float64).reshape(-1, len(columns)), record))
+                continue
+            with open(path, mode="r", encoding="utf-8") as csv_file:
+                header = csv_file.readline().rstrip("\r\n").split(",")
+                body = csv_file.read()
+            # Files written without the geometric variables have a header longer than their rows.
+            first_row = body.split("\n", 1)[0]
+            width = first_row.count(",") + 1 if first_row.strip() else len(header)
+            groups.setdefault(tuple(header[:width]), []).append((body, record))
+
+        for columns, members in groups.items():
+            text = " ".join(body for body, _ in members).replace(",", " ")
+            values = np.fromstring(text, dtype=np.float64, sep=" ")
+            counts = [len(body.split()) for body, _ in members]
+            if len(values) != sum(counts) * len(columns):
+                raise ValueError(f"Malformed rows in {', '.join(record['file'] for _, record in members)}")
+            values = values.reshape(-1, len(columns))
+            offset = 0
+            for rows, (_, record) in zip(counts, members):
+                blocks.append((list(columns), values[offset:offset + rows], record))
+                offset += rows
+
+        names: List[str] = []
+        for columns, _, _ in blocks:
+            names.extend(name for name in columns if name not in names)
+        dtype = [(name, np.float64) for name in names] + list(DatasetCatalog.RECORD_FIELDS)
+        result = np.empty(sum(len(values) for _, values, _ in blocks), dtype=dtype)
+        for name in names:
+            result[name] = np.nan
+        offset = 0
+        for columns, values, record in blocks:
+            part = result[offset:offset + len(values)]
+            for i, name in enumerate(columns):
+                part[name] = values[:, i]
+            for name, _ in DatasetCatalog.RECORD_FIELDS:
+                part[name] = record.get(name) if record.get(name) is not None else -1
+            offset += len(values)
+
+        if "kT" in names:
+            keep = np.ones(len(result), dtype=bool)
+            if kT_min is not None:
+                keep &= result["kT"] >= kT_min
+            if kT_max is not None:
+                keep &= result["kT"] <= kT_max
+            result = result[keep]
+        return result
+
+    def load_dataframe(self, kT_min: float = None, kT_max: float = None, **criteria: Any) -> Any:
+        """Load the rows like DatasetCatalog.load into a pandas DataFrame, pandas being imported only here.
+
+        Returns:
+            pandas.DataFrame: The rows.
+        """
+        import pandas
+
+        return pandas.DataFrame(self.load(kT_min, kT_max, **criteria))
+
+    @staticmethod
+    def _read_columns(path: str, output_format: str) -> List[str]:
+        """Return the column names of a dataset, matching the width of its rows."""
+        with open(path, mode="r", encoding="utf-8") as dataset:
+            if output_format == "jsonl":
+                first = dataset.readline()
+                return list(json.loads(first)) if first.strip() else []
+            header = dataset.readline().rstrip("\r\n").split(",")
+            first_row = dataset.readline()
+        return header[:first_row.count(",") + 1] if first_row.strip() else header
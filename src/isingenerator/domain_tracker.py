@@ -0,0 +1,197 @@
+"""Module providing the incremental maintenance of the domains of positive spins under single spin flips."""
+# Copyright (C) 2023, Erick Jesús Ríos González
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor,
+# Boston, MA  02110-1301, USA.
+
+from collections import deque
+from typing import Any, Dict, List, Set
+
+import numpy as np
+
+from src.isingenerator.neighbors import Neighbors
+from src.isingenerator.spin_graph import SpinGraph
+
+
+class DomainTracker:
+    """Class keeping the domains of TopologicalVariables.label_ring up to date while single spins flip.
+
+    The domains are the clusters of positive spins with periodic boundary conditions. Every site
+    has the label of its domain, and every domain the set of its sites. A spin becoming positive
+    joins the domains of its positive neighbors, the smaller ones being relabeled into the largest.
+    A spin becoming negative can only split its domain when it had two positive neighbors or more:
+    one breadth-first search per neighbor then runs in turns, searches that meet are merged, and a
+    group of searches that runs out of sites has found a separate domain, which gets a new label.
+    Once a single group is left it keeps the old label, so the work is bounded by the size of the
+    pieces split off, not by the size of the lattice.
+
+    The tracker is an observer of MonteCarloSimulation.markov_chain_move. Engines that do not report
+    single flips need DomainTracker.rebuild before every measurement.
+    """
+
+    def __init__(self, matrix: np.ndarray, observer: Any = None) -> None:
+        """Initialize an instance of DomainTracker from a spin matrix.
+
+        Args:
+            matrix (np.ndarray): The spin matrix, of ±1 values.
+            observer (Any, optional): Observer receiving the flip_event and add_counts calls after the tracker,
+                such as FlipStatistics. Defaults to None.
+
+        Example:
+            >>> tracker = DomainTracker(getattr(lattice, "_matrix"))
+            >>> engine = MetropolisEngine(lattice, 1 / 2.27)
+            >>> engine.advance(10000, tracker)
+            >>> tracker.domain_number(), tracker.mean_domain_size()
+        """
+        rows, columns = matrix.shape
+        self._columns = columns
+        self._table = Neighbors.table_tuples(rows, columns)
+        self._observer = observer
+        self.rebuild(matrix)
+
+    def rebuild(self, matrix: np.ndarray) -> None:
+        """Label the domains of a spin matrix from scratch.
+
+        Args:
+            matrix (np.ndarray): The spin matrix, of the shape of the tracker.
+        """
+        self._spins: List[int] = [int(spin) for spin in matrix.ravel()]
+        count, labels = SpinGraph.connected_components(matrix)
+        self._label: List[int] = labels.ravel().tolist()
+        self._members: Dict[int, Set[int]] = {label: set() for label in range(count)}
+        for site, label in enumerate(self._label):
+            if label >= 0:
+                self._members[label].add(site)
+        self._next_label = count
+        self._positive = sum(len(members) for members in self._members.values())
+
+    def flip_event(self, row: int, column: int, delta_e: int, accepted: bool) -> None:
+        """Update the domains after a flip attempt, see MonteCarloSimulation.markov_chain_move."""
+        if accepted:
+            self.flip(row * self._columns + column)
+        if self._observer is not None:
+            self._observer.flip_event(row, column, delta_e, accepted)
+
+    def add_counts(self, attempted: List[int], accepted: List[int]) -> None:
+        """Forward the counts of the engines updating many sites at once to the next observer."""
+        add_counts = getattr(self._observer, "add_counts", None)
+        if add_counts is not None:
+            add_counts(attempted, accepted)
+
+    def flip(self, site: int) -> None:
+        """Flip the spin of a site and update the domains.
+
+        Args:
+            site (int): Flat index of the site, row * columns + column.
+        """
+        self._spins[site] = -self._spins[site]
+        if self._spins[site] > 0:
+            self._join(site)
+        else:
+            self._leave(site)
+
+    def _join(self, site: int) -> None:
+        """Add a new positive site to the domains of its neighbors, merging them."""
+        labels = {self._label[neighbor] for neighbor in self._table[site] if self._spins[neighbor] > 0}
+        self._positive += 1
+        if not labels:
+            self._label[site] = self._next_label
+            self._members[self._next_label] = {site}
+            self._next_label += 1
+            return
+        target = max(labels, key=lambda label: len(self._members[label]))
+        members = self._members[target]
+        for label in labels:
+            if label != target:
+                for other in self._members[label]:
+                    self._label[other] = target
+                members |= self._members.pop(label)
+        self._label[site] = target
+        members.add(site)
+
+    def _leave(self, site: int) -> None:
+        """Remove a site that became negative from its domain, splitting the domain if needed."""
+        label = self._label[site]
+        self._label[site] = -1
+        self._positive -= 1
+        members = self._members[label]
+        members.discard(site)
+        if not members:
+            del self._members[label]
+            return
+        starts = list(dict.fromkeys(neighbor for neighbor in self._table[site] if self._spins[neighbor] > 0))
+        if len(starts) < 2:
+            return
+
+        spins, table = self._spins, self._table
+        # Search i owns the sites it reached first; parent merges the searches that met.
+        owner: Dict[int, int] = {start: i for i, start in enumerate(starts)}
+        parent = list(range(len(starts)))
+        queues = [deque([start]) for start in starts]
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        open_groups = set(range(len(starts)))
+        while len(open_groups) > 1:
+            for i, queue in enumerate(queues):
+                if not queue or find(i) not in open_groups:
+                    continue
+                current = queue.popleft()
+                for neighbor in table[current]:
+                    if spins[neighbor] < 0:
+                        continue
+                    reached = owner.get(neighbor)
+                    if reached is None:
+                        owner[neighbor] = i
+                        queue.append(neighbor)
+                    else:
+                        a, b = find(reached), find(i)
+                        if a != b:
+                            parent[a] = b
+                            open_groups.discard(a)
+            # A group whose searches have all stopped is a whole domain split off.
+            for group in list(open_groups):
+                if len(open_groups) > 1 and all(not queues[i] for i in range(len(starts)) if find(i) == group):
+                    open_groups.discard(group)
+                    self._split_off([other for other, i in owner.items() if find(i) == group], label)
+
+    def _split_off(self, sites: List[int], label: int) -> None:
+        """Move the sites of a piece of a domain to a new label."""
+        new_members = set(sites)
+        self._members[label] -= new_members
+        for other in sites:
+            self._label[other] = self._next_label
+        self._members[self._next_label] = new_members
+        self._next_label += 1
+
+    def domain_number(self) -> int:
+        """Return the number of domains."""
+        return len(self._members)
+
+    def mean_domain_size(self) -> float:
+        """Return the mean number of sites of the domains, 0 without domains."""
+        return self._positive / len(self._members) if self._members else 0.0
+
+    def domain_sizes(self) -> np.ndarray:
+        """Return the number of sites of every domain, sorted."""
+        return np.sort(np.array([len(members) for members in self._members.values()], dtype=np.int64))
+
+    def labels(self) -> np.ndarray:
+        """Return the matrix of the domain labels, -1 on the negative spins."""
+        return np.array(self._label, dtype=np.int64).reshape(-1, self._columns)
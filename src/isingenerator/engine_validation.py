@@ -0,0 +1,284 @@
+"""Module providing the statistical validation of the engines against the Metropolis engine and the exact solution."""
+# Copyright (C) 2023, Erick Jesús Ríos González
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor,
+# Boston, MA  02110-1301, USA.
+
+import math
+import platform
+import random
+import time
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from src.isingenerator.__about__ import __version__
+from src.isingenerator.engines import Engines
+from src.isingenerator.exact_solution import OnsagerSolution
+from src.isingenerator.lattice_square import LatticeSquare
+from src.isingenerator.main_simulation import MainSimulation
+from src.isingenerator.observable_statistics import BinningAnalysis
+
+
+class EngineValidation:
+    """Static class checking that the engines sample the physics of the reference Metropolis engine.
+
+    Every engine runs at every (L, kT) point with the same seed, one sample per sweep. The energy
+    per site (bonds counted once), the mean absolute magnetization per site and the Binder cumulant
+    U = 1 - <m^4> / (3 <m^2>^2) are compared with those of the reference engine, and the energy and
+    magnetization with Onsager's exact solution, the magnetization only below the critical
+    temperature. A check passes when the difference is within z combined standard errors plus a
+    slack covering what the errors miss: the finite size for the exact solution, the short runs
+    and, for the microcanonical engine, the ensemble.
+
+    A microcanonical engine prepares its spins at the exact energy of kT, so comparing its energy
+    with the exact solution proves nothing: that check is skipped and recorded as such, and the
+    temperature measured by the engine is compared with kT instead.
+    """
+
+    REFERENCE = "metropolis"
+    # Points away from the critical temperature, where the finite-size corrections are small.
+    POINTS: Tuple[Tuple[int, float], ...] = ((16, 1.8), (16, 3.0))
+    QUANTITIES = ("energy", "abs_magnetization", "binder")
+    # Blocks of the jackknife error of the Binder cumulant.
+    BLOCKS = 16
+
+    @staticmethod
+    def measure(engine: str, dimension: int, kT: float, sweeps: int = 2000, burn_in: float = 0.2, seed: int = 0) -> Dict:
+        """Run one engine at one point and estimate the observables with their errors.
+
+        Args:
+            engine (str): Name of the engine, see Engines.names().
+            dimension (int): Dimension of the lattice.
+            kT (float): Boltzmann constant times temperature.
+            sweeps (int, optional): Number of sweeps, including the burn-in. Defaults to 2000.
+            burn_in (float, optional): Fraction of the sweeps discarded. Defaults to 0.2.
+            seed (int, optional): Seed of the run. Defaults to 0.
+
+        Returns:
+            Dict: The engine, the point, every quantity with its error under the "<name>_error" key, the
+                number of samples and the attempts per second of the run. Microcanonical engines also give
+                the "temperature" they measure.
+        """
+        sites = dimension * dimension
+        energy, magnetization = BinningAnalysis(), BinningAnalysis()
+        moments = []
+        start = time.perf_counter()
+        for sample in MainSimulation.iter_samples(
+            sweeps * sites, kT, dimension, epsilon=sites, seed=seed, engine=engine, burn_in=burn_in
+        ):
+            # The measured energy counts every bond twice.
+            energy.add(sample.energy / (2 * sites))
+            m = abs(sample.magnetization_per_site)
+            magnetization.add(m)
+            moments.append((m * m, m**4))
+        elapsed = time.perf_counter() - start
+
+        binder, binder_error = EngineValidation._binder(np.array(moments))
+        temperature = {}
+        if Engines.is_microcanonical(engine):
+            value, error = EngineValidation._temperature(engine, dimension, kT, sweeps, burn_in, seed)
+            temperature = {"temperature": value, "temperature_error": error}
+        return dict(temperature, **{
+            "engine": engine,
+            "dimension": int(dimension),
+            "kT": float(kT),
+            "energy": energy.mean(),
+            "energy_error": energy.error()[0],
+            "abs_magnetization": magnetization.mean(),
+            "abs_magnetization_error": magnetization.error()[0],
+            "binder": binder,
+            "binder_error": binder_error,
+            "samples": len(moments),
+            "attempts_per_second": sweeps * sites / elapsed,
+        })
+
+    @staticmethod
+    def _temperature(engine: str, dimension: int, kT: float, sweeps: int, burn_in: float, seed: int) -> Tuple[float, float]:
+        """Return the temperature measured by a microcanonical engine and its error over blocks of sweeps.
+
+        The chain is the one of EngineValidation.measure, run again with the same seed, the temperature
+        of every block being estimated by the engine, such as CreutzEngine.temperature.
+        """
+        sites = dimension * dimension
+        random.seed(seed)
+        np.random.seed(seed)
+        lattice = LatticeSquare(dimension, dimension, 0.8)
+        lattice.create_matrix()
+        chain = Engines.create(engine, lattice, 1 / kT)
+        burn_in_sweeps = int(sweeps * burn_in)
+        chain.advance(burn_in_sweeps * sites)
+        temperatures = []
+        for block in np.array_split(np.arange(sweeps - burn_in_sweeps), EngineValidation.BLOCKS):
+            chain.reset_demon_energy()
+            chain.advance(len(block) * sites)
+            temperatures.append(chain.temperature())
+        temperatures = np.array(temperatures)
+        return float(temperatures.mean()), float(temperatures.std(ddof=1) / math.sqrt(len(temperatures)))
+
+    @staticmethod
+    def _binder(moments: np.ndarray) -> Tuple[float, float]:
+        """Return the Binder cumulant of the (m^2, m^4) samples and its jackknife error over contiguous blocks."""
+        def cumulant(m2: float, m4: float) -> float:
+            return 1 - m4 / (3 * m2 * m2) if m2 > 0 else 0.0
+
+        if len(moments) < EngineValidation.BLOCKS:
+            return cumulant(*moments.mean(axis=0)), math.inf
+        blocks = np.array([block.sum(axis=0) for block in np.array_split(moments, EngineValidation.BLOCKS)])
+        sizes = np.array([len(block) for block in np.array_split(moments, EngineValidation.BLOCKS)])
+        total, count = blocks.sum(axis=0), len(moments)
+        estimates = np.array([
+            cumulant(*((total - block) / (count - size))) for block, size in zip(blocks, sizes)
+        ])
+        error = math.sqrt((len(estimates) - 1) * np.mean((estimates - estimates.mean()) ** 2))
+        return cumulant(*(total / count)), error
+
+    @staticmethod
+    def _check(value: float, error: float, expected: float, expected_error: float, z: float, slack: float) -> Dict:
+        """Compare a value to an expected one, returning the difference, its error and whether it passes."""
+        combined = math.sqrt(error**2 + expected_error**2)
+        difference = value - expected
+        return {
+            "expected": expected,
+            "difference": difference,
+            "error": combined,
+            "passed": bool(abs(difference) <= z * combined + slack),
+        }
+
+    @staticmethod
+    def run(
+        engines: Sequence[str] = None,
+        points: Sequence[Tuple[int, float]] = POINTS,
+        sweeps: int = 2000,
+        seed: int = 0,
+        z: float = 4.0,
+        slack: float = 0.01,
+    ) -> Dict:
+        """Measure every engine at every point and compare it with the reference engine and the exact solution.
+
+        Args:
+            engines (Sequence[str], optional): Engines to validate, the reference engine being always included.
+                Defaults to every registered engine.
+            points (Sequence[Tuple[int, float]], optional): The (dimension, kT) points. Defaults to POINTS.
+            sweeps (int, optional): Sweeps per run. Defaults to 2000.
+            seed (int, optional): Seed of every run. Defaults to 0.
+            z (float, optional): Number of combined standard errors allowed. Defaults to 4.0.
+            slack (float, optional): Absolute difference allowed on top of them. Defaults to 0.01.
+
+        Returns:
+            Dict: A "meta" section and the "results", the measures of EngineValidation.measure of every engine
+                and point with a "checks" entry mapping "<reference or exact>_<quantity>" to its comparison and
+                a "skipped" entry listing the checks that do not apply to the engine.
+
+        Example:
+            >>> results = EngineValidation.run(["checkerboard", "nfold"])
+            >>> EngineValidation.failures(results)
+            []
+        """
+        engines = Engines.names() if engines is None else list(engines)
+        # The reference is always measured, and compared with the exact solution only.
+        engines = [EngineValidation.REFERENCE] + [engine for engine in engines if engine != EngineValidation.REFERENCE]
+        results: List[Dict] = []
+        for dimension, kT in points:
+            reference = EngineValidation.measure(EngineValidation.REFERENCE, dimension, kT, sweeps, seed=seed)
+            exact = {"energy": OnsagerSolution.energy(kT)}
+            if kT < OnsagerSolution.CRITICAL_TEMPERATURE:
+                exact["abs_magnetization"] = OnsagerSolution.magnetization(kT)
+            for engine in engines:
+                result = (
+                    reference if engine == EngineValidation.REFERENCE
+                    else EngineValidation.measure(engine, dimension, kT, sweeps, seed=seed)
+                )
+                checks = {}
+                if engine != EngineValidation.REFERENCE:
+                    for name in EngineValidation.QUANTITIES:
+                        checks[f"reference_{name}"] = EngineValidation._check(
+                            result[name], result[f"{name}_error"], reference[name], reference[f"{name}_error"], z, slack
+                        )
+                expected = dict(exact)
+                skipped = []
+                if Engines.is_microcanonical(engine):
+                    # The spins start at the exact energy, the temperature is what the chain measures.
+                    del expected["energy"]
+                    skipped.append("exact_energy")
+                    expected["temperature"] = kT
+                for name, value in expected.items():
+                    checks[f"exact_{name}"] = EngineValidation._check(
+                        result[name], result[f"{name}_error"], value, 0.0, z, slack
+                    )
+                results.append(dict(result, checks=checks, skipped=skipped))
+        return {
+            "meta": {
+                "version": __version__,
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "machine": platform.machine(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "sweeps": sweeps,
+                "seed": seed,
+                "z": z,
+                "slack": slack,
+            },
+            "results": results,
+        }
+
+    @staticmethod
+    def failures(results: Dict) -> List[Dict]:
+        """List the failed checks of EngineValidation.run.
+
+        Args:
+            results (Dict): Results as returned by EngineValidation.run.
+
+        Returns:
+            List[Dict]: The engine, dimension, kT and name of every failed check with its comparison.
+        """
+        return [
+            dict(check, engine=result["engine"], dimension=result["dimension"], kT=result["kT"], check=name)
+            for result in results["results"]
+            for name, check in result["checks"].items()
+            if not check["passed"]
+        ]
+
+    @staticmethod
+    def format_table(results: Dict) -> str:
+        """Format the results as a text table, one line per engine and point.
+
+        Args:
+            results (Dict): Results as returned by EngineValidation.run.
+
+        Returns:
+            str: The table.
+        """
+        lines = [
+            "{:<14}{:>5}{:>8}{:>20}{:>20}{:>20}{:>14}  {}".format(
+                "engine", "L", "kT", "energy", "|m|", "binder", "attempts/s", "failed checks"
+            )
+        ]
+        for result in results["results"]:
+            failed = [name for name, check in result["checks"].items() if not check["passed"]]
+            skipped = f" (skipped: {', '.join(result['skipped'])})" if result.get("skipped") else ""
+            lines.append(
+                "{:<14}{:>5}{:>8.3f}{:>20}{:>20}{:>20}{:>14.3e}  {}".format(
+                    result["engine"],
+                    result["dimension"],
+                    result["kT"],
+                    "{:.5f} ± {:.5f}".format(result["energy"], result["energy_error"]),
+                    "{:.5f} ± {:.5f}".format(result["abs_magnetization"], result["abs_magnetization_error"]),
+                    "{:.5f} ± {:.5f}".format(result["binder"], result["binder_error"]),
+                    result["attempts_per_second"],
+                    (", ".join(failed) or "-") + skipped,
+                )
+            )
+        return "\n".join(lines)
@@ -0,0 +1,128 @@
+"""Module providing the engines that advance the Markov chain of the 2D Ising Model."""
+# Copyright (C) 2023, Erick Jesús Ríos González
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor,
+# Boston, MA  02110-1301, USA.
+
+from typing import Any, Dict, List
+
+import numpy as np
+
+from src.isingenerator.checkerboard_engine import CheckerboardEngine
+from src.isingenerator.creutz_engine import CreutzEngine
+from src.isingenerator.lattice_square import LatticeSquare
+from src.isingenerator.monte_carlo_simulation import MonteCarloSimulation
+from src.isingenerator.neighbors import Neighbors
+from src.isingenerator.nfold_engine import NFoldWayEngine
+
+
+class MetropolisEngine:
+    """Reference engine making one single spin-flip Metropolis attempt per step."""
+
+    # The observer is notified of every attempt with its site, see DomainTracker.
+    REPORTS_FLIPS = True
+
+    def __init__(self, lattice: LatticeSquare, beta: float, **options: Any) -> None:
+        """Initialize an instance of MetropolisEngine.
+
+        Args:
+            lattice (LatticeSquare): The lattice with its spin matrix already created.
+            beta (float): One divided Boltzmann constant times temperature.
+            **options (Any): Options of other engines, ignored.
+        """
+        self._lattice = lattice
+        self._beta = beta
+        self._N = getattr(lattice, "_rows")
+        self._neighbors = Neighbors.table_tuples(getattr(lattice, "_rows"), getattr(lattice, "_columns"))
+
+    def advance(self, attempts: int, observer: Any = None) -> np.ndarray:
+        """Make a number of spin-flip attempts.
+
+        Args:
+            attempts (int): Number of attempts.
+            observer (Any, optional): Object notified of every attempt, see MonteCarloSimulation.markov_chain_move.
+                Defaults to None.
+
+        Returns:
+            np.ndarray: The spin matrix after the attempts.
+        """
+        lattice, N, beta, neighbors = self._lattice, self._N, self._beta, self._neighbors
+        for _ in range(attempts):
+            MonteCarloSimulation.markov_chain_move(lattice, N, beta, observer, neighbors)
+        return getattr(lattice, "_matrix")
+
+
+class Engines:
+    """Static class keeping the registry of the engines available to the simulation."""
+
+    _registry: Dict[str, type] = {
+        "metropolis": MetropolisEngine,
+        "checkerboard": CheckerboardEngine,
+        "creutz": CreutzEngine,
+        "nfold": NFoldWayEngine,
+    }
+
+    @staticmethod
+    def names() -> List[str]:
+        """Return the names of the registered engines."""
+        return list(Engines._registry)
+
+    @staticmethod
+    def reports_flips(name: str) -> bool:
+        """Return whether the engine registered under a name notifies its observer of every single flip attempt."""
+        return getattr(Engines._registry[name], "REPORTS_FLIPS", False)
+
+    @staticmethod
+    def is_microcanonical(name: str) -> bool:
+        """Return whether the engine registered under a name runs at fixed energy, measuring its temperature."""
+        return getattr(Engines._registry[name], "MICROCANONICAL", False)
+
+    @staticmethod
+    def memory_maps(name: str) -> bool:
+        """Return whether the engine registered under a name can keep the spins in a memory-mapped file."""
+        return getattr(Engines._registry[name], "MEMORY_MAPPED", False)
+
+    @staticmethod
+    def register(name: str, engine_class: type) -> None:
+        """Register an engine under a name.
+
+        Args:
+            name (str): The name of the engine.
+            engine_class (type): Class built as engine_class(lattice, beta, **options) with an
+                advance(attempts, observer) method.
+        """
+        Engines._registry[name] = engine_class
+
+    @staticmethod
+    def create(name: str, lattice: LatticeSquare, beta: float, **options: Any) -> Any:
+        """Create the engine registered under a name.
+
+        Args:
+            name (str): The name of the engine.
+            lattice (LatticeSquare): The lattice with its spin matrix already created.
+            beta (float): One divided Boltzmann constant times temperature.
+            **options (Any): Options passed to the engine.
+
+        Returns:
+            Any: The engine instance.
+
+        Raises:
+            ValueError: If no engine is registered under the name.
+        """
+        if name not in Engines._registry:
+            raise ValueError(
+                f"Unknown engine '{name}', expected one of: {', '.join(Engines.names())}"
+            )
+        return Engines._registry[name](lattice, beta, **options)
@@ -0,0 +1,66 @@
+"""Module providing Onsager's exact solution of the 2D Ising Model on the infinite square lattice."""
+# Copyright (C) 2023, Erick Jesús Ríos González
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor,
+# Boston, MA  02110-1301, USA.
+
+import math
+
+from scipy.special import ellipk
+
+
+class OnsagerSolution:
+    """Static class with the exact observables per site of the infinite lattice with J = 1 and no field.
+
+    The energy counts each bond once, as the energy sampled by the chain; the energy measured by
+    IsingModel2D.calculate_energy counts each bond twice and is twice this value.
+    """
+
+    CRITICAL_TEMPERATURE = 2 / math.log(1 + math.sqrt(2))
+
+    @staticmethod
+    def energy(kT: float) -> float:
+        """Return the mean energy per site.
+
+        Args:
+            kT (float): Boltzmann constant times temperature.
+
+        Returns:
+            float: u = -coth(2 beta) [1 + (2 / pi) (2 tanh^2(2 beta) - 1) K(k)], k = 2 sinh(2 beta) / cosh^2(2 beta).
+
+        Example:
+            >>> OnsagerSolution.energy(OnsagerSolution.CRITICAL_TEMPERATURE)
+            -1.4142135623730951
+        """
+        beta = 1 / kT
+        modulus = 2 * math.sinh(2 * beta) / math.cosh(2 * beta) ** 2
+        factor = 2 * math.tanh(2 * beta) ** 2 - 1
+        # At the critical temperature K(1) diverges where its factor vanishes, their product tends to 0.
+        elliptic = float(ellipk(modulus**2)) if modulus < 1 else 0.0
+        return -(1 + 2 / math.pi * factor * elliptic) / math.tanh(2 * beta)
+
+    @staticmethod
+    def magnetization(kT: float) -> float:
+        """Return the spontaneous magnetization per site, the limit of the mean absolute magnetization.
+
+        Args:
+            kT (float): Boltzmann constant times temperature.
+
+        Returns:
+            float: (1 - sinh(2 beta) ^ -4) ^ (1 / 8) below the critical temperature, 0 above it.
+        """
+        if kT >= OnsagerSolution.CRITICAL_TEMPERATURE:
+            return 0.0
+        return (1 - math.sinh(2 / kT) ** -4) ** 0.125
@@ -0,0 +1,201 @@
+"""Module providing a class to run the same sweep of the 2D Ising Model at several lattice sizes on one pool of workers."""
+# Copyright (C) 2023, Erick Jesús Ríos González
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor,
+# Boston, MA  02110-1301, USA.
+
+import math
+import os
+from functools import partial
+from typing import Dict, List, NamedTuple, Sequence
+
+import numpy as np
+
+from src.isingenerator.benchmark import Benchmark
+from src.isingenerator.create_data_simulation import CreateDataSimulation
+from src.isingenerator.grid_scheduler import GridScheduler, GridTask
+from src.isingenerator.main_simulation import MainSimulation
+
+
+class CampaignJob(NamedTuple):
+    """One (L, kT, B) point of a campaign.
+
+    Attributes:
+        dimension (int): Lattice size of the point.
+        task (GridTask): The point in the sweep of its lattice size.
+        cost (float): Estimated cost, in seconds when benchmark data is available, else in spin updates.
+    """
+
+    dimension: int
+    task: GridTask
+    cost: float
+
+
+def _simulate_job(arguments: Dict[int, Dict], job: CampaignJob) -> List:
+    """Simulate one job of a campaign in a worker process.
+
+    Args:
+        arguments (Dict[int, Dict]): The keyword arguments of MainSimulation.create_observables shared by the
+            points of every lattice size, "seed" being the seed of the sweep.
+        job (CampaignJob): The job to simulate.
+
+    Returns:
+        List: The row of the point.
+    """
+    kwargs = dict(arguments[job.dimension], kT=job.task.kT, B=job.task.B)
+    if kwargs["seed"] is None:
+        # Forked workers inherit the same NumPy generator state.
+        np.random.seed()
+    else:
+        kwargs["seed"] += job.task.index
+    return MainSimulation.create_observables(**kwargs)
+
+
+class FiniteSizeCampaign:
+    """Class planning the sweeps of a finite-size-scaling study together and running them largest job first."""
+
+    def __init__(
+        self,
+        sizes: Sequence[int],
+        steps_per_site: float,
+        initial_step_kT: float,
+        final_step_kT: float,
+        delta_kT: float,
+        directory: str = ".",
+        epsilon: int = None,
+        workers: int = 1,
+        benchmark_file: str = None,
+        **options,
+    ) -> None:
+        """Initialize an instance of FiniteSizeCampaign.
+
+        The sweep of size L makes int(steps_per_site * L * L) steps per point, samples every epsilon
+        steps and is written to "<directory>/<steps>_<L>_<epsilon>.csv", the naming of the existing datasets.
+
+        Args:
+            sizes (Sequence[int]): The lattice sizes.
+            steps_per_site (float): Steps per point divided by the number of spins.
+            initial_step_kT (float): The initial temperature.
+            final_step_kT (float): The final temperature.
+            delta_kT (float): The temperature step.
+            directory (str, optional): Directory of the datasets, created if needed. Defaults to ".".
+            epsilon (int, optional): Steps between two samples. Defaults to one sweep, L * L.
+            workers (int, optional): Number of processes shared by every lattice size. Defaults to 1.
+            benchmark_file (str, optional): JSON file written by Benchmark.write_json, used to estimate the
+                cost of each job in seconds. Defaults to None, the cost is then the number of spin updates.
+            **options: Other arguments of CreateDataSimulation, such as seed, engine, burn_in, J, mu,
+                output_format, checkpoint_dir or catalog, shared by every size.
+
+        Example:
+            >>> campaign = FiniteSizeCampaign([16, 32, 64], 100, 1.5, 3.5, 0.1, "data", workers=8, seed=1)
+            >>> campaign.run()
+            ['data/25600_16_256.csv', 'data/102400_32_1024.csv', 'data/409600_64_4096.csv']
+        """
+        os.makedirs(directory, exist_ok=True)
+        self._sizes = [int(size) for size in sizes]
+        self._workers = workers
+        self._rates = Benchmark.read_json(benchmark_file)["results"] if benchmark_file is not None else None
+        self._simulations: Dict[int, CreateDataSimulation] = {}
+        for size in self._sizes:
+            steps = int(steps_per_site * size * size)
+            size_epsilon = size * size if epsilon is None else epsilon
+            extension = options.get("output_format", "csv")
+            self._simulations[size] = CreateDataSimulation(
+                os.path.join(directory, f"{steps}_{size}_{size_epsilon}.{extension}"),
+                steps,
+                initial_step_kT,
+                final_step_kT,
+                delta_kT,
+                size,
+                epsilon=size_epsilon,
+                **options,
+            )
+
+    def file_names(self) -> List[str]:
+        """Return the dataset file of every lattice size, in the order of the sizes."""
+        return [self._simulations[size].output_file() for size in self._sizes]
+
+    def _benchmark_value(self, name: str, dimension: int) -> float:
+        """Return a benchmark value for a dimension, scaled from the closest benchmarked dimension.
+
+        The attempt rate of the chain does not depend on the size, the cost of a sample grows with the
+        number of spins.
+        """
+        entries = [entry for entry in self._rates if entry["benchmark"] == name]
+        if not entries:
+            raise ValueError(f"The benchmark file has no '{name}' results")
+        closest = min(entries, key=lambda entry: abs(math.log(entry["dimension"] / dimension)))
+        if name == "markov_chain_move":
+            return closest["value"]
+        return closest["value"] * (dimension / closest["dimension"]) ** 2
+
+    def job_cost(self, dimension: int) -> float:
+        """Estimate the cost of one point of a lattice size.
+
+        Args:
+            dimension (int): The lattice size.
+
+        Returns:
+            float: Seconds when benchmark data was given, else the number of spin updates of the chain
+                plus the sites visited by the measurements.
+        """
+        simulation = self._simulations[dimension]
+        steps = simulation.observable_arguments()["steps"]
+        samples = simulation.samples_per_point()
+        if self._rates is None:
+            return steps + samples * dimension * dimension
+        # The sweeps measure with MeasurementWorkspace, older benchmark files only time IsingModel2D.
+        measurement = "measurement_workspace"
+        if not any(entry["benchmark"] == measurement for entry in self._rates):
+            measurement = "calculate_energy"
+        return (
+            steps / self._benchmark_value("markov_chain_move", dimension)
+            + samples * self._benchmark_value(measurement, dimension)
+        )
+
+    def plan(self) -> List[CampaignJob]:
+        """List the jobs of the campaign that are not done yet, the most expensive first.
+
+        Returns:
+            List[CampaignJob]: The jobs in the order they are submitted to the pool.
+        """
+        jobs = []
+        for size in self._sizes:
+            cost = self.job_cost(size)
+            jobs.extend(CampaignJob(size, task, cost) for task in self._simulations[size].pending_tasks())
+        # Longest processing time first: the short jobs at the end fill the gaps left by the long ones.
+        jobs.sort(key=lambda job: job.cost, reverse=True)
+        return jobs
+
+    def run(self) -> List[str]:
+        """Run every job of the campaign on the shared pool and write one dataset per lattice size.
+
+        The rows are written as the jobs finish and every dataset is sorted by temperature at the end,
+        including the rows of earlier sessions of a resumed campaign.
+
+        Returns:
+            List[str]: The dataset files, in the order of the sizes.
+        """
+        for simulation in self._simulations.values():
+            simulation.start_output()
+
+        arguments = {size: simulation.observable_arguments() for size, simulation in self._simulations.items()}
+        simulate = partial(_simulate_job, arguments)
+        for job, results in GridScheduler.run(self.plan(), simulate, self._workers):
+            self._simulations[job.dimension].append_row(results, job.task)
+
+        for size in self._sizes:
+            self._simulations[size].finalize_output()
+        return self.file_names()
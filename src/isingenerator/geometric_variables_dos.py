@@ -21,9 +21,11 @@ import networkx as nx
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from typing import Tuple
+from typing import List, Tuple
 from collections import Counter
 
+from src.isingenerator.neighbors import Neighbors
+
 class GeometricVariables:
     """Static class for geometric variables in 2D Ising Model"""
 
@@ -43,50 +45,41 @@ class GeometricVariables:
         """
         # Get the dimensions of the matrix
         N, M = np.shape(ising_matrix)
+        spins = np.asarray(ising_matrix).reshape(-1)
 
         # Create an undirected graph
         G = nx.Graph()
 
+        # Neighbors with periodic boundary conditions (ring-like conditions), by flat site index
+        neighbors = Neighbors.table_tuples(N, M)
+
         # Iterate over each position in the matrix
-        for i in range(N):
-            for j in range(M):
-                # Add a node if the spin value is 1
-                if ising_matrix[i, j] == 1:
-                    G.add_node((i, j))
-                    
-                    # Define neighbors with periodic boundary conditions (ring-like conditions)
-                    neighbors: Tuple[Tuple[int, int], Tuple[int, int], Tuple[int, int], Tuple[int, int]] = (
-                        (i, (j - 1) % M),   # left neighbor
-                        (i, (j + 1) % M),   # right neighbor
-                        ((i - 1) % N, j),   # upper neighbor
-                        ((i + 1) % N, j)    # lower neighbor
-                    )
-
-                    # Add edges to neighbors that also have a spin value of 1
-                    for neighbor in neighbors:
-                        if ising_matrix[neighbor] == 1:
-                            G.add_edge((i, j), neighbor)
+        for site in range(N * M):
+            # Add a node if the spin value is 1
+            if spins[site] == 1:
+                node = divmod(site, M)
+                G.add_node(node)
+
+                # Add edges to neighbors that also have a spin value of 1
+                for neighbor in neighbors[site]:
+                    if spins[neighbor] == 1:
+                        G.add_edge(node, divmod(neighbor, M))
 
         return G
 
     @staticmethod
-    def forman_ricci_curvature_edge(graph: nx.Graph, name_image: str) -> float:
+    def forman_ricci_curvature_values(graph: nx.Graph) -> Tuple[float, List[int]]:
         """
-        Computes the Forman-Ricci curvature for each edge in the given graph, calculates the total Forman-Ricci curvature of the graph,
-        and saves the results in a PNG image showing the normalized distribution of curvature values.
+        Computes the Forman-Ricci curvature for each edge in the given graph and the total Forman-Ricci curvature of the graph.
 
         The Forman-Ricci curvature for an edge is calculated based on the degrees of the nodes connected by the edge.
 
         Args:
             graph (nx.Graph): An undirected graph.
-            name_image (str): The name of the output PNG image file.
 
         Returns:
-            float: The total Forman-Ricci curvature of the graph.
+            Tuple[float, List[int]]: The total Forman-Ricci curvature of the graph and the curvature value of every edge visit.
         """
-        
-        KT_VALUE = name_image.split('_')[-1].split('.png')[0]
-        
         frc_total = 0
         frc_values = []
 
@@ -99,6 +92,19 @@ class GeometricVariables:
                 frc_values.append(frc)
                 frc_total += frc
 
+        return frc_total, frc_values
+
+    @staticmethod
+    def plot_forman_ricci_distribution(frc_values: List[int], name_image: str) -> None:
+        """
+        Saves a PNG image showing the normalized distribution of the Forman-Ricci curvature values.
+
+        Args:
+            frc_values (List[int]): The curvature values as returned by forman_ricci_curvature_values.
+            name_image (str): The name of the output PNG image file.
+        """
+        KT_VALUE = name_image.split('_')[-1].split('.png')[0]
+
         # Calculate the normalized distribution of curvature values
         count_values = Counter(frc_values)
         total_count = sum(count_values.values())
@@ -118,5 +124,22 @@ class GeometricVariables:
         plt.savefig(name_image)
         plt.close()
 
-        return frc_total
+    @staticmethod
+    def forman_ricci_curvature_edge(graph: nx.Graph, name_image: str) -> float:
+        """
+        Computes the Forman-Ricci curvature for each edge in the given graph, calculates the total Forman-Ricci curvature of the graph,
+        and saves the results in a PNG image showing the normalized distribution of curvature values.
+
+        The Forman-Ricci curvature for an edge is calculated based on the degrees of the nodes connected by the edge.
 
+        Args:
+            graph (nx.Graph): An undirected graph.
+            name_image (str): The name of the output PNG image file.
+
+        Returns:
+            float: The total Forman-Ricci curvature of the graph.
+        """
+        frc_total, frc_values = GeometricVariables.forman_ricci_curvature_values(graph)
+        GeometricVariables.plot_forman_ricci_distribution(frc_values, name_image)
+
+        return frc_total
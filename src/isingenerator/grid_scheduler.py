@@ -0,0 +1,104 @@
+"""Module providing a class to schedule the (kT, B) points of a sweep of the 2D Ising Model on a pool of workers."""
+# Copyright (C) 2023, Erick Jesús Ríos González
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor,
+# Boston, MA  02110-1301, USA.
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Callable, Iterable, Iterator, NamedTuple, Sequence, Tuple, TypeVar
+
+Task = TypeVar("Task")
+
+
+class GridTask(NamedTuple):
+    """One point of a sweep.
+
+    Attributes:
+        index (int): Position of the point in the whole grid, stable across runs.
+        kT (float): Temperature of the point.
+        B (float): Magnetic field of the point.
+    """
+
+    index: int
+    kT: float
+    B: float
+
+
+class GridScheduler:
+    """Static class for listing the tasks of a (kT, B) grid and running them with bounded memory."""
+
+    @staticmethod
+    def tasks(kT_values: Sequence[float], B_values: Sequence[float]) -> Iterator[GridTask]:
+        """Lazily list the tasks of a grid, the magnetic field varying fastest.
+
+        Args:
+            kT_values (Sequence[float]): The temperatures of the grid.
+            B_values (Sequence[float]): The magnetic fields of the grid, [0] for a zero field sweep.
+
+        Yields:
+            GridTask: The tasks of the grid.
+        """
+        index = 0
+        for kT in kT_values:
+            for B in B_values:
+                yield GridTask(index, float(kT), float(B))
+                index += 1
+
+    @staticmethod
+    def run(
+        tasks: Iterable[Task],
+        function: Callable[[Task], Any],
+        workers: int = 1,
+        max_in_flight: int = None,
+    ) -> Iterator[Tuple[Task, Any]]:
+        """Run a function on every task and yield each result as soon as it is done.
+
+        With one worker the tasks run in order in this process. With more workers they run on a
+        process pool and the results come in completion order; at most max_in_flight tasks are
+        submitted at a time, so memory does not grow with the size of the grid.
+
+        Args:
+            tasks (Iterable[Task]): The tasks, usually GridTask, consumed lazily and submitted in order.
+            function (Callable[[Task], Any]): The function run on each task, it must be picklable
+                when workers > 1.
+            workers (int, optional): Number of worker processes. Defaults to 1.
+            max_in_flight (int, optional): Maximum number of submitted tasks not yet yielded.
+                Defaults to twice the number of workers.
+
+        Yields:
+            Tuple[Task, Any]: Each task with the value returned by the function.
+        """
+        if workers <= 1:
+            for task in tasks:
+                yield task, function(task)
+            return
+
+        max_in_flight = 2 * workers if max_in_flight is None else max(max_in_flight, 1)
+        pending = iter(tasks)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            in_flight = {}
+            exhausted = False
+            while True:
+                while not exhausted and len(in_flight) < max_in_flight:
+                    task = next(pending, None)
+                    if task is None:
+                        exhausted = True
+                        break
+                    in_flight[executor.submit(function, task)] = task
+                if not in_flight:
+                    return
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield in_flight.pop(future), future.result()
@@ -16,19 +16,214 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor,
 # Boston, MA  02110-1301, USA.
 
-from typing import List, Dict
+import itertools
+import math
+import os
+import random
+import time
+from contextlib import nullcontext
+from typing import Iterator, List, Dict, NamedTuple, Sequence
 import numpy as np
 
-from src.isingenerator.monte_carlo_simulation import MonteCarloSimulation
+from src.isingenerator.analysis_pipeline import AnalysisPipeline
+from src.isingenerator.checkerboard_engine import CheckerboardEngine
+from src.isingenerator.coarse_graining import SnapshotPyramid
+from src.isingenerator.correlation import SpinCorrelation
+from src.isingenerator.domain_tracker import DomainTracker
+from src.isingenerator.engines import Engines
 from src.isingenerator.lattice_square import LatticeSquare
-from src.isingenerator.ising_model_2d import IsingModel2D
 from src.isingenerator.topological_variables import TopologicalVariables
 #from src.isingenerator.geometric_variables import GeometricVariables
 from src.isingenerator.geometric_variables_dos import GeometricVariables
+from src.isingenerator.measurement_workspace import MeasurementWorkspace
+from src.isingenerator.observable_statistics import ObservableMoments
+from src.isingenerator.profiler import FlipStatistics, SimulationProfiler
+from src.isingenerator.progress import ProgressTracker
+from src.isingenerator.reweighting import JointHistogram
+from src.isingenerator.trajectory_log import TrajectoryRecorder
+from src.isingenerator.spin_graph import SpinGraph
+
+
+class Sample(NamedTuple):
+    """Observables of the spin matrix at one sampled step of the chain.
+
+    Attributes:
+        step (int): Number of steps done when the sample was taken.
+        energy (float): Total energy, as IsingModel2D.calculate_energy.
+        magnetization (float): Total magnetization.
+        magnetization_per_site (float): Magnetization divided by the number of spins.
+        domain_number (float): Number of domains, None unless asked for.
+        mean_domain_size (float): Mean size of the domains, None unless asked for.
+        matrix (np.ndarray): The spin matrix itself, not a copy: the chain keeps changing it
+            once the next sample is requested.
+        temperature (float): Temperature measured by a microcanonical engine since the burn-in,
+            None for the other engines.
+    """
+
+    step: int
+    energy: float
+    magnetization: float
+    magnetization_per_site: float
+    domain_number: float
+    mean_domain_size: float
+    matrix: np.ndarray
+    temperature: float = None
+
 
 class MainSimulation:
     """Static class for implementing the main simulation of 2D Ising Model"""
 
+    @staticmethod
+    def iter_samples(
+        steps: int,
+        kT: float,
+        dimension: int = 15,
+        percentage_ones: float = 0.8,
+        J: float = 1,
+        B: float = 0,
+        mu: float = 1,
+        epsilon: int = 15,
+        profiler: SimulationProfiler = None,
+        progress: ProgressTracker = None,
+        seed: int = None,
+        engine: str = "metropolis",
+        engine_options: Dict = None,
+        burn_in: float = 0.5,
+        domains: bool = False,
+        lattice: LatticeSquare = None,
+        incremental_domains: bool = False,
+        trajectory_file: str = None,
+    ) -> Iterator[Sample]:
+        """Run the chain and lazily yield the observables of every sample.
+
+        A sample is taken right after every step multiple of epsilon once the burn-in is over.
+        The chain only advances when the next sample is requested, and it is run to the last
+        step once the samples are exhausted.
+
+        Args:
+            steps (int): Number of iterations.
+            kT (float): Boltzmann constant times temperature.
+            dimension (int, optional): Dimension of spin matrix. Defaults to 15.
+            percentage_ones (float, optional): Fraction of ones in the initial lattice. Defaults to 0.8.
+            J (float, optional): Interaction constant between spins. Defaults to 1.
+            B (float, optional): External Magnetic Field. Defaults to 0.
+            mu (float, optional): Magnetic moment. Defaults to 1.
+            epsilon (int, optional): Steps between two samples. Defaults to 15.
+            profiler (SimulationProfiler, optional): Collects the time of the chain and of the measurements
+                and the flip and sample counters. Defaults to None.
+            progress (ProgressTracker, optional): Receives the number of steps done every progress.check_every steps.
+                Defaults to None.
+            seed (int, optional): Seed of the random generators, None leaves them untouched. Defaults to None.
+            engine (str, optional): Name of the engine advancing the chain, see Engines.names(). Defaults to "metropolis".
+            engine_options (Dict, optional): Options passed to the engine. Defaults to None.
+            burn_in (float, optional): Fraction of the steps discarded before sampling. Defaults to 0.5.
+            domains (bool, optional): Label the domains of every sample in this process. Defaults to False.
+            lattice (LatticeSquare, optional): Lattice whose spin matrix is already created, to continue a chain.
+                Defaults to a new lattice of the given dimension and percentage of ones.
+            incremental_domains (bool, optional): Give the domains of every sample from a DomainTracker following
+                the flips of the chain instead of labeling every sample. Engines that do not report single flips
+                rebuild the tracker at every sample. Defaults to False.
+            trajectory_file (str, optional): File receiving every accepted flip of the chain with periodic
+                keyframes, see TrajectoryRecorder, to replay any step with TrajectoryReplay. The step of a
+                sample is then the step of the replay. Defaults to None, no trajectory.
+
+        Raises:
+            ValueError: If a trajectory is asked from an engine that does not report single flips.
+
+        Yields:
+            Sample: The observables of each sample.
+
+        Example:
+            >>> energies = [sample.energy for sample in MainSimulation.iter_samples(100000, 2.27, 32, seed=1)]
+        """
+        if seed is not None:
+            random.seed(seed)
+            np.random.seed(seed)
+
+        # Initialize the spin array
+        if lattice is None:
+            lattice = LatticeSquare(dimension, dimension, percentage_ones)
+            lattice.create_matrix()
+        chain = Engines.create(engine, lattice, 1 / kT, **(engine_options or {}))
+        # Read after creating the engine, which may replace the matrix, e.g. by a memory-mapped one.
+        matrix: np.ndarray = getattr(lattice, "_matrix")
+        no_spines: float = matrix.size
+        workspace: MeasurementWorkspace = MeasurementWorkspace.shared(matrix.shape, matrix.dtype)
+
+        # The flip counters only receive events while profiling or reporting progress.
+        flip_statistics: FlipStatistics = None
+        if profiler is not None:
+            flip_statistics = profiler.flips
+        elif progress is not None:
+            flip_statistics = progress.flips
+        observer = flip_statistics
+        tracker: DomainTracker = None
+        if incremental_domains:
+            observer = tracker = DomainTracker(matrix, flip_statistics)
+            # Only the engines notifying every flip keep the tracker up to date.
+            follows_flips = getattr(chain, "REPORTS_FLIPS", False)
+        recorder: TrajectoryRecorder = None
+        if trajectory_file is not None:
+            if not getattr(chain, "REPORTS_FLIPS", False):
+                raise ValueError(f"The {engine} engine does not report single flips, so its trajectory cannot be recorded")
+            observer = recorder = TrajectoryRecorder(trajectory_file, matrix, observer=observer)
+        # The temperature of a microcanonical engine is measured from the end of the burn-in.
+        measures_temperature: bool = Engines.is_microcanonical(engine)
+        burn_in_steps: int = int(steps * burn_in) if measures_temperature else 0
+        chunk: int = steps if progress is None else progress.check_every
+        chain_time: float = 0
+        measurement_time: float = 0
+
+        first_sample: int = math.ceil(steps * burn_in / epsilon) * epsilon
+        done: int = 0
+        try:
+            for sample_step in itertools.chain(range(first_sample, steps, epsilon), [None]):
+                target = steps if sample_step is None else sample_step + 1
+                if profiler is not None:
+                    chain_start = time.perf_counter()
+                while done < target:
+                    attempts = min(target - done, chunk)
+                    if done < burn_in_steps:
+                        attempts = min(attempts, burn_in_steps - done)
+                    chain.advance(attempts, observer)
+                    done += attempts
+                    if measures_temperature and done == burn_in_steps:
+                        chain.reset_demon_energy()
+                    if progress is not None:
+                        progress.update(done, flip_statistics)
+                if profiler is not None:
+                    sample_start = time.perf_counter()
+                    chain_time += sample_start - chain_start
+                if sample_step is None:
+                    break
+
+                energy, magnetization = workspace.energy_and_magnetization(matrix, J, B, mu)
+                domain_number = mean_domain_size = None
+                if tracker is not None:
+                    if not follows_flips:
+                        tracker.rebuild(matrix)
+                    domain_number = tracker.domain_number()
+                    mean_domain_size = tracker.mean_domain_size()
+                elif domains:
+                    TopologicalVariables.label_ring(matrix)
+                    domain_number = TopologicalVariables.get_num_labels()
+                    mean_domain_size = TopologicalVariables.mean_domain_size()
+                if profiler is not None:
+                    measurement_time += time.perf_counter() - sample_start
+                    profiler.count("samples")
+
+                yield Sample(
+                    done, energy, magnetization, magnetization/no_spines, domain_number, mean_domain_size, matrix,
+                    chain.temperature() if measures_temperature else None,
+                )
+        finally:
+            if recorder is not None:
+                recorder.close()
+            if profiler is not None:
+                profiler.add_time("metropolis", chain_time)
+                profiler.add_time("measurement", measurement_time)
+                profiler.count("steps", done)
+
     @staticmethod
     def create_observables(
         steps: int,
@@ -40,9 +235,29 @@ class MainSimulation:
         mu: float = 1,
         epsilon: int = 15,
         geometric_variables: bool = False,
+        profiler: SimulationProfiler = None,
+        progress: ProgressTracker = None,
+        seed: int = None,
+        engine: str = "metropolis",
+        engine_options: Dict = None,
+        burn_in: float = 0.5,
+        moments: ObservableMoments = None,
+        analysis_workers: int = 0,
+        histogram_dir: str = None,
+        correlation_length: bool = False,
+        target_error: float = None,
+        relative_error: bool = False,
+        snapshot_dir: str = None,
+        snapshot_levels: Sequence[int] = (2, 4, 8),
+        incremental_domains: bool = False,
+        trajectory_dir: str = None,
+        plot_dir: str = None,
+        memmap_dir: str = None,
     ) -> List:
         """Runs the simulation of the 2D Ising Model.
 
+        The averages are computed from the samples of MainSimulation.iter_samples.
+
         Args:
             kT (float): Boltzmann constant times.
             steps (int): Number of iterations.
@@ -53,6 +268,48 @@ class MainSimulation:
             mu (float, optional): Magnetic moment. Defaults to 1.
             epsilon (int, optional): Amount designated to smooth the obtained quantities.. Defaults to 15.
             geometric variables (bool, optional): Option to calculate the geometric variables of the last spin matrix.
+            profiler (SimulationProfiler, optional): Collects the time per phase and the flip and sample counters
+                of the run. Nothing is measured when it is None. Defaults to None.
+            progress (ProgressTracker, optional): Receives the number of steps done every progress.check_every steps.
+                Defaults to None.
+            seed (int, optional): Seed of the random generators, None leaves them untouched. Defaults to None.
+            engine (str, optional): Name of the engine advancing the chain, see Engines.names(). A microcanonical
+                engine also appends the temperature measured since the burn-in to the row. Defaults to "metropolis".
+            engine_options (Dict, optional): Options passed to the engine. Defaults to None.
+            burn_in (float, optional): Fraction of the steps discarded before sampling. Defaults to 0.5.
+            moments (ObservableMoments, optional): Receives the energy and magnetization of every sample.
+                Defaults to None.
+            analysis_workers (int, optional): Number of processes computing the domains, and the curvature
+                when geometric_variables is set, of every sample while the chain runs. With 0 the domain
+                columns are not computed. Defaults to 0.
+            histogram_dir (str, optional): Directory receiving the (energy, magnetization) histogram of the
+                samples, see JointHistogram.file_name, for Reweighting. Defaults to None, no histogram.
+            correlation_length (bool, optional): Append the second-moment correlation length of the samples,
+                see SpinCorrelation, to the row. Defaults to False.
+            target_error (float, optional): Stop sampling once the binning errors of the energy and of the absolute
+                magnetization per site are reliable and at most this value; steps is then only a cap. The steps
+                used and the two errors are appended to the row, and the averages are taken over the samples
+                actually made. The burn-in stays a fraction of steps. Defaults to None, always run every step.
+            relative_error (bool, optional): Read target_error relative to the absolute value of each mean.
+                Defaults to False.
+            snapshot_dir (str, optional): Directory receiving the block-spin coarse-grained samples, see
+                SnapshotPyramid.file_name. Defaults to None, no snapshot.
+            snapshot_levels (Sequence[int], optional): Block sides of the coarse-grained samples saved, which
+                must divide dimension, 1 for the full matrices. Defaults to (2, 4, 8).
+            incremental_domains (bool, optional): Fill the domain columns from a DomainTracker following the
+                flips of the chain, in this process. Defaults to False.
+            trajectory_dir (str, optional): Directory receiving the log of the accepted flips of the chain, see
+                TrajectoryRecorder.file_name. Defaults to None, no trajectory.
+            plot_dir (str, optional): Directory receiving the plot of the Forman-Ricci curvature distribution of
+                the last spin matrix when geometric_variables is set. Defaults to None, no plot.
+            memmap_dir (str, optional): Directory of the file backing the spin matrix, see
+                CheckerboardEngine.file_name. The initial matrix is drawn straight into the file, each spin
+                being positive with probability percentage_ones, so the lattice never has to fit in memory.
+                Defaults to None, the matrix stays in memory.
+
+        Raises:
+            ValueError: If both incremental_domains and analysis_workers are given, or if memmap_dir is given
+                for an engine that cannot use a memory-mapped matrix.
 
         Returns:
             List: Final data for simulation.
@@ -65,64 +322,128 @@ class MainSimulation:
         mean_magnetization_array: float = 0
         energy_array: float = 0
 
-        half: float = steps / 2
-        number_data: int = half/epsilon
-        no_spines: float = dimension*dimension
+        if incremental_domains and analysis_workers > 0:
+            raise ValueError("The domains come either from the analysis workers or from the incremental tracker")
+
+        if seed is not None:
+            random.seed(seed)
+            np.random.seed(seed)
 
         # Initialize the spin array
         lattice: LatticeSquare = LatticeSquare(dimension, dimension, percentage_ones)
-        matrix: np.ndarray = lattice.create_matrix()
-        ising_model: IsingModel2D = IsingModel2D(matrix)
-
-        for step in range(steps):
-            setattr(
-                ising_model,
-                "_matrix",
-                MonteCarloSimulation.markov_chain_move(lattice, dimension, 1 / kT),
-            )
-            
-            if step >= half:
-                if step % epsilon == 0:
-                    
-                    magnetization_array+=ising_model.calculate_magnetization()
-                    mean_magnetization_array+=(ising_model.calculate_magnetization())/no_spines
-                    energy_array+=ising_model.calculate_energy(J, B, mu)
-                    # Compute Topological Variables
-                    #TopologicalVariables.label_ring(
-                    #    getattr(ising_model, "_matrix")
-                    #)
-                    #domain_number_array+=TopologicalVariables.number_of_domains()
-                    #mean_domain_size_array+=TopologicalVariables.mean_domain_size()
-            
-        
+        if memmap_dir is not None:
+            if not Engines.memory_maps(engine):
+                raise ValueError(f"The {engine} engine cannot keep the spins in a memory-mapped file")
+            memmap_file = CheckerboardEngine.file_name(memmap_dir, kT, B, dimension)
+            setattr(lattice, "_matrix", CheckerboardEngine.random_memmap(memmap_file, dimension, dimension, percentage_ones))
+            engine_options = dict(engine_options or {}, memmap=memmap_file)
+        else:
+            lattice.create_matrix()
+        matrix: np.ndarray = getattr(lattice, "_matrix")
+        samples = MainSimulation.iter_samples(
+            steps, kT, dimension, percentage_ones, J, B, mu, epsilon,
+            profiler=profiler,
+            progress=progress,
+            engine=engine,
+            engine_options=engine_options,
+            burn_in=burn_in,
+            lattice=lattice,
+            incremental_domains=incremental_domains,
+            trajectory_file=(
+                TrajectoryRecorder.file_name(trajectory_dir, kT, B, dimension) if trajectory_dir is not None else None
+            ),
+        )
+
+        phase = profiler.phase if profiler is not None else (lambda name: nullcontext())
+        histogram = JointHistogram(dimension * dimension, 1 / kT, J, B, mu) if histogram_dir is not None else None
+        correlation = SpinCorrelation(matrix.shape) if correlation_length else None
+        pyramid = SnapshotPyramid(matrix.shape, snapshot_levels) if snapshot_dir is not None else None
+        if target_error is not None and moments is None:
+            moments = ObservableMoments(dimension * dimension)
+        steps_used: int = steps
+        samples_taken: int = 0
+        measured_kT: float = None
+
+        # The domains and the curvature of every sample are computed on other processes when asked.
+        pipeline = nullcontext()
+        if analysis_workers > 0:
+            pipeline = AnalysisPipeline(matrix.shape, analysis_workers, curvature=geometric_variables)
+        with pipeline as analysis:
+            for sample in samples:
+                magnetization_array+=sample.magnetization
+                mean_magnetization_array+=sample.magnetization_per_site
+                energy_array+=sample.energy
+                if incremental_domains:
+                    domain_number_array += sample.domain_number
+                    mean_domain_size_array += sample.mean_domain_size
+                if moments is not None:
+                    moments.add(sample.energy, sample.magnetization)
+                if histogram is not None:
+                    histogram.add(sample.energy, sample.magnetization)
+                if correlation is not None:
+                    with phase("correlation"):
+                        correlation.add(sample.matrix)
+                if pyramid is not None:
+                    with phase("coarse_graining"):
+                        pyramid.add(sample.matrix)
+                # Compute Topological Variables on the analysis workers
+                if analysis is not None:
+                    with phase("analysis_submit"):
+                        analysis.submit(sample.matrix)
+                samples_taken += 1
+                measured_kT = sample.temperature
+                # The error estimate is cheap, but only changes noticeably every few samples.
+                if target_error is not None and samples_taken % 16 == 0 and moments.meets_target(target_error, relative_error):
+                    steps_used = sample.step
+                    samples.close()
+                    break
+            if analysis is not None:
+                with phase("analysis_drain"):
+                    analysis_totals = analysis.drain()
+                domain_number_array = analysis_totals["domain_number"]
+                mean_domain_size_array = analysis_totals["mean_domain_size"]
+                if profiler is not None:
+                    profiler.count("analysis_stalls", analysis.stalls)
+
+        if histogram is not None:
+            histogram.save(JointHistogram.file_name(histogram_dir, kT, B, dimension))
+        if pyramid is not None:
+            pyramid.save(SnapshotPyramid.file_name(snapshot_dir, kT, B, dimension), kT=kT, B=B)
+
         if geometric_variables:
-            graph = GeometricVariables.ising_matrix_to_graph(
-                getattr(ising_model, "_matrix")
-            )
-            frc = GeometricVariables.forman_ricci_curvature_edge(
-                graph, 
-                f"forman_ricci_information_dos_{kT:.5f}.png"
-            )
+            with phase("graph"):
+                adjacency = SpinGraph.adjacency(getattr(lattice, "_matrix"))
+            with phase("curvature"):
+                frc, frc_values = SpinGraph.forman_ricci_curvature_values(adjacency)
+            if plot_dir is not None:
+                with phase("plotting"):
+                    GeometricVariables.plot_forman_ricci_distribution(
+                        frc_values,
+                        os.path.join(plot_dir, f"forman_ricci_information_dos_{kT:.5f}_{B:.5f}.png")
+                    )
+            if analysis_workers > 0 and analysis_totals["samples"]:
+                # Average over every sample instead of the last spin matrix only.
+                frc = analysis_totals["forman_ricci_curvature"] / analysis_totals["samples"]
             
+        # The averages are over the samples actually made, whatever the burn-in and the early stop.
+        number_data: int = max(samples_taken, 1)
+        row = [
+            "{:.5f}".format(kT),
+            "{:.5f}".format(B),
+            "{:.5f}".format(energy_array/number_data),
+            "{:.5f}".format(magnetization_array/number_data),
+            "{:.5f}".format(mean_magnetization_array/number_data),
+            "{:.5f}".format(domain_number_array/number_data),
+            "{:.5f}".format(mean_domain_size_array/number_data)
+        ]
         if geometric_variables:
-            return [
-                "{:.5f}".format(kT),
-                "{:.5f}".format(B),
-                "{:.5f}".format(energy_array/number_data),
-                "{:.5f}".format(magnetization_array/number_data),
-                "{:.5f}".format(mean_magnetization_array/number_data),
-                "{:.5f}".format(domain_number_array/number_data),
-                "{:.5f}".format(mean_domain_size_array/number_data),
-                "{:.5f}".format(frc)
-            ]
-        else:
-            return [
-                "{:.5f}".format(kT),
-                "{:.5f}".format(B),
-                "{:.5f}".format(energy_array/number_data),
-                "{:.5f}".format(magnetization_array/number_data),
-                "{:.5f}".format(mean_magnetization_array/number_data),
-                "{:.5f}".format(domain_number_array/number_data),
-                "{:.5f}".format(mean_domain_size_array/number_data)
-            ]
-            
+            row.append("{:.5f}".format(frc))
+        if correlation is not None:
+            row.append("{:.5f}".format(correlation.correlation_length()))
+        if target_error is not None:
+            row.append(str(steps_used))
+            row.append("{:.5f}".format(moments.binning_error("energy")[0]))
+            row.append("{:.5f}".format(moments.binning_error("abs_magnetization")[0]))
+        if Engines.is_microcanonical(engine):
+            row.append("{:.5f}".format(measured_kT or 0.0))
+        return row
@@ -0,0 +1,99 @@
+"""Module providing a class to measure the energy and magnetization of a spin matrix without allocating memory."""
+# Copyright (C) 2023, Erick Jesús Ríos González
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor,
+# Boston, MA  02110-1301, USA.
+
+from typing import Dict, Tuple
+
+import numpy as np
+
+from src.isingenerator.neighbors import Neighbors
+
+
+class MeasurementWorkspace:
+    """Class keeping the buffer used to measure spin matrices of one shape, sample after sample."""
+
+    # Workspaces shared by the points of a process, one per shape and type, see MeasurementWorkspace.shared.
+    _shared: Dict[Tuple[Tuple[int, int], np.dtype], "MeasurementWorkspace"] = {}
+
+    def __init__(self, shape: Tuple[int, int], dtype: np.dtype = np.int64) -> None:
+        """Initialize an instance of MeasurementWorkspace, allocating its buffer once.
+
+        Args:
+            shape (Tuple[int, int]): Shape of the spin matrices.
+            dtype (np.dtype, optional): Type of the spin matrices. Defaults to np.int64.
+
+        Example:
+            >>> matrix = LatticeSquare(64, 64, 0.8).create_matrix()
+            >>> workspace = MeasurementWorkspace(matrix.shape, matrix.dtype)
+            >>> energy, magnetization = workspace.energy_and_magnetization(matrix, 1.0, 0.0, 1.0)
+        """
+        self._buffer = np.empty(shape, dtype=dtype)
+
+    @staticmethod
+    def shared(shape: Tuple[int, int], dtype: np.dtype = np.int64) -> "MeasurementWorkspace":
+        """Return the workspace of a shape shared by every point simulated in this process.
+
+        A sweep measures thousands of samples per point on lattices of a few sizes, so the buffer is
+        allocated once per lattice size instead of once per point. The measurements are synchronous,
+        so the points sharing a workspace never use it at the same time.
+
+        Args:
+            shape (Tuple[int, int]): Shape of the spin matrices.
+            dtype (np.dtype, optional): Type of the spin matrices. Defaults to np.int64.
+
+        Returns:
+            MeasurementWorkspace: The workspace, created on the first call for its shape and type.
+        """
+        key = (tuple(shape), np.dtype(dtype))
+        if key not in MeasurementWorkspace._shared:
+            MeasurementWorkspace._shared[key] = MeasurementWorkspace(shape, dtype)
+        return MeasurementWorkspace._shared[key]
+
+    def neighbor_sums(self, matrix: np.ndarray) -> np.ndarray:
+        """Return the sum of the four nearest neighbors of every site, as Neighbors.sum_of_neighbors.
+
+        The result is the buffer of the workspace, overwritten by the next call.
+
+        Args:
+            matrix (np.ndarray): Spin matrix.
+
+        Returns:
+            np.ndarray: The neighbor sums.
+        """
+        return Neighbors.sum_of_neighbors_into(matrix, self._buffer)
+
+    def energy_and_magnetization(
+        self, matrix: np.ndarray, J: float = 1.0, B: float = 1.0, mu: float = 1.0
+    ) -> Tuple[float, float]:
+        """Measure a spin matrix, with the same results as IsingModel2D.calculate_energy and calculate_magnetization.
+
+        The magnetization is summed once and shared by the field term of the energy.
+
+        Args:
+            matrix (np.ndarray): Spin matrix.
+            J (float): Interaction constant between spins.
+            B (float): External magnetic field.
+            mu (float): Magnetic moment
+
+        Returns:
+            Tuple[float, float]: Total energy and total magnetization of the spin matrix.
+        """
+        products = np.multiply(self.neighbor_sums(matrix), matrix, out=self._buffer)
+        magnetization = np.sum(matrix)
+        interaction_energy = -J * np.sum(products)
+        field_energy = -(B * mu) * magnetization
+        return interaction_energy + field_energy, magnetization
@@ -16,6 +16,8 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor,
 # Boston, MA  02110-1301, USA.
 
+from typing import Any, Tuple
+
 import numpy as np
 from src.isingenerator.lattice_square import LatticeSquare
 from src.isingenerator.neighbors import Neighbors
@@ -24,13 +26,19 @@ class MonteCarloSimulation:
     """Class for implementing the Markov Chain Algorithm."""
 
     @staticmethod
-    def markov_chain_move(lattice: LatticeSquare, N: int, beta: float) -> np.ndarray:
+    def markov_chain_move(
+        lattice: LatticeSquare, N: int, beta: float, observer: Any = None, neighbors: Tuple[Tuple[int, int, int, int], ...] = None
+    ) -> np.ndarray:
         """Implement the Monte Carlo method using the Metropolis algorithm. The goal is to efficiently make the change until reaching the base state using Boltzmann probability as a condition.
 
         Args:
             matrix (np.ndarray): Spin matrix
             N (int): Dimension of the spin matrix.
             beta (float): One divided Boltzmann constant times temperature.
+            observer (Any, optional): Object with a flip_event(row, column, delta_e, accepted) method
+                that is notified of every attempt, such as FlipStatistics. Defaults to None.
+            neighbors (Tuple[Tuple[int, int, int, int], ...], optional): Neighbors.table_tuples for the shape of
+                the lattice, see Neighbors.sum_neighbors_position. Defaults to None.
 
         Returns:
             np.ndarray: The matrix after making spin changes, aiming to achieve the minimum energy.
@@ -41,14 +49,20 @@ class MonteCarloSimulation:
             getattr(lattice, "_matrix"),
             a,
             b,
-            N
+            N,
+            neighbors,
             )
         delta_e = MonteCarloSimulation.delta_energy(site, sum_neigh)
+        accepted = False
         if delta_e < 0:
             site *= -1
+            accepted = True
         elif np.random.random() < np.exp(-delta_e * beta):
             site *= -1
+            accepted = True
         getattr(lattice, "_matrix")[a, b] = site
+        if observer is not None:
+            observer.flip_event(a, b, delta_e, accepted)
         return getattr(lattice, "_matrix")
 
     @staticmethod
@@ -16,6 +16,9 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor,
 # Boston, MA  02110-1301, USA.
 
+from functools import lru_cache
+from typing import Tuple
+
 import numpy as np
 
 
@@ -39,22 +42,102 @@ class Neighbors:
         return sum_neighbors
 
     @staticmethod
-    def sum_neighbors_position(matrix: np.ndarray, row: int, column: int, N: int) -> int:
+    def sum_of_neighbors_into(matrix: np.ndarray, out: np.ndarray) -> np.ndarray:
+        """Calculate the same sums as sum_of_neighbors into a preallocated array, without temporaries.
+
+        The periodic boundary is handled with slices: the bulk of each shifted copy is added in one
+        operation and the wrapped row or column in another.
+
+        Args:
+            matrix (np.ndarray): Spin matrix.
+            out (np.ndarray): Array of the shape and type of the matrix receiving the sums.
+
+        Returns:
+            np.ndarray: The out array.
+        """
+        # Neighbor below, matrix[i + 1, j].
+        np.copyto(out[:-1], matrix[1:])
+        np.copyto(out[-1:], matrix[:1])
+        # Neighbor above, matrix[i - 1, j].
+        np.add(out[1:], matrix[:-1], out=out[1:])
+        np.add(out[:1], matrix[-1:], out=out[:1])
+        # Neighbor on the right, matrix[i, j + 1].
+        np.add(out[:, :-1], matrix[:, 1:], out=out[:, :-1])
+        np.add(out[:, -1:], matrix[:, :1], out=out[:, -1:])
+        # Neighbor on the left, matrix[i, j - 1].
+        np.add(out[:, 1:], matrix[:, :-1], out=out[:, 1:])
+        np.add(out[:, :1], matrix[:, -1:], out=out[:, :1])
+        return out
+
+    @staticmethod
+    @lru_cache(maxsize=16)
+    def table(rows: int, columns: int) -> np.ndarray:
+        """Get the flat indices of the four nearest neighbors of every site, with periodic boundary conditions.
+
+        This is the single place where the boundary is handled for the site-by-site code. The table
+        is built once per shape and shared, so it is read-only.
+
+        Args:
+            rows (int): Number of rows of the matrix.
+            columns (int): Number of columns of the matrix.
+
+        Returns:
+            np.ndarray: A (rows * columns, 4) int32 array, row i * columns + j holding the neighbors of
+                site (i, j) in the order below, right, above, left.
+
+        Example:
+            >>> below, right, above, left = Neighbors.table(15, 20)[3 * 20 + 19]
+            >>> divmod(int(right), 20)
+            (3, 0)
+        """
+        index = np.arange(rows * columns, dtype=np.int32).reshape(rows, columns)
+        table = np.stack(
+            (
+                np.roll(index, -1, axis=0).ravel(),
+                np.roll(index, -1, axis=1).ravel(),
+                np.roll(index, 1, axis=0).ravel(),
+                np.roll(index, 1, axis=1).ravel(),
+            ),
+            axis=1,
+        )
+        table.setflags(write=False)
+        return table
+
+    @staticmethod
+    @lru_cache(maxsize=16)
+    def table_tuples(rows: int, columns: int) -> Tuple[Tuple[int, int, int, int], ...]:
+        """Get Neighbors.table as Python integers, faster to index one site at a time in pure Python loops.
+
+        Args:
+            rows (int): Number of rows of the matrix.
+            columns (int): Number of columns of the matrix.
+
+        Returns:
+            Tuple[Tuple[int, int, int, int], ...]: The neighbors of every site, as in Neighbors.table.
+        """
+        return tuple(map(tuple, Neighbors.table(rows, columns).tolist()))
+
+    @staticmethod
+    def sum_neighbors_position(
+        matrix: np.ndarray, row: int, column: int, N: int = None, neighbors: Tuple[Tuple[int, int, int, int], ...] = None
+    ) -> int:
         """Get the sum of the nearest neighbors due to a spin in a site on the Spin matrix.
 
         Args:
             row (int): Row of position in matrix.
             column (int): Column of position in matrix
-            N (int): Dimension of matrix.
+            N (int, optional): Dimension of matrix. Unused, the neighbors come from Neighbors.table for the
+                shape of the matrix, which may be rectangular.
+            neighbors (Tuple[Tuple[int, int, int, int], ...], optional): Neighbors.table_tuples for the shape of
+                the matrix, looked up when None. Callers in a loop pass it to skip the lookup. Defaults to None.
 
         Returns:
             int: Sum of nearest neighbors for a spin in a position [a,b]
         """
-        a, b = row, column
-        nb = (
-            matrix[(a + 1) % N, b]
-            + matrix[a, (b + 1) % N]
-            + matrix[(a - 1) % N, b]
-            + matrix[a, (b - 1) % N]
-        )
+        columns = matrix.shape[1]
+        if neighbors is None:
+            neighbors = Neighbors.table_tuples(matrix.shape[0], columns)
+        below, right, above, left = neighbors[row * columns + column]
+        spins = matrix.reshape(-1)
+        nb = spins[below] + spins[right] + spins[above] + spins[left]
         return nb
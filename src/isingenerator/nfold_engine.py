@@ -0,0 +1,177 @@
+"""Module providing a rejection-free n-fold way engine (Bortz, Kalos and Lebowitz) for low temperatures."""
+# Copyright (C) 2023, Erick Jesús Ríos González
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor,
+# Boston, MA  02110-1301, USA.
+
+import math
+import random
+from typing import Any, List
+
+import numpy as np
+
+from src.isingenerator.lattice_square import LatticeSquare
+from src.isingenerator.neighbors import Neighbors
+
+
+class NFoldWayEngine:
+    """Engine making only the accepted flips of the single spin-flip Metropolis chain.
+
+    The sites are kept in five buckets by flip class, the energy change 2 * s * (sum of the
+    neighbors) being -8, -4, 0, 4 or 8, with a position index so that a site moves between buckets
+    in O(1). A Metropolis attempt flips a site of class k with probability p_k / sites, so the
+    probability Q that an attempt flips anything is the sum over the classes of n_k * p_k / sites.
+    Instead of drawing the attempts one by one, the engine draws the number of attempts until the
+    next flip from the geometric distribution of parameter Q, picks the class with probability
+    n_k * p_k / (Q * sites) and the site uniformly in its bucket, flips it and moves it and its four
+    neighbors to their new buckets.
+
+    The clock counts Metropolis attempts, so the state after a number of attempts has the law of
+    the Metropolis chain after as many steps, and samples taken at fixed steps weight every state
+    by the time the chain stays in it. An event costs more than an attempt of MetropolisEngine but
+    replaces 1 / Q of them: at kT = 0.5, where Q is of order exp(-16), the saving is enormous,
+    while above the critical temperature, where most attempts are accepted, it is a small factor.
+    """
+
+    def __init__(self, lattice: LatticeSquare, beta: float, **options: Any) -> None:
+        """Initialize an instance of NFoldWayEngine.
+
+        Args:
+            lattice (LatticeSquare): The lattice with its spin matrix already created.
+            beta (float): One divided Boltzmann constant times temperature.
+            **options (Any): Options of other engines, ignored.
+
+        Example:
+            >>> engine = Engines.create("nfold", lattice, 1 / 0.5)
+            >>> engine.advance(10**9)
+        """
+        self._lattice = lattice
+        matrix = getattr(lattice, "_matrix")
+        rows, columns = matrix.shape
+        self._sites = rows * columns
+        self._table = Neighbors.table_tuples(rows, columns)
+        self._spins: List[int] = [int(spin) for spin in matrix.ravel()]
+        # Class k has energy change 4 * (k - 2) and Metropolis acceptance min(1, exp(-4 beta (k - 2))).
+        self._acceptance = [min(1.0, math.exp(-4 * beta * (k - 2))) for k in range(5)]
+        self._buckets: List[List[int]] = [[] for _ in range(5)]
+        self._class: List[int] = [0] * self._sites
+        self._position: List[int] = [0] * self._sites
+        for site in range(self._sites):
+            k = self._site_class(site)
+            self._class[site] = k
+            self._position[site] = len(self._buckets[k])
+            self._buckets[k].append(site)
+        self._attempted = [0.0] * 5
+        self._reported = [0] * 5
+        self._time = 0
+        self._next_flip = self._draw_wait()
+
+    def _site_class(self, site: int) -> int:
+        """Return the flip class of a site, (s * (sum of the neighbors) + 4) / 2."""
+        spins = self._spins
+        a, b, c, d = self._table[site]
+        return (spins[site] * (spins[a] + spins[b] + spins[c] + spins[d]) + 4) // 2
+
+    def _move(self, site: int, k: int) -> None:
+        """Move a site to the bucket of class k, swapping the last site of its bucket into its place."""
+        old = self._class[site]
+        if old == k:
+            return
+        bucket = self._buckets[old]
+        position = self._position[site]
+        last = bucket.pop()
+        if last != site:
+            bucket[position] = last
+            self._position[last] = position
+        self._class[site] = k
+        self._position[site] = len(self._buckets[k])
+        self._buckets[k].append(site)
+
+    def _rates(self) -> List[float]:
+        """Return n_k * p_k for every class."""
+        return [len(bucket) * p for bucket, p in zip(self._buckets, self._acceptance)]
+
+    def flip_probability(self) -> float:
+        """Return the probability Q that a Metropolis attempt flips a spin in the current state."""
+        return sum(self._rates()) / self._sites
+
+    def _draw_wait(self) -> int:
+        """Draw the step of the next flip, the number of attempts until it following a geometric distribution."""
+        probability = self.flip_probability()
+        if probability <= 0:
+            wait = math.inf
+        elif probability >= 1:
+            wait = 1
+        else:
+            wait = 1 + int(math.log(1 - random.random()) / math.log1p(-probability))
+        return self._time + wait if wait != math.inf else math.inf
+
+    def _count_rejections(self, attempts: int) -> None:
+        """Add the expected attempts per class of a stretch of rejected attempts, proportional to n_k * (1 - p_k)."""
+        weights = [len(bucket) * (1 - p) for bucket, p in zip(self._buckets, self._acceptance)]
+        total = sum(weights)
+        if total > 0:
+            for k, weight in enumerate(weights):
+                self._attempted[k] += attempts * weight / total
+
+    def _flip(self) -> int:
+        """Make one flip chosen with the n-fold way and return its class."""
+        rates = self._rates()
+        threshold = random.random() * sum(rates)
+        # The last class with a non-zero rate absorbs the rounding of the threshold.
+        k = max(k for k in range(5) if rates[k] > 0)
+        for candidate in range(k):
+            if threshold < rates[candidate]:
+                k = candidate
+                break
+            threshold -= rates[candidate]
+        bucket = self._buckets[k]
+        site = bucket[int(random.random() * len(bucket))]
+        self._spins[site] = -self._spins[site]
+        getattr(self._lattice, "_matrix").flat[site] = self._spins[site]
+        self._move(site, 4 - k)
+        for neighbor in self._table[site]:
+            self._move(neighbor, self._site_class(neighbor))
+        return k
+
+    def advance(self, attempts: int, observer: Any = None) -> np.ndarray:
+        """Advance the clock by a number of Metropolis attempts, making the flips falling in that time.
+
+        Args:
+            attempts (int): Number of attempts.
+            observer (Any, optional): Object with an add_counts(attempted, accepted) method receiving the counts
+                per class of energy change, such as FlipStatistics. The rejected attempts per class are the
+                expected ones given the classes of the sites, rounded down. Defaults to None.
+
+        Returns:
+            np.ndarray: The spin matrix after the attempts.
+        """
+        target = self._time + attempts
+        accepted = [0] * 5
+        while self._next_flip <= target:
+            self._count_rejections(self._next_flip - self._time - 1)
+            self._time = self._next_flip
+            k = self._flip()
+            accepted[k] += 1
+            self._attempted[k] += 1
+            self._next_flip = self._draw_wait()
+        self._count_rejections(target - self._time)
+        self._time = target
+        add_counts = getattr(observer, "add_counts", None)
+        if add_counts is not None:
+            attempted = [int(total) - reported for total, reported in zip(self._attempted, self._reported)]
+            self._reported = [reported + count for reported, count in zip(self._reported, attempted)]
+            add_counts(attempted, accepted)
+        return getattr(self._lattice, "_matrix")
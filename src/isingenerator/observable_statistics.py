@@ -0,0 +1,227 @@
+"""Module providing a class to accumulate the moments of the observables sampled along a Markov chain."""
+# Copyright (C) 2023, Erick Jesús Ríos González
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor,
+# Boston, MA  02110-1301, USA.
+
+import math
+from typing import Dict, List, Tuple
+
+
+class BinningAnalysis:
+    """Class estimating the standard error of the mean of a correlated series by streaming binning.
+
+    Level k holds the means of consecutive blocks of 2 ** k samples, each level keeping only its
+    count, sum, sum of squares and the block waiting for a partner, so memory grows with the
+    logarithm of the number of samples. The naive error of the block means grows with k until the
+    blocks are longer than the autocorrelation time, then stays on a plateau at the true error.
+    """
+
+    # Fewest blocks for the error of a level to be used.
+    MIN_BLOCKS = 32
+    # Number of highest levels that must agree for the error to be on its plateau.
+    PLATEAU_LEVELS = 3
+
+    def __init__(self) -> None:
+        """Initialize an empty instance of BinningAnalysis.
+
+        Example:
+            >>> binning = BinningAnalysis()
+            >>> for value in series:
+            ...     binning.add(value)
+            >>> error, reliable = binning.error()
+        """
+        self._waiting: List[float] = []
+        self._count: List[int] = []
+        self._sum: List[float] = []
+        self._sum_squares: List[float] = []
+
+    def add(self, value: float) -> None:
+        """Add one sample, merging the completed blocks into the next level."""
+        level = 0
+        while True:
+            if level == len(self._count):
+                self._waiting.append(None)
+                self._count.append(0)
+                self._sum.append(0.0)
+                self._sum_squares.append(0.0)
+            self._count[level] += 1
+            self._sum[level] += value
+            self._sum_squares[level] += value * value
+            if self._waiting[level] is None:
+                self._waiting[level] = value
+                return
+            value = (self._waiting[level] + value) / 2
+            self._waiting[level] = None
+            level += 1
+
+    def mean(self) -> float:
+        """Return the mean of the samples, 0 before the first one."""
+        return self._sum[0] / self._count[0] if self._count else 0.0
+
+    def level_errors(self) -> List[float]:
+        """Return the naive standard error of the block means of every level with at least two blocks."""
+        errors = []
+        for count, total, squares in zip(self._count, self._sum, self._sum_squares):
+            if count < 2:
+                break
+            variance = max(squares / count - (total / count) ** 2, 0.0)
+            errors.append(math.sqrt(variance / (count - 1)))
+        return errors
+
+    def error(self) -> Tuple[float, bool]:
+        """Return the binning estimate of the standard error and whether it has reached its plateau.
+
+        The estimate is the largest error over the levels with at least MIN_BLOCKS blocks. It is taken
+        as reliable when the PLATEAU_LEVELS highest of those levels all agree within the statistical
+        uncertainty of the highest one. Two levels agree by chance too often while the errors are still
+        rising, which stopped strongly correlated chains after a few dozen samples.
+
+        Returns:
+            Tuple[float, bool]: The error, 0 before MIN_BLOCKS samples, and whether it is reliable.
+        """
+        errors = [
+            error for error, count in zip(self.level_errors(), self._count)
+            if count >= BinningAnalysis.MIN_BLOCKS
+        ]
+        if not errors:
+            return 0.0, False
+        if len(errors) < BinningAnalysis.PLATEAU_LEVELS:
+            return max(errors), False
+        top = len(errors) - 1
+        tolerance = errors[top] * math.sqrt(2 / (self._count[top] - 1))
+        flat = all(
+            abs(errors[top] - errors[top - level]) <= tolerance
+            for level in range(1, BinningAnalysis.PLATEAU_LEVELS)
+        )
+        return max(errors), flat
+
+
+class ObservableMoments:
+    """Class accumulating the mean and variance of the energy and absolute magnetization per site.
+
+    The moments are updated one sample at a time with Welford's algorithm, so no sample is stored.
+    """
+
+    QUANTITIES = ("energy", "abs_magnetization")
+
+    def __init__(self, sites: int) -> None:
+        """Initialize an instance of ObservableMoments.
+
+        Args:
+            sites (int): Number of spins of the lattice.
+
+        Example:
+            >>> moments = ObservableMoments(4)
+            >>> moments.add(-8.0, 4.0)
+            >>> moments.add(-4.0, -2.0)
+            >>> moments.mean("abs_magnetization")
+            0.75
+        """
+        self.sites = sites
+        self.count = 0
+        self._mean: Dict[str, float] = {name: 0.0 for name in ObservableMoments.QUANTITIES}
+        self._m2: Dict[str, float] = {name: 0.0 for name in ObservableMoments.QUANTITIES}
+        self._binning: Dict[str, BinningAnalysis] = {name: BinningAnalysis() for name in ObservableMoments.QUANTITIES}
+
+    def add(self, energy: float, magnetization: float) -> None:
+        """Add one sample.
+
+        Args:
+            energy (float): Energy of the lattice, as returned by IsingModel2D.calculate_energy.
+            magnetization (float): Magnetization of the lattice.
+        """
+        self.count += 1
+        for name, value in (("energy", energy / self.sites), ("abs_magnetization", abs(magnetization) / self.sites)):
+            delta = value - self._mean[name]
+            self._mean[name] += delta / self.count
+            self._m2[name] += delta * (value - self._mean[name])
+            self._binning[name].add(value)
+
+    def mean(self, name: str) -> float:
+        """Return the mean of a quantity per site.
+
+        Args:
+            name (str): "energy" or "abs_magnetization".
+        """
+        return self._mean[name]
+
+    def variance(self, name: str) -> float:
+        """Return the population variance of a quantity per site, 0 with less than two samples.
+
+        Args:
+            name (str): "energy" or "abs_magnetization".
+        """
+        return self._m2[name] / self.count if self.count > 1 else 0.0
+
+    def standard_error(self, name: str) -> float:
+        """Return the standard error of the mean of a quantity, treating the samples as independent.
+
+        Successive samples of the chain are correlated, so this underestimates the true error
+        near the transition; it is meant to rank points, not to report error bars.
+
+        Args:
+            name (str): "energy" or "abs_magnetization".
+        """
+        if self.count < 2:
+            return 0.0
+        return math.sqrt(self._m2[name] / (self.count - 1) / self.count)
+
+    def binning_error(self, name: str) -> Tuple[float, bool]:
+        """Return the standard error of the mean of a quantity accounting for the autocorrelation of the chain.
+
+        Args:
+            name (str): "energy" or "abs_magnetization".
+
+        Returns:
+            Tuple[float, bool]: The error and whether it is reliable, see BinningAnalysis.error.
+        """
+        return self._binning[name].error()
+
+    def meets_target(self, target_error: float, relative: bool = False) -> bool:
+        """Return True when the binning error of every quantity is reliable and within a target.
+
+        Args:
+            target_error (float): The largest standard error accepted, per site.
+            relative (bool, optional): Compare the error to target_error times the absolute value of the mean.
+                Defaults to False.
+        """
+        for name in ObservableMoments.QUANTITIES:
+            error, reliable = self.binning_error(name)
+            limit = target_error * abs(self.mean(name)) if relative else target_error
+            if not reliable or error > limit:
+                return False
+        return True
+
+    def summary(self, kT: float) -> Dict[str, float]:
+        """Return the observables of the point and their errors.
+
+        Args:
+            kT (float): Temperature of the point.
+
+        Returns:
+            Dict[str, float]: kT, the energy and absolute magnetization per site with their standard errors,
+                the heat capacity and the magnetic susceptibility per site.
+        """
+        beta = 1 / kT
+        return {
+            "kT": kT,
+            "energy": self.mean("energy"),
+            "energy_error": self.standard_error("energy"),
+            "abs_magnetization": self.mean("abs_magnetization"),
+            "abs_magnetization_error": self.standard_error("abs_magnetization"),
+            "heat_capacity": beta * beta * self.sites * self.variance("energy"),
+            "susceptibility": beta * self.sites * self.variance("abs_magnetization"),
+        }
@@ -0,0 +1,215 @@
+"""Module providing classes to instrument the simulation of the 2D Ising Model with timers and counters."""
+# Copyright (C) 2023, Erick Jesús Ríos González
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor,
+# Boston, MA  02110-1301, USA.
+
+import json
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+
+class FlipStatistics:
+    """Class for counting attempted and accepted spin flips per class of energy change."""
+
+    # Possible values of the energy change of a single flip on the square lattice.
+    DELTA_E_CLASSES = (-8, -4, 0, 4, 8)
+
+    def __init__(self) -> None:
+        """Initialize an instance of FlipStatistics with every counter set to zero.
+
+        Example:
+            >>> statistics = FlipStatistics()
+            >>> statistics.flip_event(0, 0, 4, True)
+            >>> statistics.total_accepted()
+            1
+        """
+        self.attempted: List[int] = [0] * len(FlipStatistics.DELTA_E_CLASSES)
+        self.accepted: List[int] = [0] * len(FlipStatistics.DELTA_E_CLASSES)
+
+    def flip_event(self, row: int, column: int, delta_e: int, accepted: bool) -> None:
+        """Record one attempted flip.
+
+        Args:
+            row (int): Row of the site chosen.
+            column (int): Column of the site chosen.
+            delta_e (int): Energy change of the flip.
+            accepted (bool): Whether the flip was accepted.
+        """
+        index = (int(delta_e) + 8) // 4
+        self.attempted[index] += 1
+        if accepted:
+            self.accepted[index] += 1
+
+    def add_counts(self, attempted: List[int], accepted: List[int]) -> None:
+        """Record many attempted flips at once, as counted by vectorized engines.
+
+        Args:
+            attempted (List[int]): Attempted flips per class of DELTA_E_CLASSES.
+            accepted (List[int]): Accepted flips per class of DELTA_E_CLASSES.
+        """
+        for index in range(len(FlipStatistics.DELTA_E_CLASSES)):
+            self.attempted[index] += int(attempted[index])
+            self.accepted[index] += int(accepted[index])
+
+    def total_attempted(self) -> int:
+        """Return the number of attempted flips."""
+        return sum(self.attempted)
+
+    def total_accepted(self) -> int:
+        """Return the number of accepted flips."""
+        return sum(self.accepted)
+
+    def acceptance_rate(self) -> float:
+        """Return the fraction of attempted flips that were accepted, 0 if nothing was attempted."""
+        attempted = self.total_attempted()
+        return self.total_accepted() / attempted if attempted else 0.0
+
+    def merge(self, other: "FlipStatistics") -> None:
+        """Add the counters of another instance to this one.
+
+        Args:
+            other (FlipStatistics): The counters to add.
+        """
+        for index in range(len(FlipStatistics.DELTA_E_CLASSES)):
+            self.attempted[index] += other.attempted[index]
+            self.accepted[index] += other.accepted[index]
+
+    def to_dict(self) -> Dict:
+        """Return the counters and the acceptance rate per class of energy change."""
+        return {
+            "attempted": self.total_attempted(),
+            "accepted": self.total_accepted(),
+            "acceptance_rate": self.acceptance_rate(),
+            "by_delta_e": {
+                str(delta_e): {
+                    "attempted": attempted,
+                    "accepted": accepted,
+                    "acceptance_rate": accepted / attempted if attempted else 0.0,
+                }
+                for delta_e, attempted, accepted in zip(
+                    FlipStatistics.DELTA_E_CLASSES, self.attempted, self.accepted
+                )
+            },
+        }
+
+
+class SimulationProfiler:
+    """Class for collecting the time per phase and the counters of a simulation run."""
+
+    def __init__(self) -> None:
+        """Initialize an empty profiler.
+
+        Example:
+            >>> profiler = SimulationProfiler()
+            >>> with profiler.phase("plotting"):
+            ...     pass
+            >>> profiler.count("samples")
+        """
+        self.phases: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self.flips: FlipStatistics = FlipStatistics()
+        self.points: List[Dict] = []
+        self._start = time.perf_counter()
+
+    def add_time(self, name: str, seconds: float) -> None:
+        """Accumulate time on a phase.
+
+        Args:
+            name (str): The name of the phase.
+            seconds (float): The time spent in seconds.
+        """
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Context manager that accumulates the time spent inside it on a phase.
+
+        Args:
+            name (str): The name of the phase.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """Increase a counter.
+
+        Args:
+            name (str): The name of the counter.
+            amount (int, optional): The amount to add. Defaults to 1.
+        """
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    @contextmanager
+    def point(self, kT: float, B: float) -> Iterator[None]:
+        """Context manager that records the wall time and acceptance rate of one (kT, B) point.
+
+        Args:
+            kT (float): Temperature of the point.
+            B (float): Magnetic field of the point.
+        """
+        start = time.perf_counter()
+        attempted = self.flips.total_attempted()
+        accepted = self.flips.total_accepted()
+        try:
+            yield
+        finally:
+            attempted = self.flips.total_attempted() - attempted
+            accepted = self.flips.total_accepted() - accepted
+            self.points.append(
+                {
+                    "kT": float(kT),
+                    "B": float(B),
+                    "seconds": time.perf_counter() - start,
+                    "attempted": attempted,
+                    "acceptance_rate": accepted / attempted if attempted else 0.0,
+                }
+            )
+
+    def merge(self, other: "SimulationProfiler") -> None:
+        """Add the phases, counters, flips and points of another profiler to this one.
+
+        Args:
+            other (SimulationProfiler): The profiler to add.
+        """
+        for name, seconds in other.phases.items():
+            self.add_time(name, seconds)
+        for name, amount in other.counters.items():
+            self.count(name, amount)
+        self.flips.merge(other.flips)
+        self.points.extend(other.points)
+
+    def report(self) -> Dict:
+        """Return the collected information as a JSON serializable dictionary."""
+        return {
+            "wall_time": time.perf_counter() - self._start,
+            "phases": dict(self.phases),
+            "counters": dict(self.counters),
+            "flips": self.flips.to_dict(),
+            "points": list(self.points),
+        }
+
+    def write_json(self, file_name: str) -> None:
+        """Write the report to a JSON file.
+
+        Args:
+            file_name (str): The name of the JSON file.
+        """
+        with open(file_name, mode="w", encoding="utf-8") as json_file:
+            json.dump(self.report(), json_file, indent=2)
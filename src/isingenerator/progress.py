@@ -0,0 +1,198 @@
+"""Module providing classes to report the progress of long sweeps of the 2D Ising Model."""
+# Copyright (C) 2023, Erick Jesús Ríos González
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor,
+# Boston, MA  02110-1301, USA.
+
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, TextIO
+
+from src.isingenerator.profiler import FlipStatistics
+
+
+@dataclass
+class ProgressEvent:
+    """Structured progress information of a sweep.
+
+    Attributes:
+        kT (float): Temperature of the current point.
+        B (float): Magnetic field of the current point.
+        point (int): Index of the current point, starting at 0.
+        total_points (int): Number of points of the sweep.
+        steps_done (int): Steps done on the current point.
+        steps (int): Steps of every point.
+        sweeps_per_second (float): Lattice sweeps (dimension * dimension attempts) per second since the sweep started.
+        acceptance_rate (float): Fraction of accepted flips since the last event.
+        elapsed (float): Seconds since the sweep started.
+        eta (float): Estimated seconds until the whole sweep ends.
+        fraction (float): Fraction of the whole sweep done.
+    """
+
+    kT: float
+    B: float
+    point: int
+    total_points: int
+    steps_done: int
+    steps: int
+    sweeps_per_second: float
+    acceptance_rate: float
+    elapsed: float
+    eta: float
+    fraction: float
+
+
+class ProgressTracker:
+    """Class that turns the step counter of a sweep into ProgressEvent objects emitted at a bounded rate."""
+
+    def __init__(
+        self,
+        callback: Callable[[ProgressEvent], None],
+        total_points: int,
+        steps: int,
+        dimension: int,
+        min_interval: float = 1.0,
+        check_every: int = 4096,
+    ) -> None:
+        """Initialize an instance of ProgressTracker.
+
+        Args:
+            callback (Callable[[ProgressEvent], None]): Function receiving the events.
+            total_points (int): Number of points of the sweep.
+            steps (int): Steps of every point.
+            dimension (int): Dimension of the spin matrix.
+            min_interval (float, optional): Minimum seconds between two events. Defaults to 1.0.
+            check_every (int, optional): Steps between two looks at the clock. Defaults to 4096.
+
+        Example:
+            >>> tracker = ProgressTracker(print, total_points=10, steps=1000, dimension=16)
+        """
+        self.callback = callback
+        self.total_points = total_points
+        self.steps = steps
+        self.sites = dimension * dimension
+        self.min_interval = min_interval
+        self.check_every = check_every
+        self.flips = FlipStatistics()
+        self._points_done = 0
+        self._kT = 0.0
+        self._B = 0.0
+        self._start = time.perf_counter()
+        self._last_time = self._start
+        self._last_attempted = 0
+        self._last_accepted = 0
+
+    def start_point(self, kT: float, B: float) -> None:
+        """Mark the beginning of a new (kT, B) point.
+
+        Args:
+            kT (float): Temperature of the point.
+            B (float): Magnetic field of the point.
+        """
+        self._kT = float(kT)
+        self._B = float(B)
+
+    def update(self, steps_done: int, statistics: FlipStatistics = None, force: bool = False) -> None:
+        """Report the steps done on the current point and emit an event if enough time has passed.
+
+        Args:
+            steps_done (int): Steps done on the current point.
+            statistics (FlipStatistics, optional): Flip counters of the chain. Defaults to the ones of the tracker.
+            force (bool, optional): Emit the event regardless of the time since the last one. Defaults to False.
+        """
+        now = time.perf_counter()
+        interval = now - self._last_time
+        if not force and interval < self.min_interval:
+            return
+        statistics = self.flips if statistics is None else statistics
+
+        attempted = statistics.total_attempted()
+        accepted = statistics.total_accepted()
+        window = attempted - self._last_attempted
+        acceptance_rate = (accepted - self._last_accepted) / window if window > 0 else 0.0
+        elapsed = now - self._start
+        total = self.total_points * self.steps
+        done = self._points_done * self.steps + steps_done
+        steps_rate = done / elapsed if elapsed > 0 else 0.0
+        fraction = done / total if total else 1.0
+        eta = elapsed * (total - done) / done if done else float("inf")
+
+        self.callback(
+            ProgressEvent(
+                kT=self._kT,
+                B=self._B,
+                point=self._points_done,
+                total_points=self.total_points,
+                steps_done=steps_done,
+                steps=self.steps,
+                sweeps_per_second=steps_rate / self.sites,
+                acceptance_rate=acceptance_rate,
+                elapsed=elapsed,
+                eta=eta,
+                fraction=fraction,
+            )
+        )
+        self._last_time = now
+        self._last_attempted = attempted
+        self._last_accepted = accepted
+
+    def finish_point(self, statistics: FlipStatistics = None) -> None:
+        """Mark the current point as done, the event of the last point of the sweep is always emitted.
+
+        Args:
+            statistics (FlipStatistics, optional): Flip counters of the chain. Defaults to the ones of the tracker.
+        """
+        self.update(self.steps, statistics, force=self._points_done + 1 >= self.total_points)
+        self._points_done += 1
+
+
+class ConsoleProgress:
+    """Callback that prints a compact one-line progress display."""
+
+    def __init__(self, stream: TextIO = sys.stderr) -> None:
+        """Initialize an instance of ConsoleProgress.
+
+        Args:
+            stream (TextIO, optional): Where the display is written. Defaults to sys.stderr.
+        """
+        self.stream = stream
+
+    @staticmethod
+    def _format_seconds(seconds: float) -> str:
+        """Format seconds as HH:MM:SS, or --:--:-- if unknown."""
+        if seconds == float("inf"):
+            return "--:--:--"
+        seconds = int(seconds)
+        return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+    def __call__(self, event: ProgressEvent) -> None:
+        """Print an event over the previous line.
+
+        Args:
+            event (ProgressEvent): The event to print.
+        """
+        point = min(event.point + 1, event.total_points)
+        self.stream.write(
+            f"\r[{point:>{len(str(event.total_points))}}/{event.total_points}] "
+            f"kT={event.kT:.5f} B={event.B:.5f} "
+            f"{event.fraction:6.1%} "
+            f"{event.sweeps_per_second:9.1f} sweeps/s "
+            f"acc={event.acceptance_rate:.3f} "
+            f"ETA {ConsoleProgress._format_seconds(event.eta)}"
+        )
+        if event.fraction >= 1.0:
+            self.stream.write("\n")
+        self.stream.flush()
@@ -0,0 +1,224 @@
+"""Module providing classes to record energy-magnetization histograms and reweight them to other temperatures."""
+# Copyright (C) 2023, Erick Jesús Ríos González
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor,
+# Boston, MA  02110-1301, USA.
+
+import glob
+import os
+from collections import Counter
+from typing import Dict, List, Sequence
+
+import numpy as np
+from scipy.special import logsumexp
+
+
+class JointHistogram:
+    """Class counting the samples of a run per (energy, magnetization) pair.
+
+    The energy recorded is the one the chain samples, E = -sum over bonds of s_i * s_j, each bond
+    counted once, with J = 1 and no field: the Metropolis moves ignore J, B and mu. It is recovered
+    exactly from the energy measured by IsingModel2D.calculate_energy, which counts each bond twice
+    and includes the field term.
+    """
+
+    def __init__(self, sites: int, beta: float, J: float = 1.0, B: float = 0.0, mu: float = 1.0) -> None:
+        """Initialize an empty instance of JointHistogram.
+
+        Args:
+            sites (int): Number of spins of the lattice.
+            beta (float): One divided Boltzmann constant times the temperature of the run.
+            J (float, optional): Interaction constant of the measured energies. Defaults to 1.0.
+            B (float, optional): External magnetic field of the measured energies. Defaults to 0.0.
+            mu (float, optional): Magnetic moment of the measured energies. Defaults to 1.0.
+
+        Raises:
+            ValueError: If J is 0, the bonds cannot be recovered from the energy.
+
+        Example:
+            >>> histogram = JointHistogram(16, 1 / 2.27)
+            >>> histogram.add(-32.0, 16)
+            >>> histogram.counts
+            Counter({(-16, 16): 1})
+        """
+        if J == 0:
+            raise ValueError("The bond energy cannot be recovered from energies measured with J = 0")
+        self.sites = sites
+        self.beta = beta
+        self._J = J
+        self._field = B * mu
+        self.counts: Counter = Counter()
+
+    def add(self, energy: float, magnetization: float) -> None:
+        """Add one sample.
+
+        Args:
+            energy (float): Energy as returned by IsingModel2D.calculate_energy with the J, B and mu of the histogram.
+            magnetization (float): Total magnetization.
+        """
+        magnetization = int(round(magnetization))
+        bonds_twice = int(round(-(energy + self._field * magnetization) / self._J))
+        self.counts[(-bonds_twice // 2, magnetization)] += 1
+
+    def total(self) -> int:
+        """Return the number of samples."""
+        return sum(self.counts.values())
+
+    def save(self, file_name: str) -> None:
+        """Save the histogram to a NumPy .npz file.
+
+        Args:
+            file_name (str): The name of the file.
+        """
+        keys = sorted(self.counts)
+        np.savez(
+            file_name,
+            energy=np.array([key[0] for key in keys], dtype=np.int64),
+            magnetization=np.array([key[1] for key in keys], dtype=np.int64),
+            count=np.array([self.counts[key] for key in keys], dtype=np.int64),
+            beta=self.beta,
+            sites=self.sites,
+        )
+
+    @staticmethod
+    def load(file_name: str) -> "JointHistogram":
+        """Load a histogram saved by JointHistogram.save.
+
+        Args:
+            file_name (str): The name of the file.
+
+        Returns:
+            JointHistogram: The histogram.
+        """
+        with np.load(file_name) as data:
+            histogram = JointHistogram(int(data["sites"]), float(data["beta"]))
+            for energy, magnetization, count in zip(data["energy"], data["magnetization"], data["count"]):
+                histogram.counts[(int(energy), int(magnetization))] = int(count)
+        return histogram
+
+    @staticmethod
+    def file_name(directory: str, kT: float, B: float, dimension: int) -> str:
+        """Return the file of the histogram of a point in a histogram directory."""
+        return os.path.join(directory, "histogram_{:.5f}_{:.5f}_{}.npz".format(kT, B, dimension))
+
+
+class Reweighting:
+    """Class combining the histograms of several runs (multiple histogram method of Ferrenberg and Swendsen).
+
+    The density of states g(E, M) and the free energies f_k of the runs are found by iterating the
+    WHAM equations in log space until the free energies change less than the tolerance. Observables
+    then follow at any temperature by weighting g(E, M) with exp(-E / kT). They are reliable only
+    between and near the simulated temperatures, where the histograms overlap.
+
+    The samples are treated as independent; histograms from runs with very different autocorrelation
+    times are not weighted by their statistical inefficiency.
+    """
+
+    def __init__(self, histograms: Sequence[JointHistogram], tolerance: float = 1e-10, max_iterations: int = 100000) -> None:
+        """Initialize an instance of Reweighting, solving the WHAM equations.
+
+        Args:
+            histograms (Sequence[JointHistogram]): Histograms of runs on the same lattice at different temperatures.
+            tolerance (float, optional): Largest change of the free energies at convergence. Defaults to 1e-10.
+            max_iterations (int, optional): Maximum number of iterations. Defaults to 100000.
+
+        Raises:
+            ValueError: If no histogram is given or the lattices differ.
+
+        Example:
+            >>> reweighting = Reweighting.from_directory("histograms", dimension=32)
+            >>> reweighting.observables(np.arange(2.2, 2.4, 0.001))
+        """
+        histograms = [histogram for histogram in histograms if histogram.total() > 0]
+        if not histograms:
+            raise ValueError("At least one non-empty histogram is needed")
+        if len({histogram.sites for histogram in histograms}) > 1:
+            raise ValueError("The histograms come from lattices of different sizes")
+        self.sites = histograms[0].sites
+        self.betas = np.array([histogram.beta for histogram in histograms])
+
+        keys = sorted(set().union(*(histogram.counts for histogram in histograms)))
+        self._energy = np.array([key[0] for key in keys], dtype=np.float64)
+        self._magnetization = np.array([key[1] for key in keys], dtype=np.float64)
+        counts = np.array([[histogram.counts.get(key, 0) for key in keys] for histogram in histograms], dtype=np.float64)
+        samples = counts.sum(axis=1)
+
+        # Iterate on the energies only, the denominator does not depend on the magnetization.
+        energies, inverse = np.unique(self._energy, return_inverse=True)
+        energy_counts = np.zeros((len(histograms), len(energies)))
+        np.add.at(energy_counts, (slice(None), inverse), counts)
+        log_energy_counts = np.log(energy_counts.sum(axis=0))
+
+        free_energies = np.zeros(len(histograms))
+        for _ in range(max_iterations):
+            denominator = logsumexp(
+                np.log(samples)[:, None] + free_energies[:, None] - self.betas[:, None] * energies[None, :], axis=0
+            )
+            log_density = log_energy_counts - denominator
+            updated = -logsumexp(log_density[None, :] - self.betas[:, None] * energies[None, :], axis=1)
+            updated -= updated[0]
+            converged = np.max(np.abs(updated - free_energies)) < tolerance
+            free_energies = updated
+            if converged:
+                break
+        self.free_energies = free_energies
+
+        # Joint density of states on the (E, M) pairs.
+        with np.errstate(divide="ignore"):
+            self._log_density = np.log(counts.sum(axis=0)) - denominator[inverse]
+
+    @staticmethod
+    def from_directory(directory: str, dimension: int = None) -> "Reweighting":
+        """Combine the histograms saved in a directory.
+
+        Args:
+            directory (str): Directory of the histograms, see JointHistogram.file_name.
+            dimension (int, optional): Keep only the histograms of this lattice dimension. Defaults to all.
+
+        Returns:
+            Reweighting: The combined histograms.
+        """
+        pattern = "histogram_*_*_{}.npz".format(dimension if dimension is not None else "*")
+        return Reweighting([JointHistogram.load(name) for name in sorted(glob.glob(os.path.join(directory, pattern)))])
+
+    def observables(self, kT_values: Sequence[float]) -> List[Dict[str, float]]:
+        """Estimate the observables at any temperatures.
+
+        Args:
+            kT_values (Sequence[float]): The temperatures.
+
+        Returns:
+            List[Dict[str, float]]: For each temperature, kT and per site the mean energy (bonds counted once),
+                the mean absolute magnetization, the heat capacity and the magnetic susceptibility.
+        """
+        results = []
+        energy = self._energy / self.sites
+        magnetization = np.abs(self._magnetization) / self.sites
+        for kT in kT_values:
+            beta = 1 / kT
+            log_weights = self._log_density - beta * self._energy
+            weights = np.exp(log_weights - logsumexp(log_weights))
+            mean_energy = np.dot(weights, energy)
+            mean_magnetization = np.dot(weights, magnetization)
+            results.append(
+                {
+                    "kT": float(kT),
+                    "energy": float(mean_energy),
+                    "abs_magnetization": float(mean_magnetization),
+                    "heat_capacity": float(beta * beta * self.sites * (np.dot(weights, energy**2) - mean_energy**2)),
+                    "susceptibility": float(beta * self.sites * (np.dot(weights, magnetization**2) - mean_magnetization**2)),
+                }
+            )
+        return results
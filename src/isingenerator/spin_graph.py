@@ -0,0 +1,160 @@
+"""Module providing the graph of the positive spins of the 2D Ising Model as a SciPy sparse matrix."""
+# Copyright (C) 2023, Erick Jesús Ríos González
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor,
+# Boston, MA  02110-1301, USA.
+
+from typing import Tuple
+
+import networkx as nx
+import numpy as np
+import scipy.sparse
+import scipy.sparse.csgraph
+
+from src.isingenerator.neighbors import Neighbors
+
+
+class SpinGraph:
+    """Static class building the graph of GeometricVariables.ising_matrix_to_graph as a sparse adjacency matrix.
+
+    Node i * M + j is the site (i, j) of an N x M spin matrix. Every site has a row, the sites with
+    a negative spin simply have no edges, so the nodes of the graph are given by SpinGraph.nodes.
+    The adjacency is built from boolean masks gathered through Neighbors.table, without Python loops.
+    """
+
+    @staticmethod
+    def nodes(ising_matrix: np.ndarray) -> np.ndarray:
+        """Return the flat indices of the sites with a spin value of 1.
+
+        Args:
+            ising_matrix (np.ndarray): A 2D array of 1 and -1.
+
+        Returns:
+            np.ndarray: The indices of the nodes, in increasing order.
+        """
+        return np.flatnonzero(ising_matrix == 1)
+
+    @staticmethod
+    def adjacency(ising_matrix: np.ndarray) -> scipy.sparse.csr_matrix:
+        """Build the symmetric adjacency matrix of the adjacent positive spins, with periodic boundary conditions.
+
+        Args:
+            ising_matrix (np.ndarray): A 2D array of 1 and -1.
+
+        Returns:
+            scipy.sparse.csr_matrix: An N * M by N * M matrix of int8 ones, one per ordered pair of adjacent
+                positive spins.
+
+        Example:
+            >>> adjacency = SpinGraph.adjacency(matrix)
+            >>> degrees = SpinGraph.degrees(adjacency)
+        """
+        rows, columns = ising_matrix.shape
+        up = (ising_matrix == 1).reshape(-1)
+        table = Neighbors.table(rows, columns)
+        sources = []
+        targets = []
+        # Bonds to the neighbor below and on the right, each bond found once.
+        for direction in (0, 1):
+            both = up & up[table[:, direction]]
+            sources.append(np.flatnonzero(both))
+            targets.append(table[both, direction])
+        sources = np.concatenate(sources)
+        targets = np.concatenate(targets)
+        edges = scipy.sparse.coo_matrix(
+            (np.ones(2 * len(sources), dtype=np.int8), (np.concatenate((sources, targets)), np.concatenate((targets, sources)))),
+            shape=(rows * columns, rows * columns),
+        ).tocsr()
+        # On a side of 2 sites, the neighbors on both sides are the same site and form one edge.
+        edges.data[:] = 1
+        return edges
+
+    @staticmethod
+    def degrees(adjacency: scipy.sparse.csr_matrix) -> np.ndarray:
+        """Return the degree of every site, 0 for the negative spins."""
+        return np.diff(adjacency.indptr)
+
+    @staticmethod
+    def forman_ricci_curvature_values(adjacency: scipy.sparse.csr_matrix) -> Tuple[int, np.ndarray]:
+        """Compute the Forman-Ricci curvature of every edge as GeometricVariables.forman_ricci_curvature_values.
+
+        Every edge is visited from both of its nodes, with curvature minus the sum of their degrees.
+
+        Args:
+            adjacency (scipy.sparse.csr_matrix): The adjacency matrix of SpinGraph.adjacency.
+
+        Returns:
+            Tuple[int, np.ndarray]: The total curvature and the curvature of every edge visit, in CSR order.
+        """
+        degrees = SpinGraph.degrees(adjacency)
+        sources = np.repeat(np.arange(adjacency.shape[0]), degrees)
+        values = -degrees[sources] - degrees[adjacency.indices]
+        return int(values.sum()), values
+
+    @staticmethod
+    def connected_components(ising_matrix: np.ndarray, adjacency: scipy.sparse.csr_matrix = None) -> Tuple[int, np.ndarray]:
+        """Label the clusters of positive spins, with periodic boundary conditions.
+
+        Args:
+            ising_matrix (np.ndarray): A 2D array of 1 and -1.
+            adjacency (scipy.sparse.csr_matrix, optional): Its adjacency matrix, built when None. Defaults to None.
+
+        Returns:
+            Tuple[int, np.ndarray]: The number of clusters and the matrix of the cluster labels, from 0,
+                -1 on the negative spins.
+        """
+        if adjacency is None:
+            adjacency = SpinGraph.adjacency(ising_matrix)
+        nodes = SpinGraph.nodes(ising_matrix)
+        count, labels = scipy.sparse.csgraph.connected_components(adjacency[nodes][:, nodes], directed=False)
+        matrix_labels = np.full(ising_matrix.size, -1, dtype=np.int64)
+        matrix_labels[nodes] = labels
+        return count, matrix_labels.reshape(ising_matrix.shape)
+
+    @staticmethod
+    def laplacian(adjacency: scipy.sparse.csr_matrix, normed: bool = False) -> scipy.sparse.csr_matrix:
+        """Return the graph Laplacian D - A, for spectral analyses with scipy.sparse.linalg.
+
+        Args:
+            adjacency (scipy.sparse.csr_matrix): The adjacency matrix of SpinGraph.adjacency.
+            normed (bool, optional): Return the normalized Laplacian. Defaults to False.
+
+        Returns:
+            scipy.sparse.csr_matrix: The Laplacian, in float64.
+        """
+        return scipy.sparse.csr_matrix(scipy.sparse.csgraph.laplacian(adjacency.astype(np.float64), normed=normed))
+
+    @staticmethod
+    def to_networkx(ising_matrix: np.ndarray, adjacency: scipy.sparse.csr_matrix = None) -> nx.Graph:
+        """Convert to the networkx graph of GeometricVariables.ising_matrix_to_graph, with (row, column) nodes.
+
+        Args:
+            ising_matrix (np.ndarray): A 2D array of 1 and -1.
+            adjacency (scipy.sparse.csr_matrix, optional): Its adjacency matrix, built when None. Defaults to None.
+
+        Returns:
+            nx.Graph: The graph.
+        """
+        if adjacency is None:
+            adjacency = SpinGraph.adjacency(ising_matrix)
+        columns = ising_matrix.shape[1]
+        graph = nx.Graph()
+        graph.add_nodes_from((int(node) // columns, int(node) % columns) for node in SpinGraph.nodes(ising_matrix))
+        upper = scipy.sparse.triu(adjacency).tocoo()
+        graph.add_edges_from(
+            ((int(u) // columns, int(u) % columns), (int(v) // columns, int(v) % columns))
+            for u, v in zip(upper.row, upper.col)
+        )
+        return graph
@@ -73,16 +73,15 @@ class TopologicalVariables:
             TopologicalVariables._max_label + 1, 
             TopologicalVariables._max_label + 1
         )[1:]
+        # Labels merged across the borders leave empty labels behind, they are not domains.
         mask = TopologicalVariables._domain_lengths != 0
         non_zero_values = TopologicalVariables._domain_lengths[mask]
 
-        if not non_zero_values.any():
-            TopologicalVariables._mean_domain_size = 0
-        # Check if there are non-zero values before calculating the mean
-        if TopologicalVariables._domain_lengths.any():
-            TopologicalVariables._mean_domain_size = np.mean(TopologicalVariables._domain_lengths)
+        if non_zero_values.size:
+            TopologicalVariables._mean_domain_size = np.mean(non_zero_values)
         else:
             TopologicalVariables._mean_domain_size = 0
+
     @staticmethod
     def find_domains(matrix: np.ndarray = None) -> np.ndarray:
         """
@@ -0,0 +1,305 @@
+"""Module providing a compact log of the accepted flips of a chain, with keyframes, and its replay."""
+# Copyright (C) 2023, Erick Jesús Ríos González
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor,
+# Boston, MA  02110-1301, USA.
+
+import bisect
+import mmap
+import os
+import struct
+from typing import Any, Iterator, List, Tuple
+
+import numpy as np
+
+
+class Varint:
+    """Static class encoding non-negative integers as LEB128 varints, 7 bits per byte, with NumPy."""
+
+    @staticmethod
+    def encode(values: np.ndarray) -> bytes:
+        """Encode integers, the smallest ones taking one byte.
+
+        Args:
+            values (np.ndarray): Non-negative integers below 2 ** 63.
+
+        Returns:
+            bytes: The varints, one after the other.
+
+        Example:
+            >>> Varint.encode(np.array([1, 300]))
+            b'\\x01\\xac\\x02'
+        """
+        values = np.asarray(values, dtype=np.uint64)
+        lengths = np.ones(len(values), dtype=np.int64)
+        for shift in range(7, 64, 7):
+            lengths += values >= np.uint64(1 << shift)
+        ends = np.cumsum(lengths)
+        encoded = np.empty(int(ends[-1]) if len(values) else 0, dtype=np.uint8)
+        starts = ends - lengths
+        for byte in range(int(lengths.max()) if len(values) else 0):
+            present = lengths > byte
+            chunk = (values[present] >> np.uint64(7 * byte)) & np.uint64(0x7F)
+            # Every byte but the last of a value has its high bit set.
+            more = (lengths[present] > byte + 1).astype(np.uint64) << np.uint64(7)
+            encoded[starts[present] + byte] = (chunk | more).astype(np.uint8)
+        return encoded.tobytes()
+
+    @staticmethod
+    def decode(data: bytes) -> np.ndarray:
+        """Decode the varints of Varint.encode.
+
+        Args:
+            data (bytes): The varints.
+
+        Returns:
+            np.ndarray: The integers, in uint64.
+        """
+        encoded = np.frombuffer(data, dtype=np.uint8)
+        last = encoded < 0x80
+        ends = np.flatnonzero(last)
+        value_of_byte = np.cumsum(np.concatenate(([0], last[:-1].astype(np.int64))))
+        starts = np.concatenate(([0], ends[:-1] + 1))
+        position = np.arange(len(encoded)) - starts[value_of_byte]
+        parts = (encoded & np.uint8(0x7F)).astype(np.uint64) << (np.uint64(7) * position.astype(np.uint64))
+        values = np.zeros(len(ends), dtype=np.uint64)
+        np.add.at(values, value_of_byte, parts)
+        return values
+
+
+class TrajectoryRecorder:
+    """Class writing the accepted flips of a chain to a file, as an observer of MonteCarloSimulation.markov_chain_move.
+
+    The file starts with a header, the shape of the lattice, then holds records of two kinds:
+
+    * a keyframe, b"K", the step and the spins packed as bits, 1 for a positive spin;
+    * a chunk, b"C", its number of flips and of bytes, then the step of every flip as the varint of
+      its difference with the previous flip (the first with the previous keyframe), and the flat site
+      index of every flip as a varint.
+
+    Every notification of the observer is one step, flips being the accepted ones. Chunks hold
+    chunk_flips flips, except the last one, and a keyframe of the current lattice follows every
+    keyframe_chunks chunks, so a replay applies at most keyframe_chunks * chunk_flips flips.
+    """
+
+    MAGIC = b"ISINGTRJ"
+
+    def __init__(
+        self,
+        file_name: str,
+        matrix: np.ndarray,
+        chunk_flips: int = 4096,
+        keyframe_chunks: int = 16,
+        observer: Any = None,
+    ) -> None:
+        """Initialize an instance of TrajectoryRecorder, writing the header and the keyframe of step 0.
+
+        Args:
+            file_name (str): The name of the file, overwritten.
+            matrix (np.ndarray): The spin matrix updated in place by the chain, read for the keyframes.
+            chunk_flips (int, optional): Flips per chunk. Defaults to 4096.
+            keyframe_chunks (int, optional): Chunks between two keyframes. Defaults to 16.
+            observer (Any, optional): Observer receiving the flip_event and add_counts calls after the recorder,
+                such as FlipStatistics. Defaults to None.
+
+        Example:
+            >>> with TrajectoryRecorder("trajectory.bin", getattr(lattice, "_matrix")) as recorder:
+            ...     MetropolisEngine(lattice, 1 / 2.27).advance(10**6, recorder)
+            >>> TrajectoryReplay("trajectory.bin").lattice_at(500000)
+        """
+        self._matrix = matrix
+        self._columns = matrix.shape[1]
+        self._chunk_flips = chunk_flips
+        self._keyframe_chunks = keyframe_chunks
+        self._observer = observer
+        self._file = open(file_name, mode="wb")
+        self._file.write(TrajectoryRecorder.MAGIC + struct.pack("<II", *matrix.shape))
+        self._steps: List[int] = []
+        self._sites: List[int] = []
+        self.step = 0
+        self._previous_step = 0
+        self._chunks = 0
+        self._write_keyframe()
+
+    def flip_event(self, row: int, column: int, delta_e: int, accepted: bool) -> None:
+        """Count one step and record it when the flip was accepted, see MonteCarloSimulation.markov_chain_move."""
+        self.step += 1
+        if accepted:
+            self._steps.append(self.step)
+            self._sites.append(row * self._columns + column)
+            if len(self._sites) == self._chunk_flips:
+                self._write_chunk()
+        if self._observer is not None:
+            self._observer.flip_event(row, column, delta_e, accepted)
+
+    def add_counts(self, attempted: List[int], accepted: List[int]) -> None:
+        """Forward the counts of the engines updating many sites at once to the next observer."""
+        add_counts = getattr(self._observer, "add_counts", None)
+        if add_counts is not None:
+            add_counts(attempted, accepted)
+
+    def _write_keyframe(self) -> None:
+        """Write the current lattice as a keyframe."""
+        self._file.write(b"K" + struct.pack("<Q", self.step) + np.packbits(self._matrix.ravel() > 0).tobytes())
+        self._previous_step = self.step
+
+    def _write_chunk(self) -> None:
+        """Write the buffered flips as a chunk, then a keyframe when it is due."""
+        if self._sites:
+            steps = np.diff(np.array(self._steps, dtype=np.int64), prepend=self._previous_step)
+            payload = Varint.encode(steps) + Varint.encode(np.array(self._sites, dtype=np.int64))
+            self._file.write(b"C" + struct.pack("<II", len(self._sites), len(payload)) + payload)
+            self._previous_step = self._steps[-1]
+            self._steps.clear()
+            self._sites.clear()
+            self._chunks += 1
+        if self._chunks == self._keyframe_chunks:
+            self._chunks = 0
+            self._write_keyframe()
+
+    def close(self) -> None:
+        """Write the buffered flips and a final keyframe, then close the file."""
+        if not self._file.closed:
+            self._write_chunk()
+            if self._previous_step != self.step or self._chunks:
+                self._write_keyframe()
+            self._file.close()
+
+    def __enter__(self) -> "TrajectoryRecorder":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    @staticmethod
+    def file_name(directory: str, kT: float, B: float, dimension: int) -> str:
+        """Return the file of the trajectory of a point in a trajectory directory."""
+        return os.path.join(directory, "trajectory_{:.5f}_{:.5f}_{}.bin".format(kT, B, dimension))
+
+
+class TrajectoryReplay:
+    """Class reconstructing the lattice of any step from a file of TrajectoryRecorder.
+
+    The file is memory-mapped, not read: opening it visits the headers of its records to index
+    them, and a replay reads one keyframe and the chunks after it, so the memory used grows with
+    one keyframe interval rather than with the length of the trajectory. A lattice is rebuilt from
+    the last keyframe before the step by flipping every site an odd number of times in the chunks
+    between them, in one NumPy pass per chunk.
+    """
+
+    def __init__(self, file_name: str) -> None:
+        """Initialize an instance of TrajectoryReplay, indexing the records of the file.
+
+        Args:
+            file_name (str): The name of the file.
+
+        Raises:
+            ValueError: If the file is not a trajectory.
+        """
+        self._file_name = file_name
+        with open(file_name, mode="rb") as trajectory:
+            size = os.fstat(trajectory.fileno()).st_size
+            if trajectory.read(len(TrajectoryRecorder.MAGIC)) != TrajectoryRecorder.MAGIC:
+                raise ValueError(f"{file_name} is not a trajectory file")
+            # The mapping stays valid once the file is closed.
+            data = mmap.mmap(trajectory.fileno(), 0, access=mmap.ACCESS_READ)
+        self._data = data
+        offset = len(TrajectoryRecorder.MAGIC)
+        self.shape: Tuple[int, int] = struct.unpack_from("<II", data, offset)
+        offset += 8
+        self._keyframe_bytes = (self.shape[0] * self.shape[1] + 7) // 8
+        # (step, offset of the spins) of every keyframe, and (flips, offset, size) of the chunks after each.
+        self._keyframes: List[Tuple[int, int]] = []
+        self._chunks: List[List[Tuple[int, int, int]]] = []
+        self.flips = 0
+        while offset < size:
+            kind = data[offset:offset + 1]
+            if kind == b"K" and offset + 9 + self._keyframe_bytes <= size:
+                (step,) = struct.unpack_from("<Q", data, offset + 1)
+                self._keyframes.append((step, offset + 9))
+                self._chunks.append([])
+                offset += 9 + self._keyframe_bytes
+            elif kind == b"C" and offset + 9 <= size:
+                count, chunk_size = struct.unpack_from("<II", data, offset + 1)
+                if offset + 9 + chunk_size > size:
+                    break
+                self._chunks[-1].append((count, offset + 9, chunk_size))
+                self.flips += count
+                offset += 9 + chunk_size
+            else:
+                # A record cut short when the run stopped.
+                break
+        self._keyframe_steps = [step for step, _ in self._keyframes]
+
+    def close(self) -> None:
+        """Release the mapping of the file."""
+        self._data.close()
+
+    def __enter__(self) -> "TrajectoryReplay":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def last_step(self) -> int:
+        """Return the step of the last keyframe, the last step the file is guaranteed to cover."""
+        return self._keyframe_steps[-1]
+
+    def _keyframe(self, index: int) -> np.ndarray:
+        """Return the spins of a keyframe, in int8."""
+        _, offset = self._keyframes[index]
+        bits = np.unpackbits(np.frombuffer(self._data, dtype=np.uint8, count=self._keyframe_bytes, offset=offset))
+        return np.where(bits[:self.shape[0] * self.shape[1]] == 1, 1, -1).astype(np.int8)
+
+    def _decode_chunk(self, previous_step: int, count: int, offset: int, size: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the steps and the sites of the flips of a chunk."""
+        values = Varint.decode(self._data[offset:offset + size]).astype(np.int64)
+        return previous_step + np.cumsum(values[:count]), values[count:]
+
+    def flip_events(self) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Yield the steps and the flat sites of the recorded flips, one chunk at a time."""
+        for (step, _), chunks in zip(self._keyframes, self._chunks):
+            for count, offset, size in chunks:
+                steps, sites = self._decode_chunk(step, count, offset, size)
+                step = int(steps[-1])
+                yield steps, sites
+
+    def lattice_at(self, step: int) -> np.ndarray:
+        """Reconstruct the spin matrix after a number of steps.
+
+        Args:
+            step (int): The step, between 0 and TrajectoryReplay.last_step().
+
+        Returns:
+            np.ndarray: The spin matrix, in int8.
+
+        Raises:
+            ValueError: If the step is outside the recorded trajectory.
+        """
+        if not 0 <= step <= self.last_step():
+            raise ValueError(f"Step {step} is outside the recorded trajectory, 0 to {self.last_step()}")
+        index = bisect.bisect_right(self._keyframe_steps, step) - 1
+        spins = self._keyframe(index)
+        previous_step = self._keyframe_steps[index]
+        parity = np.zeros(spins.size, dtype=np.int64)
+        for count, offset, size in self._chunks[index]:
+            steps, sites = self._decode_chunk(previous_step, count, offset, size)
+            kept = int(np.searchsorted(steps, step, side="right"))
+            parity += np.bincount(sites[:kept], minlength=spins.size)
+            if kept < count:
+                break
+            previous_step = int(steps[-1])
+        spins[parity % 2 == 1] *= -1
+        return spins.reshape(self.shape)
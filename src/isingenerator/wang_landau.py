@@ -0,0 +1,221 @@
+"""Module providing the Wang-Landau estimation of the density of states of the 2D Ising Model and its thermodynamics."""
+# Copyright (C) 2023, Erick Jesús Ríos González
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor,
+# Boston, MA  02110-1301, USA.
+
+import math
+from typing import Dict, List, Sequence
+
+import numpy as np
+from scipy.special import logsumexp
+
+from src.isingenerator.lattice_square import LatticeSquare
+from src.isingenerator.neighbors import Neighbors
+
+
+class DensityOfStates:
+    """Class holding the logarithm of the density of states g(E) and computing the thermodynamics from it.
+
+    The energy is E = -sum over bonds of s_i * s_j, each bond counted once, with J = 1 and no field.
+    ln g is normalized so that g sums to 2 ** sites, the number of spin configurations.
+    """
+
+    def __init__(self, energies: np.ndarray, log_g: np.ndarray, sites: int) -> None:
+        """Initialize an instance of DensityOfStates.
+
+        Args:
+            energies (np.ndarray): The energies with a non-zero density of states, in increasing order.
+            log_g (np.ndarray): The logarithm of the density of states at each energy, up to a constant.
+            sites (int): Number of spins of the lattice.
+        """
+        self.energies = np.asarray(energies, dtype=np.float64)
+        self.sites = sites
+        log_g = np.asarray(log_g, dtype=np.float64)
+        self.log_g = log_g - logsumexp(log_g) + sites * math.log(2)
+
+    def thermodynamics(self, kT_values: Sequence[float]) -> List[Dict[str, float]]:
+        """Compute the thermodynamics at any temperatures.
+
+        Args:
+            kT_values (Sequence[float]): The temperatures.
+
+        Returns:
+            List[Dict[str, float]]: For each temperature, kT and per site the mean energy, the heat capacity,
+                the Helmholtz free energy and the entropy.
+        """
+        results = []
+        energy = self.energies / self.sites
+        for kT in kT_values:
+            beta = 1 / kT
+            log_weights = self.log_g - beta * self.energies
+            log_z = logsumexp(log_weights)
+            weights = np.exp(log_weights - log_z)
+            mean_energy = np.dot(weights, energy)
+            free_energy = -kT * log_z / self.sites
+            results.append(
+                {
+                    "kT": float(kT),
+                    "energy": float(mean_energy),
+                    "heat_capacity": float(beta * beta * self.sites * (np.dot(weights, energy**2) - mean_energy**2)),
+                    "free_energy": float(free_energy),
+                    "entropy": float((mean_energy - free_energy) / kT),
+                }
+            )
+        return results
+
+    def save(self, file_name: str) -> None:
+        """Save the density of states to a NumPy .npz file.
+
+        Args:
+            file_name (str): The name of the file.
+        """
+        np.savez(file_name, energy=self.energies, log_g=self.log_g, sites=self.sites)
+
+    @staticmethod
+    def load(file_name: str) -> "DensityOfStates":
+        """Load a density of states saved by DensityOfStates.save.
+
+        Args:
+            file_name (str): The name of the file.
+
+        Returns:
+            DensityOfStates: The density of states.
+        """
+        with np.load(file_name) as data:
+            return DensityOfStates(data["energy"], data["log_g"], int(data["sites"]))
+
+
+class WangLandau:
+    """Class estimating the density of states of a lattice with the Wang-Landau flat-histogram random walk.
+
+    Single spin flips are accepted with probability min(1, g(E) / g(E')), and every visit of an
+    energy adds ln f to ln g(E). When the histogram of the visits since the last change of f is
+    flat, every visited energy having at least flatness times the mean count, the histogram is reset
+    and ln f is halved. With the "1/t" schedule of Belardinelli and Pereyra, ln f follows 1/t, t
+    being the Monte Carlo time in sweeps, once halving would bring it below 1/t, which removes the
+    saturation of the error of the plain halving. The walk stops when ln f is below final_log_f.
+
+    The walk is a different chain from the Metropolis one and has no temperature, so it is not an
+    engine of Engines: one run gives the thermal observables at every temperature.
+    """
+
+    SCHEDULES = ("halving", "1/t")
+
+    def __init__(
+        self,
+        lattice: LatticeSquare,
+        flatness: float = 0.8,
+        final_log_f: float = 1e-6,
+        check_every: int = 100,
+        schedule: str = "halving",
+    ) -> None:
+        """Initialize an instance of WangLandau.
+
+        Args:
+            lattice (LatticeSquare): The lattice with its spin matrix already created, the starting configuration.
+            flatness (float, optional): Smallest ratio between the count of a visited energy and the mean count
+                for the histogram to be flat. Defaults to 0.8.
+            final_log_f (float, optional): Value of ln f ending the walk. Defaults to 1e-6.
+            check_every (int, optional): Sweeps between two checks of the flatness. Defaults to 100.
+            schedule (str, optional): "halving" or "1/t". Defaults to "halving".
+
+        Raises:
+            ValueError: If the schedule is unknown.
+
+        Example:
+            >>> lattice = LatticeSquare(16, 16)
+            >>> lattice.create_matrix()
+            >>> density = WangLandau(lattice, schedule="1/t").run()
+            >>> density.thermodynamics([2.0, 2.269, 2.5])
+        """
+        if schedule not in WangLandau.SCHEDULES:
+            raise ValueError(f"Unknown schedule '{schedule}', expected one of: {', '.join(WangLandau.SCHEDULES)}")
+        matrix = getattr(lattice, "_matrix")
+        rows, columns = matrix.shape
+        self._sites = rows * columns
+        self._spins: List[int] = [int(spin) for spin in matrix.ravel()]
+        self._table = Neighbors.table_tuples(rows, columns)
+        # The energies go from -2 * sites to 2 * sites in steps of 4, level k being -2 * sites + 4 * k.
+        bonds_twice = int(np.sum(matrix * Neighbors.sum_of_neighbors(matrix)))
+        self._level = (2 * self._sites - bonds_twice // 2) // 4
+        self._log_g = [0.0] * (self._sites + 1)
+        self._histogram = [0] * (self._sites + 1)
+        self._visited = [False] * (self._sites + 1)
+        self._flatness = flatness
+        self._final_log_f = final_log_f
+        self._check_every = check_every
+        self._schedule = schedule
+        self._follows_time = False
+        self.log_f = 1.0
+        self.sweeps = 0
+        self.stages = 0
+
+    def _walk(self, moves: int) -> None:
+        """Make a number of Wang-Landau moves at the current ln f."""
+        spins, table, log_g, histogram, visited = self._spins, self._table, self._log_g, self._histogram, self._visited
+        sites = np.random.randint(0, self._sites, size=moves).tolist()
+        randoms = np.random.random(moves).tolist()
+        level, log_f, exp = self._level, self.log_f, math.exp
+        for k in range(moves):
+            i = sites[k]
+            spin = spins[i]
+            a, b, c, d = table[i]
+            # The energy changes by 2 * spin * nb, that is spin * nb / 2 levels.
+            new = level + spin * (spins[a] + spins[b] + spins[c] + spins[d]) // 2
+            difference = log_g[level] - log_g[new]
+            if difference >= 0 or randoms[k] < exp(difference):
+                spins[i] = -spin
+                level = new
+            log_g[level] += log_f
+            histogram[level] += 1
+            visited[level] = True
+        self._level = level
+
+    def _is_flat(self) -> bool:
+        """Return whether the histogram of the visited energies is flat."""
+        counts = [count for count, seen in zip(self._histogram, self._visited) if seen]
+        return min(counts) >= self._flatness * sum(counts) / len(counts)
+
+    def run(self, max_sweeps: int = None) -> DensityOfStates:
+        """Run the walk until ln f is below final_log_f.
+
+        Args:
+            max_sweeps (int, optional): Stop after this number of sweeps even if ln f is not small enough.
+                Defaults to None, no limit.
+
+        Returns:
+            DensityOfStates: The density of states over the visited energies.
+        """
+        while self.log_f >= self._final_log_f and (max_sweeps is None or self.sweeps < max_sweeps):
+            self._walk(self._check_every * self._sites)
+            self.sweeps += self._check_every
+            inverse_time = 1 / self.sweeps
+            if self._follows_time:
+                self.log_f = inverse_time
+            elif self._is_flat():
+                self.stages += 1
+                self._histogram[:] = [0] * len(self._histogram)
+                self.log_f /= 2
+                if self._schedule == "1/t" and self.log_f < inverse_time:
+                    self._follows_time = True
+                    self.log_f = inverse_time
+        return self.density_of_states()
+
+    def density_of_states(self) -> DensityOfStates:
+        """Return the current estimate of the density of states over the visited energies."""
+        levels = [level for level, seen in enumerate(self._visited) if seen]
+        energies = np.array([-2 * self._sites + 4 * level for level in levels], dtype=np.float64)
+        return DensityOfStates(energies, np.array([self._log_g[level] for level in levels]), self._sites)
@@ -0,0 +1,335 @@
+"""Module providing a class to share the points of a sweep between workers through a shared directory."""
+# Copyright (C) 2023, Erick Jesús Ríos González
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor,
+# Boston, MA  02110-1301, USA.
+
+import csv
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List
+
+from src.isingenerator.dataset_catalog import DatasetCatalog
+from src.isingenerator.grid_scheduler import GridTask
+from src.isingenerator.main_simulation import MainSimulation
+from src.isingenerator.writer_csv import WriterCsv
+
+
+class WorkLeasing:
+    """Static class coordinating the workers of a sweep with a manifest, lease files and result shards.
+
+    The shared directory contains:
+
+    - manifest.json: the arguments of MainSimulation.create_observables shared by every point,
+      the column names and the list of tasks.
+    - leases/<index>.lease: created with O_EXCL by the worker running the task and touched
+      periodically while it runs. A lease whose modification time is older than the lease
+      duration is considered abandoned and can be taken over.
+    - results/<index>.csv: the row of a finished task, written to a temporary file and renamed.
+
+    The manifest also holds the output format and the catalog of the merged file.
+
+    Only atomic file creation and rename are used, so any file system shared by the hosts works
+    as the coordinator.
+    """
+
+    MANIFEST = "manifest.json"
+
+    @staticmethod
+    def create_manifest(
+        directory: str,
+        arguments: Dict,
+        columns: List[str],
+        tasks: Iterable[GridTask],
+        output_format: str = "csv",
+        catalog: Dict = None,
+    ) -> int:
+        """Write the manifest of a sweep.
+
+        Args:
+            directory (str): The shared directory, created if needed.
+            arguments (Dict): The keyword arguments of MainSimulation.create_observables shared by every point,
+                "seed" being the seed of the sweep.
+            columns (List[str]): The column names of the output file.
+            tasks (Iterable[GridTask]): The points of the sweep.
+            output_format (str, optional): Format of the merged file, "csv" or "jsonl". Defaults to "csv".
+            catalog (Dict, optional): The "index" path of a DatasetCatalog and the "record" registered for the
+                merged file. Defaults to None, no catalog.
+
+        Returns:
+            int: The number of tasks.
+
+        Raises:
+            FileExistsError: If the directory already has a manifest.
+        """
+        os.makedirs(os.path.join(directory, "leases"), exist_ok=True)
+        os.makedirs(os.path.join(directory, "results"), exist_ok=True)
+        tasks = [list(task) for task in tasks]
+        manifest = {
+            "arguments": arguments,
+            "columns": columns,
+            "tasks": tasks,
+            "output_format": output_format,
+            "catalog": catalog,
+        }
+
+        path = os.path.join(directory, WorkLeasing.MANIFEST)
+        temporary = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temporary, mode="w", encoding="utf-8") as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+        try:
+            # Linking fails if another process already published a manifest.
+            os.link(temporary, path)
+        finally:
+            os.remove(temporary)
+        return len(tasks)
+
+    @staticmethod
+    def read_manifest(directory: str) -> Dict:
+        """Read the manifest of a sweep.
+
+        Args:
+            directory (str): The shared directory.
+
+        Returns:
+            Dict: The manifest, with its tasks converted to GridTask.
+        """
+        with open(os.path.join(directory, WorkLeasing.MANIFEST), mode="r", encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+        manifest["tasks"] = [GridTask(int(index), kT, B) for index, kT, B in manifest["tasks"]]
+        return manifest
+
+    @staticmethod
+    def _lease_path(directory: str, task: GridTask) -> str:
+        """Return the path of the lease file of a task."""
+        return os.path.join(directory, "leases", f"{task.index}.lease")
+
+    @staticmethod
+    def _result_path(directory: str, task: GridTask) -> str:
+        """Return the path of the result shard of a task."""
+        return os.path.join(directory, "results", f"{task.index}.csv")
+
+    @staticmethod
+    def _file_system_time(directory: str, worker_id: str) -> float:
+        """Return the current time as seen by the file system of the directory.
+
+        Comparing lease ages with this clock instead of the local one keeps the expiry right when
+        the hosts' clocks disagree with the file server.
+        """
+        path = os.path.join(directory, "leases", f".clock-{worker_id}")
+        with open(path, mode="w", encoding="utf-8"):
+            pass
+        now = os.stat(path).st_mtime
+        os.remove(path)
+        return now
+
+    @staticmethod
+    def _create_lease(path: str, worker_id: str) -> bool:
+        """Atomically create a lease file, returning False if it already exists."""
+        try:
+            descriptor = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(descriptor, mode="w", encoding="utf-8") as lease_file:
+            json.dump({"worker": worker_id, "host": socket.gethostname(), "pid": os.getpid()}, lease_file)
+        return True
+
+    @staticmethod
+    def claim(directory: str, worker_id: str, lease_seconds: float = 600.0) -> GridTask:
+        """Claim the first task that has neither a result nor a live lease.
+
+        Args:
+            directory (str): The shared directory.
+            worker_id (str): Identifier of the worker, unique among the workers of the sweep.
+            lease_seconds (float, optional): Age after which a lease is considered abandoned. Defaults to 600.0.
+
+        Returns:
+            GridTask: The claimed task, None if no task can be claimed right now.
+        """
+        now = WorkLeasing._file_system_time(directory, worker_id)
+        for task in WorkLeasing.read_manifest(directory)["tasks"]:
+            if os.path.exists(WorkLeasing._result_path(directory, task)):
+                continue
+            lease = WorkLeasing._lease_path(directory, task)
+            if not WorkLeasing._create_lease(lease, worker_id):
+                try:
+                    expired = os.stat(lease)
+                    if now - expired.st_mtime <= lease_seconds:
+                        continue
+                    # Only one of the workers renaming an abandoned lease succeeds.
+                    abandoned = f"{lease}.{worker_id}.{uuid.uuid4().hex}.expired"
+                    os.rename(lease, abandoned)
+                    renamed = os.stat(abandoned)
+                except FileNotFoundError:
+                    continue
+                # Another worker may have taken the lease over between the stat and the rename, in which
+                # case the file renamed is its fresh lease: it is put back and the task left to it. Linking
+                # fails rather than overwrite the lease a third worker may have created meanwhile.
+                if (renamed.st_ino, renamed.st_mtime) != (expired.st_ino, expired.st_mtime) or (
+                    now - renamed.st_mtime <= lease_seconds
+                ):
+                    try:
+                        os.link(abandoned, lease)
+                    except FileExistsError:
+                        pass
+                    os.remove(abandoned)
+                    continue
+                os.remove(abandoned)
+                if not WorkLeasing._create_lease(lease, worker_id):
+                    continue
+            # The task may have been finished between the first check and the lease.
+            if os.path.exists(WorkLeasing._result_path(directory, task)):
+                os.remove(lease)
+                continue
+            return task
+        return None
+
+    @staticmethod
+    def pending(directory: str) -> int:
+        """Return the number of tasks without a result.
+
+        Args:
+            directory (str): The shared directory.
+        """
+        return sum(
+            not os.path.exists(WorkLeasing._result_path(directory, task))
+            for task in WorkLeasing.read_manifest(directory)["tasks"]
+        )
+
+    @staticmethod
+    def run_task(directory: str, task: GridTask, worker_id: str, lease_seconds: float = 600.0) -> None:
+        """Simulate a claimed task, renewing its lease while it runs, and publish its result shard.
+
+        Args:
+            directory (str): The shared directory.
+            task (GridTask): The claimed task.
+            worker_id (str): Identifier of the worker.
+            lease_seconds (float, optional): Lease duration, renewed every quarter of it. Defaults to 600.0.
+        """
+        lease = WorkLeasing._lease_path(directory, task)
+        finished = threading.Event()
+
+        def heartbeat() -> None:
+            while not finished.wait(lease_seconds / 4):
+                try:
+                    os.utime(lease)
+                except FileNotFoundError:
+                    # A worker checking the lease moves it away for a moment; it is recreated unless
+                    # that worker or another one already put a lease back.
+                    WorkLeasing._create_lease(lease, worker_id)
+
+        thread = threading.Thread(target=heartbeat, daemon=True)
+        thread.start()
+        try:
+            kwargs = dict(WorkLeasing.read_manifest(directory)["arguments"], kT=task.kT, B=task.B)
+            if kwargs["seed"] is not None:
+                kwargs["seed"] += task.index
+            results = MainSimulation.create_observables(**kwargs)
+
+            result = WorkLeasing._result_path(directory, task)
+            temporary = f"{result}.{worker_id}.tmp"
+            WriterCsv.write_data(temporary, results, mode="w")
+            os.replace(temporary, result)
+        finally:
+            finished.set()
+            thread.join()
+        try:
+            os.remove(lease)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def run_worker(
+        directory: str,
+        worker_id: str = None,
+        lease_seconds: float = 600.0,
+        poll_interval: float = 5.0,
+        max_tasks: int = None,
+    ) -> int:
+        """Claim and run tasks until every task of the sweep has a result.
+
+        When every remaining task is leased by another worker, the worker waits poll_interval seconds
+        and tries again, so it takes over the tasks of workers that died.
+
+        Args:
+            directory (str): The shared directory.
+            worker_id (str, optional): Identifier of the worker. Defaults to "<host>-<pid>-<random>".
+            lease_seconds (float, optional): Age after which a lease is considered abandoned. Defaults to 600.0.
+            poll_interval (float, optional): Seconds between two claims when nothing is claimable. Defaults to 5.0.
+            max_tasks (int, optional): Stop after this number of tasks. Defaults to None.
+
+        Returns:
+            int: The number of tasks run by this worker.
+        """
+        if worker_id is None:
+            worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        done = 0
+        while max_tasks is None or done < max_tasks:
+            task = WorkLeasing.claim(directory, worker_id, lease_seconds)
+            if task is None:
+                if WorkLeasing.pending(directory) == 0:
+                    break
+                time.sleep(poll_interval)
+                continue
+            WorkLeasing.run_task(directory, task, worker_id, lease_seconds)
+            done += 1
+        return done
+
+    @staticmethod
+    def merge(directory: str, file_name: str) -> str:
+        """Build the output file of the sweep from the result shards, in task order.
+
+        The file has the format given to the manifest, and is registered in its catalog if it has one.
+
+        Args:
+            directory (str): The shared directory.
+            file_name (str): The name of the file to create.
+
+        Returns:
+            str: The name of the file created.
+
+        Raises:
+            RuntimeError: If some tasks have no result yet.
+        """
+        manifest = WorkLeasing.read_manifest(directory)
+        missing = [
+            task.index for task in manifest["tasks"]
+            if not os.path.exists(WorkLeasing._result_path(directory, task))
+        ]
+        if missing:
+            raise RuntimeError(f"{len(missing)} tasks have no result yet, first missing: {missing[:10]}")
+
+        rows = []
+        for task in manifest["tasks"]:
+            with open(WorkLeasing._result_path(directory, task), mode="r", encoding="utf-8", newline="") as shard:
+                rows.extend(csv.reader(shard))
+        if manifest.get("output_format", "csv") == "jsonl":
+            with open(file_name, mode="w", encoding="utf-8") as jsonl_file:
+                for row in rows:
+                    jsonl_file.write(json.dumps({name: float(value) for name, value in zip(manifest["columns"], row)}) + "\n")
+        else:
+            with open(file_name, mode="w", encoding="utf-8", newline="") as csv_file:
+                csv_writer = csv.writer(csv_file)
+                csv_writer.writerow(manifest["columns"])
+                csv_writer.writerows(rows)
+
+        catalog = manifest.get("catalog")
+        if catalog is not None:
+            DatasetCatalog(os.path.dirname(catalog["index"]), catalog["index"]).register(file_name, **catalog["record"])
+        return file_name
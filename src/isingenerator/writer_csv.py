@@ -23,15 +23,20 @@ class WriterCsv:
     """A class that contains the code that generates the CSV file with the simulation data for the Ising model."""
     
     @staticmethod
-    def write_data(file_name: str, data: str, mode: str = "a") -> None:
+    def write_data(file_name: str, data: str, mode: str = "a") -> int:
         """Write simulation data to a CSV file.
 
         Args:
             file_name (str): The name of the CSV file.
             data (str): The simulation data to be written.
             encoding (str, optional): The encoding of the CSV file. Defaults to "utf-8".
+
+        Returns:
+            int: The number of bytes written.
         """
         # Write data to CSV file
         with open(file_name, mode = mode, encoding = "utf-8", newline="") as csv_file:
+            start = csv_file.tell()
             csv_writer = csv.writer(csv_file)
             csv_writer.writerow(data)
+            return csv_file.tell() - start
@@ -0,0 +1,41 @@
+"""Module providing a class to write the data simulation of the 2D Ising Model as JSON lines."""
+# Copyright (C) 2023, Erick Jesús Ríos González
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor,
+# Boston, MA  02110-1301, USA.
+
+import json
+from typing import Dict
+
+
+class WriterJsonl:
+    """A class that writes the simulation data for the Ising model as one JSON object per line."""
+
+    @staticmethod
+    def write_data(file_name: str, data: Dict, mode: str = "a") -> int:
+        """Write simulation data to a JSON lines file.
+
+        Args:
+            file_name (str): The name of the JSON lines file.
+            data (Dict): The simulation data to be written, keyed by column name.
+            mode (str, optional): The mode used to open the file. Defaults to "a".
+
+        Returns:
+            int: The number of bytes written.
+        """
+        line = json.dumps(data) + "\n"
+        with open(file_name, mode = mode, encoding = "utf-8") as jsonl_file:
+            jsonl_file.write(line)
+        return len(line.encode("utf-8"))
@@ -0,0 +1,60 @@
+"""
+Benchmark suite for the hot paths of the simulation.
+
+Run from the root of the repository:
+
+    python -m test.benchmark_simulation --output bench_new.json --compare bench_old.json
+"""
+
+import argparse
+import sys
+from typing import List
+
+from src.isingenerator.benchmark import Benchmark
+
+
+def main(argv: List[str] = None) -> int:
+    """Run the benchmarks, write the results and report the regressions against a baseline.
+
+    Returns:
+        int: 1 if a regression was found, 0 otherwise.
+    """
+    parser = argparse.ArgumentParser(
+        "benchmark_simulation",
+        description="Benchmark the hot paths of the 2D Ising Model simulation."
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(Benchmark.LATTICE_SIZES),
+                        help="Lattice dimensions to benchmark.")
+    parser.add_argument("--min-time", type=float, default=0.5,
+                        help="Minimum measuring time per repetition in seconds.")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Repetitions per benchmark, the best one is kept.")
+    parser.add_argument("--output", default="bench_output.json",
+                        help="The name of the JSON file with the results.")
+    parser.add_argument("--compare", default=None,
+                        help="JSON file of a previous run to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="Relative slowdown allowed before reporting a regression.")
+    args = parser.parse_args(argv)
+
+    results = Benchmark.run(args.sizes, args.min_time, args.repeat)
+    Benchmark.write_json(results, args.output)
+
+    for entry in results["results"]:
+        print(f"{entry['benchmark']:>22} L={entry['dimension']:<5} {entry['value']:.6g} {entry['unit']}")
+
+    if args.compare is None:
+        return 0
+
+    regressions = Benchmark.compare(Benchmark.read_json(args.compare), results, args.tolerance)
+    for regression in regressions:
+        print(
+            f"REGRESSION {regression['benchmark']} L={regression['dimension']}: "
+            f"{regression['baseline']:.6g} -> {regression['current']:.6g} {regression['unit']} "
+            f"({regression['slowdown']:+.1%})"
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
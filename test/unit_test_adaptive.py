@@ -0,0 +1,41 @@
+import os
+import shutil
+import tempfile
+
+from src.isingenerator.adaptive_grid import AdaptiveGrid
+from src.isingenerator.create_data_simulation import CreateDataSimulation
+from src.isingenerator.observable_statistics import ObservableMoments
+
+moments = ObservableMoments(4)
+moments.add(-8.0, 4.0)
+moments.add(-4.0, -2.0)
+print(moments.summary(2.0))
+assert moments.mean("abs_magnetization") == 0.75
+assert moments.variance("energy") == 0.25
+
+points = [
+    {"kT": kT, "energy": energy, "energy_error": 0.0, "abs_magnetization": m,
+     "abs_magnetization_error": 0.0, "susceptibility": 0.0}
+    for kT, energy, m in [(1.0, -2.0, 1.0), (2.0, -1.9, 0.95), (3.0, -1.0, 0.2), (4.0, -0.8, 0.1)]
+]
+print(AdaptiveGrid.interval_scores(points))
+assert AdaptiveGrid.refine(points, 1, 0.1) == [2.5]
+assert AdaptiveGrid.refine(points, 5, 0.6) == []
+
+directory = tempfile.mkdtemp()
+rows = []
+for workers in (1, 2):
+    file_name = os.path.join(directory, f"adaptive_{workers}.csv")
+    simulation = CreateDataSimulation(file_name, 4000, 1.0, 4.0, 1.0, 8, seed=2, workers=workers)
+    simulation.generate_csv_data_adaptive(max_points=9, batch=2)
+    with open(file_name, encoding="utf-8") as csv_file:
+        rows.append(csv_file.read().splitlines())
+
+print("\n".join(rows[0]))
+assert rows[0] == rows[1]
+assert len(rows[0]) == 1 + 9
+temperatures = [float(row.split(",")[0]) for row in rows[0][1:]]
+assert temperatures == sorted(temperatures)
+assert {1.0, 2.0, 3.0, 4.0} <= set(temperatures)
+
+shutil.rmtree(directory)
@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from src.isingenerator.__main__ import main
+from src.isingenerator.analysis_pipeline import AnalysisPipeline
+from src.isingenerator.main_simulation import MainSimulation
+from src.isingenerator.topological_variables import TopologicalVariables
+
+matrices = [np.random.choice([-1, 1], size=(12, 12)) for _ in range(20)]
+with AnalysisPipeline((12, 12), workers=2, slots=3) as pipeline:
+    for matrix in matrices[:8]:
+        pipeline.submit(matrix)
+        # The results are summed as they arrive, only those after a sample still running wait.
+        assert len(pipeline._waiting) <= 3
+    first = pipeline.drain()
+    for matrix in matrices[8:]:
+        pipeline.submit(matrix)
+        assert len(pipeline._waiting) <= 3
+    second = pipeline.drain()
+    assert pipeline.drain()["samples"] == 0
+totals = {name: first[name] + second[name] for name in first}
+print(totals, pipeline.stalls)
+
+expected = 0.0
+for matrix in matrices:
+    TopologicalVariables.label_ring(matrix)
+    expected += TopologicalVariables.mean_domain_size()
+assert totals["samples"] == 20
+assert first["samples"] == 8
+assert abs(totals["mean_domain_size"] - expected) < 1e-9
+
+# The chain and the cheap observables do not change when the domains are computed.
+plain = MainSimulation.create_observables(3000, 2.4, 8, seed=7)
+analysed = MainSimulation.create_observables(3000, 2.4, 8, seed=7, analysis_workers=2)
+print(plain)
+print(analysed)
+assert plain[:5] == analysed[:5]
+assert float(analysed[5]) > 0 and float(analysed[6]) > 0
+
+directory = tempfile.mkdtemp()
+file_name = os.path.join(directory, "analysis.csv")
+print(main(["run", "--file-name", file_name, "--steps", "2000", "--initial-step-kT", "2.0",
+            "--final-step-kT", "3.0", "--delta-kT", "0.5", "--dimension", "8", "--seed", "1",
+            "--workers", "2", "--analysis-workers", "1"]))
+with open(file_name, encoding="utf-8") as csv_file:
+    rows = csv_file.read().splitlines()
+print("\n".join(rows))
+assert all(float(row.split(",")[5]) > 0 for row in rows[1:])
+
+shutil.rmtree(directory)
@@ -0,0 +1,52 @@
+import os
+import shutil
+import tempfile
+
+from src.isingenerator.__main__ import main
+from src.isingenerator.create_data_simulation import CreateDataSimulation
+from src.isingenerator.finite_size_campaign import FiniteSizeCampaign
+from src.isingenerator.main_simulation import MainSimulation
+
+directory = tempfile.mkdtemp()
+
+campaign = FiniteSizeCampaign([4, 8], 40, 1.5, 3.0, 0.5, directory, workers=2, seed=4)
+jobs = campaign.plan()
+print([(job.dimension, job.task.kT, job.cost) for job in jobs])
+# The most expensive jobs are submitted first.
+assert [job.dimension for job in jobs] == [8] * 4 + [4] * 4
+assert campaign.job_cost(8) > campaign.job_cost(4)
+
+print(main(["campaign", "--sizes", "4", "8", "--steps-per-site", "40", "--initial-step-kT", "1.5",
+            "--final-step-kT", "3.0", "--delta-kT", "0.5", "--directory", directory, "--workers", "2",
+            "--seed", "4"]))
+assert campaign.file_names() == [os.path.join(directory, "640_4_16.csv"), os.path.join(directory, "2560_8_64.csv")]
+
+# Each dataset is the one the sweep of its size would produce on its own.
+for file_name, size in zip(campaign.file_names(), [4, 8]):
+    alone = os.path.join(directory, f"alone_{size}.csv")
+    CreateDataSimulation(alone, 40 * size * size, 1.5, 3.0, 0.5, size, epsilon=size * size, seed=4) \
+        .generate_csv_data_zero_magnetic_field()
+    with open(file_name, encoding="utf-8") as campaign_file, open(alone, encoding="utf-8") as alone_file:
+        rows = campaign_file.read()
+        assert rows == alone_file.read()
+    print(rows)
+
+# A campaign resumed after an interruption sorts the rows of both sessions together.
+resumed = os.path.join(directory, "resumed")
+checkpoints = os.path.join(directory, "checkpoints")
+first_session = CreateDataSimulation(os.path.join(resumed, "640_4_16.csv"), 640, 1.5, 3.0, 0.5, 4, epsilon=16,
+                                     seed=4, checkpoint_dir=checkpoints)
+os.makedirs(resumed)
+first_session.start_output()
+for task in reversed(first_session.pending_tasks()[2:]):
+    arguments = dict(first_session.observable_arguments(), kT=task.kT, B=task.B)
+    arguments["seed"] += task.index
+    first_session.append_row(MainSimulation.create_observables(**arguments), task)
+campaign = FiniteSizeCampaign([4], 40, 1.5, 3.0, 0.5, resumed, seed=4, checkpoint_dir=checkpoints)
+assert [job.task.index for job in campaign.plan()] == [0, 1]
+campaign.run()
+with open(campaign.file_names()[0], encoding="utf-8") as resumed_file, \
+        open(os.path.join(directory, "alone_4.csv"), encoding="utf-8") as alone_file:
+    assert resumed_file.read() == alone_file.read()
+
+shutil.rmtree(directory)
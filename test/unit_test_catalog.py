@@ -0,0 +1,47 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from src.isingenerator.create_data_simulation import CreateDataSimulation
+from src.isingenerator.dataset_catalog import DatasetCatalog
+
+directory = tempfile.mkdtemp()
+# Datasets written before the catalog, with an eight-column header over seven-column rows.
+for name in ("10000_68_16.csv", "10000_68_32.csv", "360000_36_27.csv"):
+    shutil.copy(name, directory)
+
+catalog = DatasetCatalog(directory)
+added = catalog.scan()
+print(added[0])
+assert len(added) == 3 and catalog.scan() == []
+assert added[0]["columns"][-1] == "mean_domain_size"
+
+rows = catalog.load(dimension=68, kT_min=2.0, kT_max=2.5)
+print(rows.dtype.names, len(rows))
+assert set(rows["dimension"]) == {68} and set(rows["epsilon"]) == {16, 32}
+assert rows["kT"].min() >= 2.0 and rows["kT"].max() <= 2.5
+expected = np.loadtxt(os.path.join(directory, "10000_68_16.csv"), delimiter=",", skiprows=1)
+assert np.array_equal(rows[rows["epsilon"] == 16]["energy"], expected[(expected[:, 0] >= 2.0) & (expected[:, 0] <= 2.5), 2])
+
+# New sweeps record their own parameters, and their extra columns are NaN for the other datasets.
+file_name = os.path.join(directory, "4000_8_15.csv")
+simulation = CreateDataSimulation(
+    file_name, 4000, 2.0, 3.0, 0.5, 8, seed=3, correlation_length=True,
+    catalog=os.path.join(directory, DatasetCatalog.INDEX),
+)
+simulation.generate_csv_data_zero_magnetic_field()
+catalog = DatasetCatalog(directory)
+record = catalog.find(dimension=8)[0]
+print(record)
+assert record["seed"] == 3 and record["engine"] == "metropolis" and record["version"] is not None
+assert catalog.scan() == []
+
+rows = catalog.load(kT_min=2.0, kT_max=3.0)
+assert len(rows) == sum(len(catalog.load(dimension=L, kT_min=2.0, kT_max=3.0)) for L in (8, 36, 68))
+assert len(rows[rows["dimension"] == 8]) == 3
+assert np.isnan(rows[rows["dimension"] == 68]["correlation_length"]).all()
+assert not np.isnan(rows[rows["dimension"] == 8]["correlation_length"]).any()
+
+shutil.rmtree(directory)
@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from src.isingenerator.checkerboard_engine import CheckerboardEngine
+from src.isingenerator.create_data_simulation import CreateDataSimulation
+from src.isingenerator.engines import Engines
+from src.isingenerator.lattice_square import LatticeSquare
+from src.isingenerator.main_simulation import MainSimulation
+from src.isingenerator.profiler import FlipStatistics
+
+
+def run(threads, strips, memmap=None):
+    np.random.seed(3)
+    lattice = LatticeSquare(16, 16, 0.5)
+    lattice.create_matrix()
+    statistics = FlipStatistics()
+    engine = Engines.create("checkerboard", lattice, 1 / 2.0, threads=threads, strips=strips, memmap=memmap)
+    matrix = np.array(engine.advance(100 * 256 + 100, statistics))
+    engine.close()
+    return matrix, statistics
+
+
+# The result depends on the strips, not on the threads running them.
+single, statistics = run(1, 4)
+threaded, _ = run(4, 4)
+assert np.array_equal(single, threaded)
+# Attempts that do not complete a half sweep are carried over.
+assert statistics.total_attempted() == 100 * 256
+print(statistics.to_dict())
+
+directory = tempfile.mkdtemp()
+path = os.path.join(directory, "lattice.int8")
+mapped, _ = run(2, 4, memmap=path)
+assert np.array_equal(mapped, single)
+assert np.array_equal(np.fromfile(path, dtype=np.int8).reshape(16, 16), single)
+os.remove(path)
+
+random_matrix = CheckerboardEngine.random_memmap(path, 8, 6, 0.7, block_rows=3)
+assert set(np.unique(random_matrix)) <= {-1, 1}
+del random_matrix
+os.remove(path)
+os.rmdir(directory)
+
+try:
+    lattice = LatticeSquare(15, 15, 0.5)
+    lattice.create_matrix()
+    Engines.create("checkerboard", lattice, 1.0)
+    raise AssertionError("odd lattices must be rejected")
+except ValueError as error:
+    print(error)
+
+# Ordered phase at low temperature, energy per site close to -2 * 2 with the double counted bonds.
+row = MainSimulation.create_observables(32 * 32 * 400, 1.5, 32, epsilon=32 * 32, seed=1, engine="checkerboard",
+                                        engine_options={"threads": 2})
+print(row)
+assert float(row[2]) / (32 * 32) < -3.8
+
+# Every point of a sweep gets its own memory-mapped lattice, drawn straight into its file.
+directory = tempfile.mkdtemp()
+memmap_dir = os.path.join(directory, "lattices")
+file_name = os.path.join(directory, "memmap.csv")
+simulation = CreateDataSimulation(file_name, 16 * 16 * 50, 1.5, 2.0, 0.5, 16, seed=1, engine="checkerboard",
+                                  engine_options={"threads": 1}, workers=2, memmap_dir=memmap_dir)
+simulation.generate_csv_data_zero_magnetic_field()
+assert sorted(os.listdir(memmap_dir)) == ["lattice_1.50000_0.00000_16.bin", "lattice_2.00000_0.00000_16.bin"]
+with open(file_name, encoding="utf-8") as csv_file:
+    rows = [line.split(",") for line in csv_file.read().splitlines()[1:]]
+for index, row in enumerate(rows):
+    kT = float(row[0])
+    alone = MainSimulation.create_observables(16 * 16 * 50, kT, 16, seed=1 + index, engine="checkerboard",
+                                              engine_options={"threads": 1}, memmap_dir=directory)
+    assert row == alone, (row, alone)
+    assert os.path.getsize(CheckerboardEngine.file_name(directory, kT, 0, 16)) == 16 * 16
+
+for options in ({"engine_options": {"memmap": os.path.join(directory, "shared.int8")}, "engine": "checkerboard"},
+                {"memmap_dir": memmap_dir}):
+    try:
+        CreateDataSimulation(file_name, 1000, 1.5, 2.0, 0.5, 16, **options)
+        raise AssertionError("a sweep needs one memmap file per point, from an engine that maps it")
+    except ValueError as error:
+        print(error)
+shutil.rmtree(directory)
@@ -0,0 +1,57 @@
+import glob
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from src.isingenerator.coarse_graining import BlockSpin, SnapshotPyramid
+from src.isingenerator.create_data_simulation import CreateDataSimulation
+from src.isingenerator.main_simulation import MainSimulation
+
+matrix = np.array([
+    [1, 1, -1, -1],
+    [1, -1, -1, -1],
+    [-1, 1, 1, 1],
+    [1, -1, -1, 1],
+])
+print(BlockSpin.coarse_grain(matrix, 2))
+# The bottom left block is a tie, resolved by its top left spin.
+assert (BlockSpin.coarse_grain(matrix, 2) == [[1, -1], [-1, 1]]).all()
+
+# The pyramid matches the direct majority rule at every level.
+np.random.seed(7)
+matrix = np.where(np.random.random((16, 16)) < 0.55, 1, -1)
+levels = BlockSpin.pyramid(matrix, (8, 2, 4, 1))
+assert sorted(levels) == [1, 2, 4, 8]
+assert (levels[1] == matrix).all()
+for factor in (2, 4, 8):
+    direct = np.zeros((16 // factor, 16 // factor), dtype=np.int8)
+    for i in range(16 // factor):
+        for j in range(16 // factor):
+            block = matrix[i * factor:(i + 1) * factor, j * factor:(j + 1) * factor]
+            direct[i, j] = np.sign(block.sum()) or block[0, 0]
+    assert (levels[factor] == direct).all()
+
+try:
+    SnapshotPyramid((12, 12), (8,))
+    raise AssertionError("8 does not divide 12")
+except ValueError as error:
+    print(error)
+
+directory = tempfile.mkdtemp()
+row = MainSimulation.create_observables(20000, 2.3, 16, epsilon=100, seed=1, snapshot_dir=directory, snapshot_levels=(4, 8))
+assert row == MainSimulation.create_observables(20000, 2.3, 16, epsilon=100, seed=1)
+saved = SnapshotPyramid.load(SnapshotPyramid.file_name(directory, 2.3, 0, 16))
+print({factor: samples.shape for factor, samples in saved.items()})
+assert saved[4].shape == (100, 4, 4) and saved[8].shape == (100, 2, 2)
+assert set(np.unique(saved[8])) <= {-1, 1}
+
+shutil.rmtree(directory)
+simulation = CreateDataSimulation(os.path.join(directory, "sweep.csv"), 4000, 2.0, 2.5, 0.5, 8, seed=1, snapshot_dir=directory)
+simulation.generate_csv_data_zero_magnetic_field()
+print(sorted(os.path.basename(name) for name in glob.glob(os.path.join(directory, "snapshots_*.npz"))))
+assert len(glob.glob(os.path.join(directory, "snapshots_*.npz"))) == 2
+assert sorted(SnapshotPyramid.load(glob.glob(os.path.join(directory, "snapshots_*.npz"))[0])) == [2, 4, 8]
+
+shutil.rmtree(directory)
@@ -0,0 +1,50 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from src.isingenerator.correlation import SpinCorrelation
+from src.isingenerator.create_data_simulation import CreateDataSimulation
+from src.isingenerator.main_simulation import MainSimulation
+
+np.random.seed(5)
+matrices = [np.where(np.random.random((8, 6)) < 0.7, 1, -1) for _ in range(3)]
+correlation = SpinCorrelation((8, 6))
+for matrix in matrices:
+    correlation.add(matrix)
+
+# The FFT result matches the direct O(L^4) sums.
+direct = np.zeros((8, 6))
+for matrix in matrices:
+    for dy in range(8):
+        for dx in range(6):
+            direct[dy, dx] += np.mean(matrix * np.roll(np.roll(matrix, -dy, axis=0), -dx, axis=1))
+direct /= len(matrices)
+assert np.allclose(correlation.correlation_function(connected=False), direct)
+square_magnetization = np.mean([matrix.mean() ** 2 for matrix in matrices])
+assert np.allclose(correlation.correlation_function(), direct - square_magnetization)
+assert np.isclose(correlation.structure_factor()[0, 0], np.mean([matrix.sum() ** 2 for matrix in matrices]) / 48)
+print(correlation.radial_profile())
+
+# The correlation length grows when approaching the critical temperature from above.
+lengths = []
+for kT in (4.0, 3.0, 2.5):
+    correlation = SpinCorrelation((16, 16))
+    for sample in MainSimulation.iter_samples(200000, kT, dimension=16, epsilon=256, seed=2):
+        correlation.add(sample.matrix)
+    lengths.append(correlation.correlation_length())
+print(lengths)
+assert lengths[0] < lengths[1] < lengths[2]
+
+directory = tempfile.mkdtemp()
+file_name = os.path.join(directory, "correlation.csv")
+simulation = CreateDataSimulation(file_name, 4000, 2.0, 3.0, 0.5, 8, seed=1, correlation_length=True)
+simulation.generate_csv_data_zero_magnetic_field()
+with open(file_name, encoding="utf-8") as csv_file:
+    lines = csv_file.read().splitlines()
+print("\n".join(lines))
+assert lines[0].endswith(",mean_domain_size,correlation_length")
+assert all(len(line.split(",")) == 8 for line in lines)
+
+shutil.rmtree(directory)
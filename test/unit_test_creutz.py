@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from src.isingenerator.__main__ import main
+from src.isingenerator.engines import Engines
+from src.isingenerator.exact_solution import OnsagerSolution
+from src.isingenerator.lattice_square import LatticeSquare
+from src.isingenerator.main_simulation import MainSimulation
+from src.isingenerator.profiler import FlipStatistics
+
+assert np.isclose(OnsagerSolution.energy(OnsagerSolution.CRITICAL_TEMPERATURE), -np.sqrt(2))
+assert np.isclose(OnsagerSolution.energy(1.0), -1.99716, atol=1e-5)
+
+np.random.seed(4)
+lattice = LatticeSquare(32, 32)
+lattice.create_matrix()
+engine = Engines.create("creutz", lattice, 1 / 3.0, energy=-0.8)
+# The spins start within one flip of the target energy.
+assert abs(engine.spin_energy() - (-0.8 * 1024)) <= 8
+total = engine.spin_energy() + int(engine._demons.sum())
+statistics = FlipStatistics()
+engine.advance(500 * 1024 + 100, statistics)
+# Spins and demons exchange energy but keep its total.
+assert engine.spin_energy() + int(engine._demons.sum()) == total
+assert statistics.total_attempted() == 500 * 1024
+print(statistics.to_dict(), engine.temperature())
+
+# The demons give back the temperature whose exact energy was targeted.
+for kT in (1.8, 3.0):
+    lattice = LatticeSquare(32, 32)
+    lattice.create_matrix()
+    engine = Engines.create("creutz", lattice, 1 / kT)
+    engine.advance(1000 * 1024)
+    print(kT, engine.temperature(), engine.spin_energy() / 1024)
+    assert abs(engine.temperature() - kT) < 0.1
+
+try:
+    lattice = LatticeSquare(15, 15)
+    lattice.create_matrix()
+    Engines.create("creutz", lattice, 1.0)
+    raise AssertionError("odd lattices must be rejected")
+except ValueError as error:
+    print(error)
+
+# The rows have the format of the canonical engines, the energy column counting the bonds twice.
+row = MainSimulation.create_observables(32 * 32 * 400, 3.0, 32, epsilon=32 * 32, seed=1, engine="creutz")
+print(row)
+assert len(row) == 8
+assert abs(float(row[2]) / (2 * 32 * 32) - OnsagerSolution.energy(3.0)) < 0.05
+# The last column is the temperature measured by the demons after the burn-in.
+assert abs(float(row[-1]) - 3.0) < 0.1
+
+# Prepared at another energy, the spins exchange energy with the demons drawn at the nominal kT until
+# both agree: the measured temperature is the one whose exact energy the spins end up sampling.
+directory = tempfile.mkdtemp()
+file_name = os.path.join(directory, "creutz.csv")
+main(["run", "--file-name", file_name, "--steps", str(32 * 32 * 400), "--initial-step-kT", "2.0",
+      "--final-step-kT", "3.0", "--delta-kT", "1.0", "--dimension", "32", "--epsilon", str(32 * 32),
+      "--seed", "1", "--engine", "creutz", "--engine-options", '{"energy": -1.2}'])
+with open(file_name, encoding="utf-8") as csv_file:
+    rows = [line.split(",") for line in csv_file.read().splitlines()]
+print(rows)
+assert rows[0][-1] == "measured_kT" and all(len(row) == len(rows[0]) for row in rows)
+for row in rows[1:]:
+    assert float(row[-1]) != float(row[0])
+    assert abs(OnsagerSolution.energy(float(row[-1])) - float(row[2]) / (2 * 32 * 32)) < 0.05
+shutil.rmtree(directory)
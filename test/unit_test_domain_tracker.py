@@ -0,0 +1,68 @@
+import numpy as np
+
+from src.isingenerator.domain_tracker import DomainTracker
+from src.isingenerator.engines import Engines
+from src.isingenerator.lattice_square import LatticeSquare
+from src.isingenerator.main_simulation import MainSimulation
+from src.isingenerator.profiler import FlipStatistics
+from src.isingenerator.spin_graph import SpinGraph
+from src.isingenerator.topological_variables import TopologicalVariables
+
+
+def same_partition(labels, expected):
+    pairs = set(zip(labels.ravel().tolist(), expected.ravel().tolist()))
+    return len(pairs) == len({a for a, _ in pairs}) == len({b for _, b in pairs})
+
+
+# Random flips, including the splits of a domain and the merges across the periodic boundary.
+np.random.seed(0)
+for shape, fraction in (((12, 10), 0.5), ((9, 7), 0.4), ((2, 6), 0.6)):
+    matrix = np.where(np.random.random(shape) < fraction, 1, -1)
+    tracker = DomainTracker(matrix)
+    for step in range(2000):
+        site = np.random.randint(matrix.size)
+        matrix.flat[site] *= -1
+        tracker.flip(site)
+        if step % 40 == 0:
+            TopologicalVariables.label_ring(matrix)
+            sizes = TopologicalVariables.length_of_domains()
+            assert tracker.domain_number() == TopologicalVariables.get_num_labels()
+            assert np.isclose(tracker.mean_domain_size(), TopologicalVariables.mean_domain_size())
+            assert tracker.domain_sizes().tolist() == sorted(sizes[sizes > 0].tolist())
+            assert same_partition(tracker.labels(), SpinGraph.connected_components(matrix)[1])
+
+# A ring cut in one place stays one domain, cut in two places it splits.
+matrix = -np.ones((6, 6), dtype=int)
+matrix[2, :] = 1
+tracker = DomainTracker(matrix)
+tracker.flip(2 * 6 + 0)
+assert tracker.domain_number() == 1
+tracker.flip(2 * 6 + 3)
+assert tracker.domain_number() == 2 and tracker.domain_sizes().tolist() == [2, 2]
+
+# As an observer of the Metropolis engine, forwarding the events to the flip statistics.
+lattice = LatticeSquare(16, 16, 0.5)
+lattice.create_matrix()
+statistics = FlipStatistics()
+tracker = DomainTracker(getattr(lattice, "_matrix"), statistics)
+matrix = Engines.create("metropolis", lattice, 1 / 2.3).advance(20000, tracker)
+assert statistics.total_attempted() == 20000
+TopologicalVariables.label_ring(matrix)
+assert tracker.domain_number() == TopologicalVariables.get_num_labels()
+
+# The samples agree with the labeling of every sample, with the engines that report flips or not.
+for engine in ("metropolis", "checkerboard"):
+    # Both chains draw from the global generators, so the first one is run to the end before the second.
+    tracked = list(MainSimulation.iter_samples(6000, 2.3, 8, epsilon=100, seed=5, engine=engine, incremental_domains=True))
+    labeled = MainSimulation.iter_samples(6000, 2.3, 8, epsilon=100, seed=5, engine=engine, domains=True)
+    for a, b in zip(tracked, labeled):
+        assert a.domain_number == b.domain_number and np.isclose(a.mean_domain_size, b.mean_domain_size)
+
+row = MainSimulation.create_observables(6000, 2.3, 8, epsilon=100, seed=5, incremental_domains=True)
+print(row)
+assert row == MainSimulation.create_observables(6000, 2.3, 8, epsilon=100, seed=5, analysis_workers=1)
+try:
+    MainSimulation.create_observables(6000, 2.3, 8, incremental_domains=True, analysis_workers=1)
+    raise AssertionError("the two sources of domains must be exclusive")
+except ValueError as error:
+    print(error)
@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+
+from src.isingenerator.__main__ import main
+from src.isingenerator.create_data_simulation import CreateDataSimulation
+
+directory = tempfile.mkdtemp()
+file_name = os.path.join(directory, "main.csv")
+arguments = ["run", "--file-name", file_name, "--steps", "2000",
+             "--initial-step-kT", "1.0", "--final-step-kT", "2.0", "--delta-kT", "0.5",
+             "--dimension", "8", "--seed", "3"]
+
+print(main(arguments + ["--dry-run"]))
+print(main(arguments))
+with open(file_name, encoding="utf-8") as csv_file:
+    first = csv_file.read()
+os.remove(file_name)
+
+print(main(arguments + ["--workers", "2"]))
+with open(file_name, encoding="utf-8") as csv_file:
+    second = csv_file.read()
+os.remove(file_name)
+
+# With several workers the rows are sorted back into grid order.
+assert first == second
+print(first)
+
+field = ["--initial-step-B", "0.0", "--final-step-B", "0.2", "--delta-B", "0.2"]
+print(main(arguments + field + ["--workers", "2"]))
+with open(file_name, encoding="utf-8") as csv_file:
+    rows = csv_file.read().splitlines()
+os.remove(file_name)
+
+assert len(rows) == 1 + 3 * 2
+assert [row.split(",")[:2] for row in rows[1:]] == [
+    ["{:.5f}".format(kT), "{:.5f}".format(B)] for kT in (1.0, 1.5, 2.0) for B in (0.0, 0.2)
+]
+assert all(len(row.split(",")) == len(rows[0].split(",")) for row in rows)
+print("\n".join(rows))
+
+# A run stopped after writing a row but before its checkpoint, in the middle of the next row, writes the
+# row again when resumed: the resumed file is the file of an uninterrupted run.
+checkpoint_dir = os.path.join(directory, "checkpoints")
+resumed = arguments + field + ["--checkpoint-dir", checkpoint_dir]
+main(resumed)
+with open(file_name, encoding="utf-8") as csv_file:
+    complete = csv_file.read()
+os.remove(file_name)
+shutil.rmtree(checkpoint_dir)
+lines = complete.splitlines(keepends=True)
+with open(file_name, "w", encoding="utf-8") as csv_file:
+    csv_file.write("".join(lines[:4]) + lines[4][:10])
+os.makedirs(checkpoint_dir)
+with open(os.path.join(checkpoint_dir, "main.csv.checkpoint"), "w", encoding="utf-8") as checkpoint_file:
+    checkpoint_file.write("header\n1.00000,0.00000\n1.00000,0.20000\n")
+main(resumed)
+with open(file_name, encoding="utf-8") as csv_file:
+    assert csv_file.read() == complete
+os.remove(file_name)
+
+# The dry run times the configured engine: the n-fold way is far cheaper at low temperature.
+estimates = {
+    engine: CreateDataSimulation(file_name, 100000, 0.5, 0.6, 0.1, 16, 0.8, engine=engine).estimate_cost(0.1)
+    for engine in ("metropolis", "nfold")
+}
+print({engine: estimate["estimated_seconds"] for engine, estimate in estimates.items()})
+assert estimates["nfold"]["engine"] == "nfold" and len(estimates["nfold"]["calibration"]) == 3
+assert estimates["nfold"]["estimated_seconds"] < estimates["metropolis"]["estimated_seconds"] / 3
+
+# The curvature plots go next to the output file, never to the working directory.
+print(main(arguments + ["--geometric-variables"]))
+plots = sorted(name for name in os.listdir(directory) if name.endswith(".png"))
+assert plots == [f"forman_ricci_information_dos_{kT:.5f}_0.00000.png" for kT in (1.0, 1.5, 2.0)], plots
+assert not any(name.startswith("forman_ricci") for name in os.listdir("."))
+
+shutil.rmtree(directory)
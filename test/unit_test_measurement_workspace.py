@@ -0,0 +1,23 @@
+import numpy as np
+
+from src.isingenerator.ising_model_2d import IsingModel2D
+from src.isingenerator.lattice_square import LatticeSquare
+from src.isingenerator.measurement_workspace import MeasurementWorkspace
+from src.isingenerator.neighbors import Neighbors
+
+for rows, columns in [(2, 2), (3, 5), (15, 15), (64, 64)]:
+    matrix = LatticeSquare(rows, columns, 0.6).create_matrix()
+    workspace = MeasurementWorkspace(matrix.shape, matrix.dtype)
+    assert np.array_equal(workspace.neighbor_sums(matrix), Neighbors.sum_of_neighbors(matrix))
+
+    ising_model = IsingModel2D(matrix)
+    for J, B, mu in [(1, 0, 1), (1.0, 0.3, 2.0), (0.7, -1.1, 1.0)]:
+        energy, magnetization = workspace.energy_and_magnetization(matrix, J, B, mu)
+        print(rows, columns, energy, magnetization)
+        # Bit-identical to the reference functions.
+        assert repr(energy) == repr(ising_model.calculate_energy(J, B, mu))
+        assert magnetization == ising_model.calculate_magnetization()
+
+# The points of a sweep share one workspace per lattice shape.
+assert MeasurementWorkspace.shared((64, 64), np.int8) is MeasurementWorkspace.shared((64, 64), np.int8)
+assert MeasurementWorkspace.shared((64, 64), np.int8) is not MeasurementWorkspace.shared((32, 32), np.int8)
@@ -0,0 +1,26 @@
+import numpy as np
+
+from src.isingenerator.engines import Engines
+from src.isingenerator.lattice_square import LatticeSquare
+from src.isingenerator.neighbors import Neighbors
+
+table = Neighbors.table(3, 5)
+print(table)
+assert table.dtype == np.int32 and table.shape == (15, 4)
+assert Neighbors.table(3, 5) is table
+assert not table.flags.writeable
+# Site (2, 4): below wraps to row 0, right wraps to column 0.
+assert table[2 * 5 + 4].tolist() == [0 * 5 + 4, 2 * 5 + 0, 1 * 5 + 4, 2 * 5 + 3]
+
+np.random.seed(0)
+matrix = np.where(np.random.random((6, 9)) < 0.5, 1, -1)
+sums = Neighbors.sum_of_neighbors(matrix)
+for row in range(6):
+    for column in range(9):
+        assert Neighbors.sum_neighbors_position(matrix, row, column) == sums[row, column]
+
+# The single spin-flip engine runs on rectangular lattices.
+lattice = LatticeSquare(4, 10)
+lattice.create_matrix()
+engine = Engines.create("metropolis", lattice, 1 / 2.0)
+print(engine.advance(2000))
@@ -0,0 +1,35 @@
+import numpy as np
+
+from src.isingenerator.engines import Engines
+from src.isingenerator.lattice_square import LatticeSquare
+from src.isingenerator.main_simulation import MainSimulation
+from src.isingenerator.neighbors import Neighbors
+from src.isingenerator.profiler import FlipStatistics
+
+np.random.seed(2)
+lattice = LatticeSquare(12, 12, 0.5)
+lattice.create_matrix()
+engine = Engines.create("nfold", lattice, 1 / 2.2)
+statistics = FlipStatistics()
+matrix = engine.advance(50000, statistics)
+# The buckets follow the spin matrix.
+classes = (matrix * Neighbors.sum_of_neighbors(matrix) + 4).ravel() // 2
+for k, bucket in enumerate(engine._buckets):
+    assert sorted(bucket) == sorted(np.flatnonzero(classes == k).tolist())
+assert all(engine._buckets[engine._class[site]][engine._position[site]] == site for site in range(144))
+print(statistics.to_dict())
+assert abs(statistics.total_attempted() - 50000) <= 5
+
+# Same physics as the Metropolis engine, in a fraction of the time at low temperature.
+for kT in (1.5, 2.0, 3.0):
+    rows = [
+        MainSimulation.create_observables(16 * 16 * 1500, kT, 16, epsilon=256, seed=1, engine=engine)
+        for engine in ("metropolis", "nfold")
+    ]
+    print(kT, rows)
+    energies = [float(row[2]) / 256 for row in rows]
+    assert abs(energies[0] - energies[1]) < 0.1
+
+row = MainSimulation.create_observables(16 * 16 * 10**5, 0.5, 16, epsilon=16 * 16 * 100, seed=1, engine="nfold")
+print(row)
+assert float(row[4]) == 1.0
@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from src.isingenerator.create_data_simulation import CreateDataSimulation
+from src.isingenerator.main_simulation import MainSimulation
+from src.isingenerator.observable_statistics import BinningAnalysis
+
+# On an AR(1) series the binning error reaches the exact error of the mean.
+np.random.seed(3)
+rho = 0.9
+values = np.zeros(2 ** 16)
+for i in range(1, len(values)):
+    values[i] = rho * values[i - 1] + np.random.normal()
+binning = BinningAnalysis()
+for value in values:
+    binning.add(value)
+error, reliable = binning.error()
+exact = np.sqrt(1 / (1 - rho**2) * (1 + rho) / (1 - rho) / len(values))
+print(error, exact, reliable)
+assert reliable
+assert abs(error - exact) / exact < 0.35
+assert binning.level_errors()[0] < error / 3
+
+# On a strongly correlated series the error is not reliable before its plateau: with rho = 0.98 the exact
+# error of the mean is 50 / sqrt(n), so a target of 50 / sqrt(20000) must not stop the series far earlier.
+rho = 0.98
+target = 50 / np.sqrt(20000)
+stops = []
+for chain in range(30):
+    np.random.seed(100 + chain)
+    noise = np.random.normal(size=200000)
+    binning = BinningAnalysis()
+    value = 0.0
+    for n in range(1, len(noise) + 1):
+        value = rho * value + noise[n - 1]
+        binning.add(value)
+        if n % 16 == 0:
+            error, reliable = binning.error()
+            if reliable and error <= target:
+                break
+    stops.append(n)
+print(min(stops), int(np.median(stops)))
+assert 50 / np.sqrt(min(stops)) < 1.5 * target
+
+# An easy target stops well before the cap, an impossible one runs every step.
+cap = 400000
+row = MainSimulation.create_observables(cap, 1.5, 8, epsilon=64, seed=1, burn_in=0.05, target_error=0.01)
+print(row)
+assert int(row[-3]) < cap
+assert float(row[-2]) <= 0.01 and float(row[-1]) <= 0.01
+row = MainSimulation.create_observables(20000, 2.3, 8, epsilon=64, seed=1, target_error=1e-6, relative_error=True)
+print(row)
+assert int(row[-3]) == 20000
+
+directory = tempfile.mkdtemp()
+file_name = os.path.join(directory, "precision.csv")
+simulation = CreateDataSimulation(file_name, 40000, 1.5, 2.0, 0.5, 8, seed=1, target_error=0.02)
+simulation.generate_csv_data_zero_magnetic_field()
+with open(file_name, encoding="utf-8") as csv_file:
+    lines = csv_file.read().splitlines()
+print("\n".join(lines))
+assert lines[0].endswith(",mean_domain_size,steps_used,energy_error,abs_magnetization_error")
+assert all(len(line.split(",")) == 10 for line in lines)
+
+shutil.rmtree(directory)
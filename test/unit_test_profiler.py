@@ -0,0 +1,17 @@
+from src.isingenerator.main_simulation import MainSimulation
+from src.isingenerator.profiler import SimulationProfiler
+
+profiler = SimulationProfiler()
+
+print(MainSimulation.create_observables(
+    360,
+    2.2,
+    5,
+    profiler=profiler
+    ))
+
+report = profiler.report()
+assert report["flips"]["attempted"] == 360
+assert report["counters"]["samples"] == 12
+print(report["phases"])
+print(report["flips"])
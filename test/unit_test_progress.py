@@ -0,0 +1,23 @@
+import os
+import shutil
+import tempfile
+
+from src.isingenerator.create_data_simulation import CreateDataSimulation
+from src.isingenerator.progress import ConsoleProgress
+
+events = []
+
+def callback(event):
+    events.append(event)
+    ConsoleProgress()(event)
+
+directory = tempfile.mkdtemp()
+c = CreateDataSimulation(os.path.join(directory, "progress.csv"), 20000, 1.0, 2.0, 0.5, 8,
+                         progress=callback, progress_interval=0.01)
+print(c.generate_csv_data_zero_magnetic_field())
+
+assert events[-1].fraction == 1.0
+assert events[-1].point == 2
+print(events[-1])
+
+shutil.rmtree(directory)
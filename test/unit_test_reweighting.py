@@ -0,0 +1,51 @@
+import glob
+import math
+import os
+import shutil
+import tempfile
+
+from src.isingenerator.create_data_simulation import CreateDataSimulation
+from src.isingenerator.main_simulation import MainSimulation
+from src.isingenerator.observable_statistics import ObservableMoments
+from src.isingenerator.reweighting import JointHistogram, Reweighting
+
+histogram = JointHistogram(16, 0.5, J=2.0, B=0.5, mu=1.0)
+histogram.add(-2.0 * 32 - 0.5 * 16, 16)
+histogram.add(-2.0 * 16 + 0.5 * 8, -8)
+print(histogram.counts)
+assert histogram.counts == {(-16, 16): 1, (-8, -8): 1}
+
+# Reweighting a single histogram to its own temperature gives back the sample averages.
+histogram = JointHistogram(64, 1 / 2.5)
+moments = ObservableMoments(64)
+for sample in MainSimulation.iter_samples(20000, 2.5, dimension=8, epsilon=64, seed=4):
+    histogram.add(sample.energy, sample.magnetization)
+    moments.add(sample.energy / 2, sample.magnetization)
+summary = moments.summary(2.5)
+reweighted = Reweighting([histogram]).observables([2.5])[0]
+print(summary)
+print(reweighted)
+for name in ("energy", "abs_magnetization", "heat_capacity", "susceptibility"):
+    assert math.isclose(reweighted[name], summary[name], rel_tol=1e-9, abs_tol=1e-12)
+
+directory = tempfile.mkdtemp()
+histogram_dir = os.path.join(directory, "histograms")
+simulation = CreateDataSimulation(
+    os.path.join(directory, "sweep.csv"), 40000, 2.0, 3.0, 0.25, 8, epsilon=64, seed=1, histogram_dir=histogram_dir
+)
+simulation.generate_csv_data_zero_magnetic_field()
+files = sorted(glob.glob(os.path.join(histogram_dir, "histogram_*.npz")))
+print(files)
+assert len(files) == 5
+
+reweighting = Reweighting.from_directory(histogram_dir, dimension=8)
+print(reweighting.free_energies)
+rows = reweighting.observables([2.0 + 0.01 * i for i in range(101)])
+energies = [row["energy"] for row in rows]
+magnetizations = [row["abs_magnetization"] for row in rows]
+assert all(a < b for a, b in zip(energies, energies[1:]))
+assert all(a > b for a, b in zip(magnetizations, magnetizations[1:]))
+assert all(row["heat_capacity"] > 0 and row["susceptibility"] > 0 for row in rows)
+print(rows[50])
+
+shutil.rmtree(directory)
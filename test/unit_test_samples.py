@@ -0,0 +1,30 @@
+import itertools
+
+from src.isingenerator.main_simulation import MainSimulation
+from src.isingenerator.profiler import SimulationProfiler
+
+samples = list(MainSimulation.iter_samples(3000, 2.3, 8, epsilon=100, seed=5, domains=True))
+print(samples[0][:6])
+assert [sample.step for sample in samples] == list(range(1501, 3000, 100))
+assert all(sample.magnetization_per_site == sample.magnetization / 64 for sample in samples)
+assert all(sample.domain_number is not None for sample in samples)
+
+# The averages of create_observables are those of the stream.
+row = MainSimulation.create_observables(3000, 2.3, 8, epsilon=100, seed=5)
+number_data = len(samples)
+assert row[2] == "{:.5f}".format(sum(sample.energy for sample in samples) / number_data)
+assert row[3] == "{:.5f}".format(sum(sample.magnetization for sample in samples) / number_data)
+print(row)
+
+# Also when the sampled steps are not a multiple of epsilon: 3 samples after a burn-in of 1920 steps.
+uneven = list(MainSimulation.iter_samples(100 * 64, 5.0, 8, epsilon=30 * 64, seed=1, burn_in=0.3))
+row = MainSimulation.create_observables(100 * 64, 5.0, 8, epsilon=30 * 64, seed=1, burn_in=0.3)
+assert len(uneven) == 3
+assert row[2] == "{:.5f}".format(sum(sample.energy for sample in uneven) / 3), row
+
+# Stopping early still records the work done.
+profiler = SimulationProfiler()
+first = list(itertools.islice(MainSimulation.iter_samples(3000, 2.3, 8, epsilon=100, seed=5, profiler=profiler), 3))
+assert [sample.energy for sample in first] == [sample.energy for sample in samples[:3]]
+print(profiler.counters)
+assert profiler.counters["samples"] == 3
@@ -0,0 +1,30 @@
+import networkx as nx
+import numpy as np
+
+from src.isingenerator.geometric_variables_dos import GeometricVariables
+from src.isingenerator.spin_graph import SpinGraph
+
+np.random.seed(3)
+for shape in [(2, 2), (2, 5), (6, 6), (9, 14), (30, 30)]:
+    matrix = np.where(np.random.random(shape) < 0.6, 1, -1)
+    reference = GeometricVariables.ising_matrix_to_graph(matrix)
+    adjacency = SpinGraph.adjacency(matrix)
+    graph = SpinGraph.to_networkx(matrix, adjacency)
+    assert set(graph.nodes) == set(reference.nodes)
+    assert {frozenset(edge) for edge in graph.edges} == {frozenset(edge) for edge in reference.edges}
+
+    degrees = SpinGraph.degrees(adjacency)
+    assert all(degrees[i * shape[1] + j] == reference.degree((i, j)) for i, j in reference.nodes)
+
+    total, values = SpinGraph.forman_ricci_curvature_values(adjacency)
+    reference_total, reference_values = GeometricVariables.forman_ricci_curvature_values(reference)
+    assert total == reference_total
+    assert sorted(values.tolist()) == sorted(reference_values)
+
+    count, labels = SpinGraph.connected_components(matrix, adjacency)
+    assert count == nx.number_connected_components(reference)
+    assert np.all((labels >= 0) == (matrix == 1))
+
+    laplacian = SpinGraph.laplacian(adjacency)
+    assert np.allclose(laplacian.sum(axis=1), 0)
+    print(shape, adjacency.nnz, total, count)
@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from src.isingenerator.coarse_graining import SnapshotPyramid
+from src.isingenerator.engines import Engines
+from src.isingenerator.lattice_square import LatticeSquare
+from src.isingenerator.main_simulation import MainSimulation
+from src.isingenerator.profiler import FlipStatistics
+from src.isingenerator.trajectory_log import TrajectoryRecorder, TrajectoryReplay, Varint
+
+# Varints round trip, from one byte to the largest values.
+values = np.array([0, 1, 127, 128, 300, 16383, 16384, 2**32 + 5, 2**63 - 1], dtype=np.uint64)
+assert Varint.encode(np.array([1, 300])) == b"\x01\xac\x02"
+assert Varint.decode(Varint.encode(values)).tolist() == values.tolist()
+assert Varint.encode(np.array([], dtype=np.int64)) == b""
+
+directory = tempfile.mkdtemp()
+file_name = os.path.join(directory, "trajectory.bin")
+
+# Small chunks so that the replays cross many keyframes, and the events reach the flip statistics.
+lattice = LatticeSquare(12, 10, 0.5)
+lattice.create_matrix()
+matrix = getattr(lattice, "_matrix")
+engine = Engines.create("metropolis", lattice, 1 / 2.3)
+statistics = FlipStatistics()
+states = {0: matrix.copy()}
+with TrajectoryRecorder(file_name, matrix, chunk_flips=50, keyframe_chunks=3, observer=statistics) as recorder:
+    for step in range(1000, 20001, 1000):
+        engine.advance(1000, recorder)
+        states[step] = matrix.copy()
+    engine.advance(123, recorder)
+    states[20123] = matrix.copy()
+assert statistics.total_attempted() == 20123
+
+replay = TrajectoryReplay(file_name)
+assert replay.last_step() == 20123
+assert replay.flips == statistics.total_accepted()
+for step, state in states.items():
+    assert np.array_equal(replay.lattice_at(step), state), step
+steps = np.concatenate([steps for steps, _ in replay.flip_events()])
+assert len(steps) == replay.flips and np.all(np.diff(steps) > 0)
+try:
+    replay.lattice_at(20124)
+    raise AssertionError("a step after the trajectory cannot be replayed")
+except ValueError as error:
+    print(error)
+replay.close()
+
+# The replay of the step of every sample gives the sampled lattice, also when the sampling stops early.
+samples = MainSimulation.iter_samples(40000, 2.3, 16, epsilon=1000, seed=3, trajectory_file=file_name)
+sampled = {}
+for sample in samples:
+    sampled[sample.step] = sample.matrix.copy()
+    if len(sampled) == 10:
+        samples.close()
+replay = TrajectoryReplay(file_name)
+for step, state in sampled.items():
+    assert np.array_equal(replay.lattice_at(step), state), step
+trajectory_size = os.path.getsize(file_name)
+
+# Size compared with the full lattices of every sample, compressed.
+pyramid = SnapshotPyramid((16, 16), (1,))
+for state in sampled.values():
+    pyramid.add(state)
+pyramid.save(os.path.join(directory, "snapshots.npz"), kT=2.3, B=0)
+print(f"{replay.flips} flips in {trajectory_size} bytes, {trajectory_size / replay.flips:.2f} bytes per flip;"
+      f" {len(sampled)} compressed lattices: {os.path.getsize(os.path.join(directory, 'snapshots.npz'))} bytes")
+replay.close()
+
+# The recording does not change the chain.
+plain = MainSimulation.create_observables(6000, 2.3, 8, epsilon=100, seed=5)
+assert plain == MainSimulation.create_observables(6000, 2.3, 8, epsilon=100, seed=5, trajectory_dir=directory)
+assert os.path.exists(TrajectoryRecorder.file_name(directory, 2.3, 0, 8))
+
+try:
+    list(MainSimulation.iter_samples(6000, 2.3, 8, epsilon=100, engine="checkerboard", trajectory_file=file_name))
+    raise AssertionError("the checkerboard engine does not report single flips")
+except ValueError as error:
+    print(error)
+
+shutil.rmtree(directory)
@@ -0,0 +1,33 @@
+import numpy as np
+
+from src.isingenerator.engine_validation import EngineValidation
+from src.isingenerator.exact_solution import OnsagerSolution
+
+assert OnsagerSolution.magnetization(3.0) == 0.0
+assert np.isclose(OnsagerSolution.magnetization(2.0), 0.91132, atol=1e-5)
+
+# The Binder cumulant of an ordered chain is 2 / 3 with no error.
+binder, error = EngineValidation._binder(np.ones((64, 2)))
+assert np.isclose(binder, 2 / 3) and np.isclose(error, 0)
+
+results = EngineValidation.run(["checkerboard", "nfold", "creutz"], points=((8, 1.8), (8, 3.0)), sweeps=1500)
+print(EngineValidation.format_table(results))
+assert len(results["results"]) == 2 * 4
+assert all(result["attempts_per_second"] > 0 for result in results["results"])
+failures = EngineValidation.failures(results)
+print(failures)
+assert not failures
+# The reference engine is only compared with the exact solution, |m| below the critical temperature.
+checks = [result["checks"] for result in results["results"] if result["engine"] == "metropolis"]
+assert sorted(checks[0]) == ["exact_abs_magnetization", "exact_energy"]
+assert sorted(checks[1]) == ["exact_energy"]
+
+# The microcanonical engine starts at the exact energy: its temperature is checked instead.
+creutz = [result for result in results["results"] if result["engine"] == "creutz"]
+assert all(result["skipped"] == ["exact_energy"] and "exact_temperature" in result["checks"] for result in creutz)
+assert all("exact_energy" not in result["checks"] and "reference_energy" in result["checks"] for result in creutz)
+assert all(not result["skipped"] for result in results["results"] if result["engine"] != "creutz")
+
+# An impossible tolerance fails.
+strict = EngineValidation.run(["metropolis"], points=((8, 3.0),), sweeps=300, z=0.0, slack=0.0)
+assert EngineValidation.failures(strict)
@@ -0,0 +1,44 @@
+import math
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from src.isingenerator.lattice_square import LatticeSquare
+from src.isingenerator.wang_landau import DensityOfStates, WangLandau
+
+# Exact density of states of the 4x4 periodic lattice.
+exact = {
+    -32: 2, -24: 32, -20: 64, -16: 424, -12: 1728, -8: 6688, -4: 13568, 0: 20524,
+    4: 13568, 8: 6688, 12: 1728, 16: 424, 20: 64, 24: 32, 32: 2,
+}
+
+np.random.seed(1)
+lattice = LatticeSquare(4, 4)
+lattice.create_matrix()
+walk = WangLandau(lattice, final_log_f=1e-5, schedule="1/t")
+density = walk.run()
+print(walk.sweeps, walk.stages, walk.log_f)
+print(list(zip(density.energies, np.exp(density.log_g).round(1))))
+assert sorted(density.energies) == sorted(exact)
+for energy, log_g in zip(density.energies, density.log_g):
+    assert abs(math.exp(log_g) / exact[int(energy)] - 1) < 0.1
+
+exact_density = DensityOfStates(np.array(list(exact)), np.log(list(exact.values())), 16)
+estimated, reference = density.thermodynamics([2.269])[0], exact_density.thermodynamics([2.269])[0]
+print(estimated)
+print(reference)
+for name in ("energy", "heat_capacity", "free_energy", "entropy"):
+    assert abs(estimated[name] - reference[name]) < 0.05
+
+# Limits of the exact thermodynamics: ground state at low temperature, ln 2 per site at high temperature.
+assert math.isclose(exact_density.thermodynamics([0.1])[0]["energy"], -2.0)
+assert abs(exact_density.thermodynamics([1e6])[0]["entropy"] - math.log(2)) < 1e-6
+
+directory = tempfile.mkdtemp()
+density.save(os.path.join(directory, "density.npz"))
+loaded = DensityOfStates.load(os.path.join(directory, "density.npz"))
+assert np.allclose(loaded.log_g, density.log_g)
+
+shutil.rmtree(directory)
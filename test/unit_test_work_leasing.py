@@ -0,0 +1,126 @@
+import json
+import os
+import shutil
+import tempfile
+from multiprocessing import Pool
+
+from src.isingenerator.__main__ import main
+from src.isingenerator.dataset_catalog import DatasetCatalog
+from src.isingenerator.grid_scheduler import GridTask
+from src.isingenerator.work_leasing import WorkLeasing
+
+directory = tempfile.mkdtemp()
+shard_dir = os.path.join(directory, "sweep")
+
+print(main(["shard-init", "--shard-dir", shard_dir, "--steps", "2000",
+            "--initial-step-kT", "1.0", "--final-step-kT", "3.0", "--delta-kT", "0.5",
+            "--dimension", "8", "--seed", "5"]))
+
+# An abandoned lease is taken over once it is older than the lease duration.
+stale = os.path.join(shard_dir, "leases", "0.lease")
+with open(stale, "w", encoding="utf-8") as lease_file:
+    lease_file.write("{}")
+os.utime(stale, (0, 0))
+assert WorkLeasing.claim(shard_dir, "first", lease_seconds=60) == GridTask(0, 1.0, 0.0)
+assert WorkLeasing.claim(shard_dir, "second", lease_seconds=60).index == 1
+os.remove(os.path.join(shard_dir, "leases", "0.lease"))
+os.remove(os.path.join(shard_dir, "leases", "1.lease"))
+
+# Two workers take over the same expired lease: the second one renames the lease only after the
+# first one replaced it with a fresh lease, and must give the task back to it.
+with open(stale, "w", encoding="utf-8") as lease_file:
+    lease_file.write("{}")
+os.utime(stale, (0, 0))
+rename = os.rename
+claims = {}
+
+
+def interleaved_rename(source: str, destination: str) -> None:
+    if "late" in destination and "early" not in claims:
+        claims["early"] = WorkLeasing.claim(shard_dir, "early", lease_seconds=60)
+    rename(source, destination)
+
+
+os.rename = interleaved_rename
+try:
+    claims["late"] = WorkLeasing.claim(shard_dir, "late", lease_seconds=60)
+finally:
+    os.rename = rename
+print(claims)
+assert claims["early"].index == 0 and claims["late"].index == 1
+with open(stale, encoding="utf-8") as lease_file:
+    assert '"early"' in lease_file.read()
+assert sorted(os.listdir(os.path.join(shard_dir, "leases"))) == ["0.lease", "1.lease"]
+os.remove(os.path.join(shard_dir, "leases", "0.lease"))
+os.remove(os.path.join(shard_dir, "leases", "1.lease"))
+
+# A third worker creates a lease while the late one holds the fresh lease of the early one: putting
+# it back must not overwrite the lease of the third worker.
+with open(stale, "w", encoding="utf-8") as lease_file:
+    lease_file.write("{}")
+os.utime(stale, (0, 0))
+link = os.link
+claims = {}
+
+
+def interleaved_link(source: str, destination: str) -> None:
+    if "third" not in claims:
+        claims["third"] = WorkLeasing.claim(shard_dir, "third", lease_seconds=60)
+    link(source, destination)
+
+
+os.rename = interleaved_rename
+os.link = interleaved_link
+try:
+    claims["late"] = WorkLeasing.claim(shard_dir, "late", lease_seconds=60)
+finally:
+    os.rename = rename
+    os.link = link
+print(claims)
+assert claims["early"].index == 0 and claims["third"].index == 0 and claims["late"].index == 1
+with open(stale, encoding="utf-8") as lease_file:
+    assert '"third"' in lease_file.read()
+assert sorted(os.listdir(os.path.join(shard_dir, "leases"))) == ["0.lease", "1.lease"]
+os.remove(os.path.join(shard_dir, "leases", "0.lease"))
+os.remove(os.path.join(shard_dir, "leases", "1.lease"))
+
+with Pool(3) as pool:
+    done = pool.starmap(WorkLeasing.run_worker, [(shard_dir, f"worker-{i}", 60, 0.1) for i in range(3)])
+print(done)
+assert sum(done) == 5
+assert WorkLeasing.pending(shard_dir) == 0
+
+merged = os.path.join(directory, "merged.csv")
+print(main(["shard-merge", "--shard-dir", shard_dir, "--file-name", merged]))
+with open(merged, encoding="utf-8") as csv_file:
+    rows = csv_file.read().splitlines()
+print("\n".join(rows))
+assert [row.split(",")[0] for row in rows[1:]] == ["1.00000", "1.50000", "2.00000", "2.50000", "3.00000"]
+
+# The merged file has the format of the manifest and is registered in its catalog.
+catalog = os.path.join(directory, "catalog.jsonl")
+jsonl_dir = os.path.join(directory, "jsonl")
+main(["shard-init", "--shard-dir", jsonl_dir, "--steps", "2000",
+      "--initial-step-kT", "1.0", "--final-step-kT", "1.5", "--delta-kT", "0.5",
+      "--dimension", "8", "--seed", "5", "--output-format", "jsonl", "--catalog", catalog])
+WorkLeasing.run_worker(jsonl_dir, "worker", 60, 0.1)
+merged = os.path.join(directory, "merged.jsonl")
+main(["shard-merge", "--shard-dir", jsonl_dir, "--file-name", merged])
+with open(merged, encoding="utf-8") as jsonl_file:
+    rows = [json.loads(line) for line in jsonl_file]
+assert [row["kT"] for row in rows] == [1.0, 1.5] and list(rows[0])[2] == "energy"
+records = DatasetCatalog(directory).records()
+assert [record["file"] for record in records] == ["merged.jsonl"]
+assert records[0]["output_format"] == "jsonl" and records[0]["points"] == 2 and records[0]["seed"] == 5
+
+# The options of a single-process sweep are refused rather than ignored.
+try:
+    main(["shard-init", "--shard-dir", os.path.join(directory, "refused"), "--steps", "2000",
+          "--initial-step-kT", "1.0", "--final-step-kT", "1.5", "--delta-kT", "0.5",
+          "--dimension", "8", "--workers", "4", "--checkpoint-dir", directory])
+    raise AssertionError("shard-init does not use --workers nor --checkpoint-dir")
+except SystemExit as error:
+    assert error.code == 2
+assert not os.path.exists(os.path.join(directory, "refused"))
+
+shutil.rmtree(directory)
@@ -0,0 +1,62 @@
+"""
+Statistical validation of the engines against the Metropolis engine and Onsager's exact solution.
+
+Run from the root of the repository:
+
+    python -m test.validate_engines --engines checkerboard nfold --output validation.json
+"""
+
+import argparse
+import sys
+from typing import List
+
+from src.isingenerator.benchmark import Benchmark
+from src.isingenerator.engine_validation import EngineValidation
+from src.isingenerator.engines import Engines
+
+
+def main(argv: List[str] = None) -> int:
+    """Validate the engines, print the table of the results and write them.
+
+    Returns:
+        int: 1 if a check failed, 0 otherwise.
+    """
+    parser = argparse.ArgumentParser(
+        "validate_engines",
+        description="Compare the observables of the engines with the Metropolis engine and the exact solution."
+    )
+    parser.add_argument("--engines", nargs="+", choices=Engines.names(), default=None,
+                        help="Engines to validate, all of them by default.")
+    parser.add_argument("--points", nargs="+", default=None,
+                        help="The points as L:kT pairs, such as 16:1.8 32:3.0.")
+    parser.add_argument("--sweeps", type=int, default=2000,
+                        help="Sweeps per run.")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed of every run.")
+    parser.add_argument("--z", type=float, default=4.0,
+                        help="Number of combined standard errors allowed.")
+    parser.add_argument("--slack", type=float, default=0.01,
+                        help="Absolute difference allowed on top of the statistical errors.")
+    parser.add_argument("--output", default=None,
+                        help="JSON file receiving the results.")
+    args = parser.parse_args(argv)
+
+    points = EngineValidation.POINTS
+    if args.points is not None:
+        points = [(int(point.split(":")[0]), float(point.split(":")[1])) for point in args.points]
+    results = EngineValidation.run(args.engines, points, args.sweeps, args.seed, args.z, args.slack)
+    print(EngineValidation.format_table(results))
+    if args.output is not None:
+        Benchmark.write_json(results, args.output)
+
+    failures = EngineValidation.failures(results)
+    for failure in failures:
+        print(
+            f"FAILED {failure['engine']} L={failure['dimension']} kT={failure['kT']} {failure['check']}: "
+            f"difference {failure['difference']:+.5f}, error {failure['error']:.5f}"
+        )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())